@@ -0,0 +1,341 @@
+# Timing and peak memory of the catalog operations, without a display.
+#
+# Generates synthetic catalogs of the given sizes (folders plus executables,
+# nested up to --depth levels with --fanout subfolders per folder), writes
+# each to a temporary directory and measures loading (data file and startup
+# cache), searching, fuzzy ranking, sorting, saving (full snapshot and
+# journal) and building the treeview. Everything runs against CatalogModel
+# (see catalog.py); the treeview is a stand-in widget with the same calls
+# unless --tk is given, which needs a display (e.g. run under xvfb-run).
+#
+# Each operation is timed once on its own, then run again under tracemalloc
+# for its peak memory (skipped with --no-memory, which is much faster).
+#
+#   python benchmarks/bench_catalog.py
+#   python benchmarks/bench_catalog.py --sizes 1000,1000000 --depth 6 --fanout 4 --json
+#   xvfb-run python benchmarks/bench_catalog.py --tk --output results.json
+
+import argparse
+import gc
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import CatalogModel, iter_executables
+from model import is_entry, is_executable
+from persistence import JournalStore, atomic_write_json, copy_tree
+from settings import DATA_FILE
+from startup_cache import StartupCache
+from tree_sync import TreeviewSync
+
+EMOJIS = ["📁", "🎮", "🛠", "🎵", "🌐", "📝", "💾", "🧪"]
+
+# Substring queries for search, fuzzy queries for rank
+SEARCH_QUERIES = ["tool 12", "vendor 7", "fo", "bin/tool9", "no such entry"]
+RANK_QUERIES = ["tl12", "vnd7app", "f", "exe"]
+
+# Executables renamed for the journal save
+JOURNAL_EDITS = 1000
+
+
+def generate_catalog(size, depth=4, fanout=8, folder_ratio=0.1, seed=0):
+    # Nested dicts in the data file's shape with size folders and executables.
+    # Folders are created breadth first, up to fanout per folder and depth
+    # levels deep, the executables are spread over them at random.
+    rnd = random.Random(seed)
+    data = {}
+    folders = [data]
+    level = [data]
+    count = 0
+    folder_budget = max(1, int(size * folder_ratio))
+    for _ in range(depth):
+        next_level = []
+        for parent in level:
+            for _ in range(fanout):
+                if count >= folder_budget:
+                    break
+                folder = {}
+                parent[f"Folder {count}"] = folder
+                next_level.append(folder)
+                count += 1
+        folders.extend(next_level)
+        level = next_level
+        if not level or count >= folder_budget:
+            break
+
+    while count < size:
+        parent = rnd.choice(folders)
+        vendor = rnd.randrange(200)
+        parent[f"Tool {count}"] = {"path": f"C:/Program Files/Vendor {vendor}/App {vendor % 17}/bin/tool{count}.exe",
+                                   "emoji": rnd.choice(EMOJIS)}
+        count += 1
+    return data
+
+
+def search_tree(data, query):
+    # Filter data down to entries whose name or path contains query by
+    # walking every entry, the linear reference SearchIndex is measured against
+    filtered_data = {}
+
+    for key, value in data.items():
+        key_lower = key.lower()
+
+        # A catalog entry is either a folder or an executable
+        if is_entry(value):
+            if is_executable(value):
+                path_lower = value['path'].lower()
+                # If the executable name or path contains the query, include it
+                if query in key_lower or query in path_lower:
+                    filtered_data[key] = value
+            else:
+                # It's a folder, so we need to search recursively
+                result = search_tree(value, query)
+                if result or query in key_lower:
+                    # Include the folder if it or its children match the query
+                    filtered_data[key] = result if result else value
+
+    return filtered_data
+
+
+
+class StandInTreeview:
+    # The part of ttk.Treeview that TreeviewSync uses, kept in plain lists so
+    # the cost of each call is roughly that of the real widget without Tk
+
+    def __init__(self):
+        self.parents = {}
+        self.kids = {'': []}
+        self.options = {}
+        self.selected = ()
+        self.next_id = 0
+
+    def insert(self, parent, index, **options):
+        self.next_id += 1
+        item = f"I{self.next_id:X}"
+        siblings = self.kids[parent]
+        siblings.insert(len(siblings) if index == 'end' else index, item)
+        self.parents[item] = parent
+        self.kids[item] = []
+        self.options[item] = options
+        return item
+
+    def unlink(self, item):
+        parent = self.parents.get(item)
+        if parent is not None:
+            self.kids[parent].remove(item)
+            self.parents[item] = None
+
+    def detach(self, *items):
+        for item in items:
+            self.unlink(item)
+
+    def move(self, item, parent, index):
+        self.unlink(item)
+        self.kids[parent].insert(index, item)
+        self.parents[item] = parent
+
+    def item(self, item, **options):
+        self.options[item].update(options)
+
+    def delete(self, *items):
+        for item in items:
+            if item not in self.options:
+                continue
+            self.unlink(item)
+            for child in list(self.kids[item]):
+                self.delete(child)
+            del self.kids[item], self.parents[item], self.options[item]
+
+    def exists(self, item):
+        return item in self.options
+
+    def get_children(self, item=''):
+        return tuple(self.kids[item])
+
+    def selection(self):
+        return self.selected
+
+    def selection_set(self, items):
+        self.selected = tuple(items)
+
+
+def make_treeview(use_tk):
+    if not use_tk:
+        return StandInTreeview()
+    from tkinter import ttk
+    tree = ttk.Treeview(make_treeview.root, columns=("path",))
+    tree.pack()
+    return tree
+
+
+def operations(args):
+    # (name, setup, run) for every operation, setup returns what run takes
+    # and is not measured. Runs inside the directory holding the data file.
+
+    def loaded():
+        model = CatalogModel(store=JournalStore(DATA_FILE, snapshot=None))
+        model.load()
+        return model
+
+    def with_cache():
+        return CatalogModel(store=JournalStore(DATA_FILE, snapshot=None), cache=StartupCache("bench.cache"))
+
+    def load(model):
+        model.load()
+        if args.check_cache and model.cache is not None and not model.from_cache:
+            sys.exit("The startup cache was not used")
+
+    def search_index(model):
+        for query in SEARCH_QUERIES:
+            model.search(query)
+
+    def search_linear(model):
+        for query in SEARCH_QUERIES:
+            search_tree(model.data, query)
+
+    def rank(model):
+        for query in RANK_QUERIES:
+            model.rank(query)
+
+    def journaled():
+        model = loaded()
+        model.store.snapshot = lambda: copy_tree(model.data)
+        paths = [path for path, _ in iter_executables(model.data)][:JOURNAL_EDITS]
+        return model, paths
+
+    def save_journal(prepared):
+        model, paths = prepared
+        for path in paths:
+            model.apply({"op": "edit", "path": list(path), "name": path[-1] + " (renamed)"})
+        model.store.flush()
+        model.store.close()
+
+    def view_of(model, lazy=False):
+        return TreeviewSync(make_treeview(args.tk), model.nodes, lazy=lazy)
+
+    def synced():
+        model = loaded()
+        view = view_of(model)
+        view.sync(model.data)
+        return model, view
+
+    def searched():
+        model, view = synced()
+        filtered, branches = model.search(SEARCH_QUERIES[0])
+        return view, filtered, branches
+
+    def cleanup(view):
+        if args.tk:
+            view.tree.destroy()
+
+    def rebuild(model, lazy):
+        view = view_of(model, lazy)
+        view.sync(model.data)
+        cleanup(view)
+
+    return [
+        ("load", lambda: CatalogModel(store=JournalStore(DATA_FILE, snapshot=None)), load),
+        ("load.cache", with_cache, load),
+        ("search.index", loaded, search_index),
+        ("search.linear", loaded, search_linear),
+        ("rank", loaded, rank),
+        ("sort", loaded, lambda model: model.apply({"op": "sort"})),
+        ("save.snapshot", loaded, lambda model: atomic_write_json("bench.snapshot.json", model.data)),
+        ("save.journal", journaled, save_journal),
+        ("rebuild.full", loaded, lambda model: rebuild(model, False)),
+        ("rebuild.lazy", loaded, lambda model: rebuild(model, True)),
+        ("rebuild.resync", synced, lambda prepared: prepared[1].sync(prepared[0].data)),
+        ("rebuild.search", searched, lambda prepared: prepared[0].sync(prepared[1], expand=prepared[2])),
+    ]
+
+
+def measure(setup, run, memory):
+    # Seconds run takes and, if memory, the peak bytes it allocates on top of setup
+    prepared = setup()
+    gc.collect()
+    start = time.perf_counter()
+    run(prepared)
+    seconds = time.perf_counter() - start
+    del prepared
+
+    if not memory:
+        return seconds, None
+    prepared = setup()
+    gc.collect()
+    tracemalloc.start()
+    baseline = tracemalloc.get_traced_memory()[0]
+    run(prepared)
+    peak = tracemalloc.get_traced_memory()[1] - baseline
+    tracemalloc.stop()
+    return seconds, peak
+
+
+def bench_size(size, args):
+    data = generate_catalog(size, args.depth, args.fanout, seed=args.seed)
+    directory = tempfile.mkdtemp(prefix="bench_catalog.")
+    cwd = os.getcwd()
+    try:
+        os.chdir(directory)
+        atomic_write_json(DATA_FILE, data)
+        del data
+        # The startup cache the window would have built after a normal load
+        StartupCache("bench.cache").build()
+
+        results = []
+        for name, setup, run in operations(args):
+            if args.only and not any(name.startswith(prefix) for prefix in args.only):
+                continue
+            seconds, peak = measure(setup, run, not args.no_memory)
+            row = {"size": size, "depth": args.depth, "fanout": args.fanout, "operation": name,
+                   "seconds": seconds, "peak_bytes": peak}
+            results.append(row)
+            if not args.json:
+                memory = "" if peak is None else f"{peak / 2**20:10.1f} MiB peak"
+                print(f"{size:>9} {name:<16} {seconds * 1000:10.1f} ms {memory}", flush=True)
+        return results
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the catalog operations on synthetic catalogs.")
+    parser.add_argument("--sizes", default="1000,10000,100000",
+                        help="comma separated catalog sizes (folders and executables), up to 1000000")
+    parser.add_argument("--depth", type=int, default=4, help="levels of nested folders")
+    parser.add_argument("--fanout", type=int, default=8, help="subfolders per folder")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", type=lambda text: text.split(","), default=None,
+                        help="comma separated operation name prefixes to run, e.g. load,rebuild")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--check-cache", action="store_true", help="fail if the startup cache is not used")
+    parser.add_argument("--tk", action="store_true", help="rebuild a real ttk.Treeview (needs a display)")
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    parser.add_argument("--output", help="also write the JSON results to this file")
+    args = parser.parse_args()
+
+    if args.tk:
+        import tkinter
+        make_treeview.root = tkinter.Tk()
+        make_treeview.root.withdraw()
+
+    results = []
+    for size in (int(size) for size in args.sizes.split(",")):
+        results.extend(bench_size(size, args))
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(results, file, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# Memory used by the catalog as nested dicts versus the compact form the
+# launcher keeps it in (see model.py).
+#
+# Generates a synthetic catalog (default 100k entries) whose executables live
+# in a few thousand shared install directories, loads it from JSON both ways
+# and reports the memory each representation keeps, measured with tracemalloc.
+#
+#   python benchmarks/bench_memory.py
+#   python benchmarks/bench_memory.py --entries 250000 --json
+
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import iter_executables
+from catalog_io import iter_entries
+from model import PathTable, folder_from_json, to_json
+
+EMOJIS = ["📁", "🎮", "🛠", "🎵", "🌐", "📝", "💾", "🧪"]
+
+
+def generate_catalog(entries, seed=0, directories=2000):
+    # Nested dicts in the data file's shape with about entries folders and executables
+    rnd = random.Random(seed)
+    install_dirs = [
+        f"C:/Program Files/Vendor {rnd.randrange(200)}/Application {i}/bin/"
+        for i in range(directories)
+    ]
+    data = {}
+    folders = [data]
+    count = 0
+    while count < entries:
+        parent = rnd.choice(folders)
+        if rnd.random() < 0.05 and len(folders) < entries // 20 + 1:
+            folder = {}
+            parent[f"Folder {count}"] = folder
+            folders.append(folder)
+        else:
+            directory = rnd.choice(install_dirs)
+            parent[f"Tool {count}"] = {"path": f"{directory}tool{count}.exe", "emoji": rnd.choice(EMOJIS)}
+        count += 1
+    return data
+
+
+def measure(build):
+    # Run build and return its result, the bytes it keeps, peak bytes and seconds taken
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the memory used by the dict and model catalogs.")
+    parser.add_argument("--entries", type=int, default=100000, help="folders and executables to generate")
+    parser.add_argument("--directories", type=int, default=2000, help="distinct install directories")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", action="store_true", help="print results as JSON")
+    args = parser.parse_args()
+
+    text = json.dumps(generate_catalog(args.entries, args.seed, args.directories), indent=4)
+
+    data, dict_bytes, dict_peak, dict_time = measure(lambda: json.loads(text))
+    paths = PathTable()
+    compact, model_bytes, model_peak, model_time = measure(lambda: folder_from_json(json.loads(text), paths))
+    if to_json(compact) != data:
+        sys.exit("The model did not round-trip the catalog")
+    if any(type(value) is dict for _, value in iter_executables(compact)):
+        sys.exit("The model kept executables as dicts")
+
+    entries = sum(1 for _ in iter_entries(compact))
+    results = {
+        "entries": entries,
+        "shared_strings": len(paths),
+        "dict": {"bytes": dict_bytes, "peak_bytes": dict_peak, "seconds": dict_time},
+        "model": {"bytes": model_bytes, "peak_bytes": model_peak, "seconds": model_time},
+        "saved_ratio": 1 - model_bytes / dict_bytes,
+    }
+
+    if args.json:
+        print(json.dumps(results, indent=4))
+        return
+
+    print(f"{entries} entries, {len(paths)} shared directories and emojis")
+    for name in ("dict", "model"):
+        row = results[name]
+        print(f"{name:>6}: {row['bytes'] / 2**20:8.1f} MiB kept, {row['peak_bytes'] / 2**20:8.1f} MiB peak, "
+              f"{row['bytes'] / entries:6.0f} bytes/entry, loaded in {row['seconds']:.2f} s")
+    print(f"The model keeps {results['saved_ratio']:.0%} less memory")
+
+
+if __name__ == "__main__":
+    main()
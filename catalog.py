@@ -0,0 +1,510 @@
+# Changes to the catalog data structure, as plain records.
+#
+# Every mutation the launcher makes (add, edit, remove, move, sort) is
+# described by a small dict such as {"op": "remove", "path": ["Tools", "Foo"]}
+# and applied with apply_op. The same records are written to the change
+# journal and replayed from it on startup, so both always agree.
+#
+# Folders are kept sorted (folders first, then executables, ignoring case):
+# adds and renames carry the sibling to insert before, found by bisection,
+# so one entry goes straight to its place. Dragging can still put entries
+# anywhere, and the sort change sorts the whole catalog again.
+#
+# CatalogModel ties the data, its node ids (NodeMap) and its search index
+# together behind those records, without any UI, so the catalog logic can be
+# used and measured headless (see benchmarks/bench_catalog.py). Data comes
+# in through set_data and apply in the data file's shape, and its executables
+# are kept in the compact form of model.py. Everything here works on that
+# form only: an executable is an Executable, never a dict with a "path" key.
+# Searches may run on another thread (see search_worker.py): changes take the
+# model's lock, searches run without it and start over if the version, which
+# counts the changes, moved while they ran.
+
+import bisect
+import threading
+
+from model import PathTable, compact_op, folder_from_json, is_entry, is_executable
+from search_index import SearchIndex
+
+# Times a search runs without the lock before it waits for the catalog to hold still
+READ_ATTEMPTS = 3
+
+
+def get_level(data, path):
+    # Traverse to the folder at path, KeyError if there is no folder there
+    level = data
+    for part in path:
+        level = level[part]
+        if is_executable(level):
+            raise KeyError(part)
+    return level
+
+
+def lookup(data, path):
+    # The entry at path, or None if there is none
+    value = data
+    for part in path:
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def iter_executables(level, path=(), recursive=True):
+    # (path, executable) for every executable in a folder, in catalog order
+    for key, value in level.items():
+        if is_executable(value):
+            yield path + (key,), value
+        elif recursive and isinstance(value, dict):
+            yield from iter_executables(value, path + (key,), recursive)
+
+
+def sort_key(name, folder):
+    # Folders before executables, then by name ignoring case
+    return (not folder, name.lower(), name)
+
+
+def sorted_before(level, name, value, skip=()):
+    # The entry of a sorted folder that name should be inserted before to keep
+    # it sorted, None for the end. Entries named in skip are left out.
+    # Folders and executables are shown apart, so only entries of the same kind
+    # are searched, in folder order even where dragging left it unsorted
+    # (TreeviewSync.place finds the same spot among the shown items).
+    folder = not is_executable(value)
+    key_of = lambda key: sort_key(key, folder)
+    new_key = sort_key(name, folder)
+    # Entries that arrive in order (e.g. from an import) go at the end
+    if level and name not in level and not skip:
+        last = next(reversed(level))
+        if sort_key(last, not is_executable(level[last])) <= new_key:
+            return None
+    names = [key for key in level if key != name and key not in skip and is_executable(level[key]) != folder]
+    index = bisect.bisect_left(names, new_key, key=key_of)
+    if index < len(names):
+        return names[index]
+    following = None
+    if folder:
+        # Right after the last folder, in front of the executables of a sorted folder
+        for key in reversed(level):
+            if key == name or key in skip:
+                continue
+            if not is_executable(level[key]):
+                break
+            following = key
+    return following
+
+
+def insert_before(level, name, value, before):
+    # Put value into level as name, in front of before (at the end if None)
+    level.pop(name, None)
+    if before is None or before not in level:
+        level[name] = value
+        return
+    # Rebuild the folder to place the item before its new sibling
+    items = []
+    for key, sibling in level.items():
+        if key == before:
+            items.append((name, value))
+        items.append((key, sibling))
+    level.clear()
+    level.update(items)
+
+
+def sort_tree(data):
+    # Sort folders and executables alphabetically, folders first
+    folders = [key for key, value in data.items() if not is_executable(value)]
+    executables = [key for key, value in data.items() if is_executable(value)]
+
+    sorted_data = {}
+    for folder_name in sorted(folders, key=lambda key: sort_key(key, True)):
+        value = data[folder_name]
+        sorted_data[folder_name] = sort_tree(value) if isinstance(value, dict) else value
+
+    for exe_name in sorted(executables, key=lambda key: sort_key(key, False)):
+        sorted_data[exe_name] = data[exe_name]
+
+    return sorted_data
+
+
+def target_path(op):
+    # Where the changed entry lives after op, None if it is gone
+    kind = op['op']
+    if kind == 'add':
+        return list(op['path'])
+    if kind == 'edit':
+        return list(op['path'][:-1]) + [op['name']]
+    if kind == 'move':
+        return list(op['to']) + [op['path'][-1]]
+    return None
+
+
+def apply_op(data, op):
+    # Apply one change record to data, raises KeyError if a path doesn't exist
+    kind = op['op']
+
+    if kind == 'add':
+        # {"op": "add", "path": [...], "value": {} or {"path": ..., "emoji": ...},
+        #  "before": sibling name or None (optional)}
+        level = get_level(data, op['path'][:-1])
+        insert_before(level, op['path'][-1], op['value'], op.get('before'))
+
+    elif kind == 'edit':
+        # {"op": "edit", "path": [...], "name": new name, "value": new executable (optional),
+        #  "before": sibling name or None (optional)}
+        level = get_level(data, op['path'][:-1])
+        value = level.pop(op['path'][-1])
+        insert_before(level, op['name'], op.get('value', value), op.get('before'))
+
+    elif kind == 'remove':
+        # {"op": "remove", "path": [...]}
+        level = get_level(data, op['path'][:-1])
+        del level[op['path'][-1]]
+
+    elif kind == 'move':
+        # {"op": "move", "path": [...], "to": [folder path], "before": sibling name or None}
+        name = op['path'][-1]
+        if list(op['to'][:len(op['path'])]) == list(op['path']):
+            raise ValueError("Cannot move a folder into itself")
+        target = get_level(data, op['to'])
+        value = get_level(data, op['path'][:-1]).pop(name)
+        insert_before(target, name, value, op.get('before'))
+
+    elif kind == 'sort':
+        # {"op": "sort"}
+        sorted_data = sort_tree(data)
+        data.clear()
+        data.update(sorted_data)
+
+    else:
+        raise ValueError(f"Unknown change: {kind}")
+
+
+# Ends of the entry order in diff_ops
+START = object()
+END = object()
+
+
+def diff_ops(old, new, prefix=()):
+    # Change records that turn the catalog old into new, folder by folder.
+    # Folders that are the same dict (see undo.py) are equal without a look inside.
+    if old is new:
+        return []
+
+    def same_kind(key):
+        return is_entry(new.get(key)) and is_executable(old[key]) == is_executable(new[key])
+
+    # Entries that are gone, or turned from a folder into an executable (or back)
+    ops = []
+    for key, value in old.items():
+        if is_entry(value) and not same_kind(key):
+            ops.append({"op": "remove", "path": list(prefix) + [key]})
+
+    # Order of the entries as the ops so far leave it, linked through next_of
+    # and previous_of between the START and END markers
+    order = [START] + [key for key, value in old.items() if is_entry(value) and same_kind(key)] + [END]
+    next_of = dict(zip(order, order[1:]))
+    previous_of = dict(zip(order[1:], order))
+
+    # Walk new backwards so every entry can be placed before its successor
+    following = None
+    for key in reversed(list(new)):
+        value = new[key]
+        if not is_entry(value):
+            continue
+        path = list(prefix) + [key]
+        current = old.get(key)
+        successor = following if following is not None else END
+        known = key in next_of
+        in_place = known and next_of[key] == successor
+        if not known:
+            ops.append({"op": "add", "path": path, "value": value, "before": following})
+        elif is_executable(value):
+            if current != value or not in_place:
+                ops.append({"op": "edit", "path": path, "name": key, "value": value, "before": following})
+        else:
+            if not in_place:
+                ops.append({"op": "move", "path": path, "to": list(prefix), "before": following})
+            ops.extend(diff_ops(current, value, path))
+        if not in_place:
+            if known:
+                next_of[previous_of[key]] = next_of[key]
+                previous_of[next_of[key]] = previous_of[key]
+            next_of[previous_of[successor]] = key
+            previous_of[key] = previous_of[successor]
+            next_of[key] = successor
+            previous_of[successor] = key
+        following = key
+    return ops
+
+
+ROOT = 0
+
+
+class NodeMap:
+    # Stable ids for every folder and executable in the catalog.
+    #
+    # A node keeps its id when it is renamed, edited, moved or sorted, so the
+    # treeview can map its items to nodes instead of to paths or display text.
+    # The root folder (the data structure itself) is node ROOT.
+
+    def __init__(self):
+        self.build({})
+
+    def build(self, data):
+        # Number the whole catalog from scratch (done once at load time)
+        # node id -> parent node id and name
+        self.parents = {}
+        self.names = {}
+        # folder node id -> {name: child node id}
+        self.children = {ROOT: {}}
+        self.next_id = ROOT + 1
+        for key, value in data.items():
+            self.add(ROOT, key, value)
+
+    def add(self, parent_id, name, value):
+        # Give an entry and, for folders, everything below it a new id
+        if not is_entry(value):
+            return None
+        node_id = self.next_id
+        self.next_id += 1
+        self.parents[node_id] = parent_id
+        self.names[node_id] = name
+        self.children[parent_id][name] = node_id
+        if not is_executable(value):
+            self.children[node_id] = {}
+            for key, child in value.items():
+                self.add(node_id, key, child)
+        return node_id
+
+    def is_folder(self, node_id):
+        return node_id in self.children
+
+    def id_of(self, path):
+        # The node at path, or None if there is none
+        node_id = ROOT
+        for part in path:
+            node_id = self.children.get(node_id, {}).get(part)
+            if node_id is None:
+                return None
+        return node_id
+
+    def path_of(self, node_id):
+        # Names from the top level down to the node
+        path = []
+        while node_id != ROOT:
+            path.append(self.names[node_id])
+            node_id = self.parents[node_id]
+        path.reverse()
+        return path
+
+    def subtree(self, node_id):
+        # The node and everything below it, parents before children
+        nodes = [node_id]
+        for node in nodes:
+            nodes.extend(self.children.get(node, {}).values())
+        return nodes
+
+    def drop(self, node_id):
+        # Forget a node and everything below it
+        if node_id is None:
+            return
+        del self.children[self.parents[node_id]][self.names[node_id]]
+        for node in self.subtree(node_id):
+            del self.parents[node]
+            del self.names[node]
+            self.children.pop(node, None)
+
+    def attach(self, node_id, parent_id, name):
+        # Put a node under parent_id as name, dropping whatever was there
+        siblings = self.children[parent_id]
+        if siblings.get(name, node_id) != node_id:
+            self.drop(siblings[name])
+        siblings[name] = node_id
+        self.parents[node_id] = parent_id
+        self.names[node_id] = name
+
+    def apply(self, op):
+        # Follow a change record that apply_op has already made to the data
+        kind = op['op']
+        if kind == 'add':
+            parent_id = self.id_of(op['path'][:-1])
+            self.drop(self.children[parent_id].get(op['path'][-1]))
+            self.add(parent_id, op['path'][-1], op['value'])
+        elif kind == 'edit':
+            parent_id = self.id_of(op['path'][:-1])
+            node_id = self.children[parent_id].pop(op['path'][-1])
+            self.attach(node_id, parent_id, op['name'])
+        elif kind == 'remove':
+            self.drop(self.id_of(op['path']))
+        elif kind == 'move':
+            node_id = self.id_of(op['path'])
+            del self.children[self.parents[node_id]][self.names[node_id]]
+            self.attach(node_id, self.id_of(op['to']), self.names[node_id])
+        # Sorting only reorders entries, their ids stay the same
+
+
+def search_in(data, index, query):
+    # CatalogModel.search on data and its index
+    matches = index.query(query)
+    return index.filter(data, matches), index.branches(matches)
+
+
+def rank_in(data, index, query, usage=None, usage_weight=4.0, limit=50):
+    # CatalogModel.rank on data and its index
+    boost = None
+    if usage is not None:
+        boost = lambda path: usage(lookup(data, path)['path'])
+    return index.rank(query, boost=boost, boost_weight=usage_weight, limit=limit)
+
+
+class CatalogModel:
+    # The catalog data with its node ids and search index, kept in step by
+    # applying change records. Observers are called as observer(event, node_id)
+    # with "remove" just before a node (and everything below it) is dropped,
+    # "move" after a node moved to another folder and "edit" after an
+    # executable got a new path or emoji.
+
+    def __init__(self, store=None, cache=None):
+        # Storage engine (see persistence.py) and optional startup cache
+        self.store = store
+        self.cache = cache
+        self.data = {}
+        # Directories and emojis shared by the executables
+        self.paths = PathTable()
+        self.nodes = NodeMap()
+        self.index = SearchIndex()
+        self.observers = []
+        # Whether the last load() came from the startup cache
+        self.from_cache = False
+        # Held while the data changes, version counts the changes
+        self.lock = threading.RLock()
+        self.version = 0
+
+    def set_data(self, data):
+        # Number and index data from scratch
+        with self.lock:
+            self.paths = PathTable()
+            data = self.data = folder_from_json(data, self.paths)
+            self.nodes.build(data)
+            self.index.build(data)
+            self.version += 1
+
+    def load(self):
+        # Load the catalog, from the startup cache if it is current, otherwise
+        # through the storage engine (whose errors are passed on)
+        cached = self.cache.load() if self.cache is not None else None
+        self.from_cache = cached is not None
+        if cached is not None:
+            with self.lock:
+                self.data = cached['data']
+                self.paths = cached['paths']
+                self.nodes = cached['nodes']
+                self.index = cached['index']
+                self.version += 1
+            self.store.resume(cached['store_state'])
+        else:
+            self.set_data(self.store.load())
+        return self.data
+
+    def save_cache(self):
+        # Write the startup cache from the data as it is, once the storage
+        # engine is closed (skipped if the files may hold something else)
+        if self.cache is not None:
+            self.cache.save(self.data, self.paths, self.nodes, self.index, self.store.saved_state)
+
+    def entry_count(self):
+        return len(self.index.entries)
+
+    def notify(self, event, node_id):
+        for observer in self.observers:
+            observer(event, node_id)
+
+    def compact(self, op):
+        # op with its value in the in-memory form, op itself is left alone
+        return compact_op(op, self.paths)
+
+    def apply(self, op, record=True):
+        # Apply one change to the data, the node ids, the search index and the
+        # storage engine; raises like apply_op without changing anything.
+        # record=False for changes that are already stored (e.g. by another window).
+        # Returns the change as applied, with its value in the in-memory form.
+        stored = op
+        op = self.compact(op)
+        with self.lock:
+            old_path = op.get('path')
+            new_path = target_path(op)
+            old_value = lookup(self.data, old_path) if old_path is not None else None
+            replaced = lookup(self.data, new_path) if new_path not in (None, old_path) else None
+
+            apply_op(self.data, op)
+
+            # Unindex the entry that changed and anything it replaced
+            if old_value is not None:
+                self.index.remove(old_path, old_value)
+            if replaced is not None:
+                self.index.remove(new_path, replaced)
+            if new_path is not None:
+                self.index.add(new_path, lookup(self.data, new_path))
+
+            # Nodes that are removed or overwritten go, renamed and moved ones keep their ids
+            if op['op'] == 'remove':
+                self.notify('remove', self.nodes.id_of(old_path))
+            elif replaced is not None or op['op'] == 'add':
+                doomed = self.nodes.id_of(new_path)
+                if doomed is not None:
+                    self.notify('remove', doomed)
+            self.nodes.apply(op)
+            if op['op'] == 'move':
+                self.notify('move', self.nodes.id_of(new_path))
+            elif op['op'] == 'edit' and 'value' in op:
+                self.notify('edit', self.nodes.id_of(new_path))
+            self.version += 1
+
+            if record and self.store is not None:
+                self.store.record(stored)
+        return op
+
+    def place_sorted(self, op):
+        # Fill in where an add or edit puts its entry, so its folder stays sorted
+        path = op['path']
+        level = get_level(self.data, path[:-1])
+        value = self.compact(op).get('value')
+        if op['op'] == 'add':
+            op['before'] = sorted_before(level, path[-1], value)
+        else:
+            op['before'] = sorted_before(level, op['name'], level[path[-1]] if value is None else value,
+                                         skip=(path[-1],))
+        return op
+
+    def read(self, reader, query, **options):
+        # reader(data, index, query, **options) run without holding the lock,
+        # as (version, result). The lock is only taken to get the version with
+        # the data and index that go with it and to check the version again
+        # afterwards. If the catalog changed meanwhile the reader runs again,
+        # after READ_ATTEMPTS tries with the lock held, so a catalog that keeps
+        # changing can't hold a search off for ever.
+        for _ in range(READ_ATTEMPTS):
+            with self.lock:
+                version, data, index = self.version, self.data, self.index
+            try:
+                result = reader(data, index, query, **options)
+            except (RuntimeError, KeyError, IndexError, TypeError, AttributeError):
+                # Caught halfway through a change, a real error if nothing changed
+                with self.lock:
+                    if self.version == version:
+                        raise
+                continue
+            with self.lock:
+                if self.version == version:
+                    return version, result
+        with self.lock:
+            return self.version, reader(self.data, self.index, query, **options)
+
+    def search(self, query):
+        # The data filtered down to entries matching query, and the folders
+        # that hold a match
+        return self.read(search_in, query)[1]
+
+    def rank(self, query, usage=None, usage_weight=4.0, limit=50):
+        # Best fuzzy matches as (score, path), usage(exe path) boosts an executable
+        return self.read(rank_in, query, usage=usage, usage_weight=usage_weight, limit=limit)[1]
@@ -0,0 +1,235 @@
+# Catalog files for exchanging catalogs, read and written one entry at a time.
+#
+# Two formats, chosen by file extension:
+#
+# NDJSON (.ndjson, .jsonl): one JSON object per line, folders as
+#   {"path": ["Tools", "Editors"]} and executables as
+#   {"path": ["Tools", "Editors", "Notepad"], "exe": "C:/...", "emoji": "..."}
+#
+# CSV (.csv): a header row, then one row per entry with the columns type
+#   ("folder" or "executable"), folder (the folders above the entry joined
+#   with "/", a "/" or "\" inside a name is escaped with "\"), name, path
+#   and emoji.
+#
+# Entries are written folders before their contents, in catalog order, so a
+# file can be read back a line at a time without ever holding it in memory.
+# CatalogReader yields its entries as it goes and reports how far into the
+# file it got; the launcher merges them into the catalog in short chunks.
+# CatalogExporter writes a snapshot of the catalog on a worker thread.
+
+import csv
+import io
+import json
+import os
+import threading
+import time
+
+from catalog import is_entry, is_executable
+from persistence import atomic_file
+
+CSV_COLUMNS = ("type", "folder", "name", "path", "emoji")
+
+
+def file_format(path):
+    # "csv" or "ndjson", from the file extension
+    return "csv" if path.lower().endswith(".csv") else "ndjson"
+
+
+def join_folder(parts):
+    return "/".join(part.replace("\\", "\\\\").replace("/", "\\/") for part in parts)
+
+
+def split_folder(text):
+    # Folder parts of a CSV folder column, the reverse of join_folder
+    parts = []
+    current = []
+    escaped = False
+    for char in text:
+        if escaped:
+            current.append(char)
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif char == "/":
+            parts.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    if text:
+        parts.append("".join(current))
+    return parts
+
+
+def iter_entries(level, path=()):
+    # (path, value) of every folder and executable, each folder before its contents
+    for key, value in level.items():
+        if not is_entry(value):
+            continue
+        yield path + (key,), value
+        if not is_executable(value):
+            yield from iter_entries(value, path + (key,))
+
+
+def make_entry(parts, exe_path=None, emoji=""):
+    # (path tuple, value) of a read entry, ValueError if it makes no sense
+    if not parts or not all(isinstance(part, str) and part for part in parts):
+        raise ValueError("every entry needs a non-empty name and folder names")
+    if exe_path is None:
+        return tuple(parts), {}
+    if not isinstance(exe_path, str) or not isinstance(emoji, str):
+        raise ValueError("exe and emoji must be text")
+    return tuple(parts), {"path": exe_path, "emoji": emoji}
+
+
+class CatalogReader:
+    # Reads the entries of a catalog file one at a time. Lines that can't be
+    # read are counted in errors and skipped.
+
+    def __init__(self, path):
+        self.path = path
+        self.format = file_format(path)
+        self.file = open(path, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+        # Bytes and lines read so far
+        self.position = 0
+        self.line = 0
+        self.errors = 0
+        self.last_error = None
+
+    def lines(self):
+        for raw in self.file:
+            self.position += len(raw)
+            self.line += 1
+            if self.line == 1 and raw.startswith(b'\xef\xbb\xbf'):
+                # Byte order mark some editors put at the start
+                raw = raw[3:]
+            yield raw.decode('utf-8')
+
+    def entries(self):
+        # (path tuple, value) of every entry, value is {} for a folder
+        if self.format == "csv":
+            yield from self.csv_entries()
+        else:
+            yield from self.ndjson_entries()
+
+    def ndjson_entries(self):
+        for line in self.lines():
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                yield make_entry(record['path'], record.get('exe'), record.get('emoji', ""))
+            except (ValueError, KeyError, TypeError, AttributeError) as error:
+                self.skip(error)
+
+    def csv_entries(self):
+        rows = csv.reader(self.lines())
+        header = None
+        while True:
+            try:
+                row = next(rows)
+            except StopIteration:
+                return
+            except csv.Error as error:
+                self.skip(error)
+                continue
+            if not row:
+                continue
+            if header is None:
+                header = {name.strip().lower(): index for index, name in enumerate(row)}
+                if not {"type", "folder", "name"} <= header.keys():
+                    self.skip(ValueError("the header needs type, folder and name columns"))
+                    return
+                continue
+            column = lambda name: row[header[name]] if name in header and header[name] < len(row) else ""
+            try:
+                parts = split_folder(column("folder")) + [column("name")]
+                kind = column("type").strip().lower()
+                if kind == "folder":
+                    yield make_entry(parts)
+                elif kind == "executable":
+                    yield make_entry(parts, column("path"), column("emoji"))
+                else:
+                    raise ValueError(f"unknown type '{kind}'")
+            except ValueError as error:
+                self.skip(error)
+
+    def skip(self, error):
+        self.errors += 1
+        self.last_error = f"line {self.line}: {error}"
+
+    def progress(self):
+        # Fraction of the file read so far
+        return self.position / self.size if self.size else 1.0
+
+    def close(self):
+        self.file.close()
+
+
+def write_catalog(data, path, progress=None):
+    # Write data to a catalog file in the format of its extension, replacing
+    # it only once complete. progress(entries written) is called as it goes.
+    with atomic_file(path) as raw:
+        text = io.TextIOWrapper(raw, encoding='utf-8', newline='')
+        writer = csv.writer(text) if file_format(path) == "csv" else None
+        if writer is not None:
+            writer.writerow(CSV_COLUMNS)
+        written = 0
+        for entry_path, value in iter_entries(data):
+            if writer is not None:
+                if is_executable(value):
+                    writer.writerow(("executable", join_folder(entry_path[:-1]), entry_path[-1],
+                                     value['path'], value.get('emoji', "")))
+                else:
+                    writer.writerow(("folder", join_folder(entry_path[:-1]), entry_path[-1], "", ""))
+            else:
+                record = {"path": list(entry_path)}
+                if is_executable(value):
+                    record["exe"] = value['path']
+                    record["emoji"] = value.get('emoji', "")
+                text.write(json.dumps(record, ensure_ascii=False) + "\n")
+            written += 1
+            if progress is not None:
+                progress(written)
+        text.flush()
+        # Leave closing the file to atomic_file
+        text.detach()
+    return written
+
+
+class CatalogExporter:
+    def __init__(self):
+        self.thread = None
+        self.path = None
+        self.total = 0
+        self.written = 0
+        self.error = None
+        self.seconds = 0.0
+
+    def start(self, data, path, total):
+        # Write data (a snapshot nobody changes meanwhile, see copy_tree) to
+        # path in the background, total is its number of entries. False if an
+        # export is already running.
+        if self.running():
+            return False
+        self.path = path
+        self.total = total
+        self.written = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.write, args=(data, path), name="catalog-export", daemon=True)
+        self.thread.start()
+        return True
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def write(self, data, path):
+        start = time.perf_counter()
+        try:
+            write_catalog(data, path, progress=self.note_written)
+        except (OSError, ValueError) as error:
+            self.error = error
+        self.seconds = time.perf_counter() - start
+
+    def note_written(self, written):
+        self.written = written
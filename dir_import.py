@@ -0,0 +1,175 @@
+# Importing a directory tree of executables into the catalog.
+#
+# DirectoryImporter walks the chosen directory with os.scandir on a worker
+# thread and queues every matching file as (folder parts relative to the
+# directory, file name, full path). The Tk thread takes them in chunks and
+# adds them to the catalog, mirroring the directory layout as folders.
+# ImportRules decides what counts as an executable: file extensions, glob
+# patterns and/or the exec bit.
+#
+# After a complete walk, plan_removals() lists the executables of an earlier
+# import that are no longer there, so importing the same directory again only
+# adds and removes what changed. Whatever is under a directory (or entry) the
+# walk could not read is kept, it may well still be there.
+
+import fnmatch
+import os
+import stat
+import threading
+import time
+
+from catalog import iter_executables
+
+
+def same_path(path):
+    # Key under which two spellings of the same file path compare equal
+    return os.path.normcase(os.path.normpath(path))
+
+
+class ImportRules:
+    def __init__(self, extensions=(), globs=(), exec_bit=False, skip_hidden=True):
+        self.extensions = tuple(extension.lower() for extension in extensions)
+        self.globs = tuple(glob.lower() for glob in globs)
+        self.exec_bit = exec_bit
+        # Leave out directories whose name starts with a dot
+        self.skip_hidden = skip_hidden
+
+    @classmethod
+    def parse(cls, text, skip_hidden=True):
+        # Rules from text such as ".exe .bat *.AppImage +x": words starting with
+        # a dot are extensions, "+x" matches files with the exec bit set and
+        # anything else is a glob matched against the file name
+        extensions = []
+        globs = []
+        exec_bit = False
+        for word in text.split():
+            if word == "+x":
+                exec_bit = True
+            elif word.startswith(".") and not any(char in word for char in "*?["):
+                extensions.append(word)
+            else:
+                globs.append(word)
+        return cls(extensions, globs, exec_bit, skip_hidden)
+
+    def __bool__(self):
+        return bool(self.extensions or self.globs or self.exec_bit)
+
+    def matches(self, entry):
+        # Whether a file (an os.DirEntry) should be imported
+        name = entry.name.lower()
+        if name.endswith(self.extensions):
+            return True
+        if any(fnmatch.fnmatchcase(name, glob) for glob in self.globs):
+            return True
+        if self.exec_bit:
+            try:
+                mode = entry.stat().st_mode
+            except OSError:
+                return False
+            return stat.S_ISREG(mode) and bool(mode & 0o111)
+        return False
+
+
+def plan_removals(folder, directory, seen, unreadable=()):
+    # Paths (relative to folder) of the executables in folder that point into
+    # directory but were not in seen, the same_path keys a complete walk found,
+    # leaving out those at or below the unreadable same_path keys
+    prefix = same_path(directory).rstrip(os.sep) + os.sep
+    unreadable = set(unreadable)
+    blocked = tuple(key.rstrip(os.sep) + os.sep for key in unreadable)
+    for path, value in iter_executables(folder):
+        key = same_path(value['path'])
+        if key.startswith(prefix) and key not in seen and key not in unreadable and not key.startswith(blocked):
+            yield path
+
+
+class DirectoryImporter:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.cancelled = False
+        # (folder parts, file name, full path) waiting for the Tk thread
+        self.results = []
+        # same_path keys of every file found, complete once the walk finished
+        self.seen = set()
+        # same_path keys of the directories and entries that could not be read
+        self.unreadable = []
+        self.complete = False
+        self.directories = 0
+        self.matched = 0
+        self.errors = 0
+        self.last_error = None
+        self.seconds = 0.0
+
+    def start(self, directory, rules):
+        # Walk directory in the background, False if a walk is already running
+        if self.running():
+            return False
+        self.cancelled = False
+        self.complete = False
+        with self.lock:
+            self.results = []
+        self.seen = set()
+        self.unreadable = []
+        self.directories = self.matched = self.errors = 0
+        self.last_error = None
+        self.thread = threading.Thread(target=self.walk, args=(directory, rules), name="directory-import", daemon=True)
+        self.thread.start()
+        return True
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def pending(self):
+        with self.lock:
+            return len(self.results)
+
+    def take_results(self, limit):
+        # Up to limit results, in the order they were found
+        with self.lock:
+            results = self.results[:limit]
+            del self.results[:limit]
+            return results
+
+    def walk(self, directory, rules):
+        start = time.perf_counter()
+        # Depth first, names in order, so folders fill up one at a time
+        stack = [((), directory)]
+        while stack:
+            if self.cancelled:
+                return
+            parts, current = stack.pop()
+            subdirectories = []
+            found = []
+            try:
+                with os.scandir(current) as entries:
+                    for entry in sorted(entries, key=lambda entry: entry.name.lower()):
+                        try:
+                            # Symlinked directories are not followed, they could loop
+                            if entry.is_dir(follow_symlinks=False):
+                                if not (rules.skip_hidden and entry.name.startswith(".")):
+                                    subdirectories.append((parts + (entry.name,), entry.path))
+                            elif entry.is_file() and rules.matches(entry):
+                                found.append((parts, entry.name, entry.path))
+                                self.seen.add(same_path(entry.path))
+                        except OSError as error:
+                            self.errors += 1
+                            self.last_error = error
+                            self.unreadable.append(same_path(entry.path))
+            except OSError as error:
+                # Unreadable directory, keep walking the rest
+                self.errors += 1
+                self.last_error = error
+                self.unreadable.append(same_path(current))
+                continue
+            self.directories += 1
+            self.matched += len(found)
+            if found:
+                with self.lock:
+                    self.results.extend(found)
+            stack.extend(reversed(subdirectories))
+        self.seconds = time.perf_counter() - start
+        self.complete = True
@@ -0,0 +1,202 @@
+# Drag and drop for the catalog treeview, at most one update per frame.
+#
+# <B1-Motion> fires far more often than the screen refreshes. Motion events
+# only remember where the pointer is; the actual work (finding the row under
+# it, highlighting that row, moving the floating label and scrolling near the
+# edges) runs once per FRAME_MS from an after() callback, for the latest
+# position only.
+#
+# Rows are found through RowCache: the first lookup measures the row height,
+# and every row the pointer visits costs one identify_row call, after which
+# it is answered without asking Tk. The cache is dropped whenever the tree
+# scrolls.
+
+import time
+import tkinter as tk
+
+from instrumentation import profiled
+
+# Frame interval, about 60 per second
+FRAME_MS = 16
+# Within this many pixels of the top or bottom edge the tree scrolls by one
+# row every AUTOSCROLL_MS while the pointer stays there
+AUTOSCROLL_EDGE = 20
+AUTOSCROLL_MS = 60
+# How far the pointer has to move before a press becomes a drag
+DRAG_THRESHOLD = 4
+
+
+class RowCache:
+    def __init__(self, tree):
+        self.tree = tree
+        self.clear()
+
+    def clear(self):
+        # Row band -> item id, bands are row_height pixels tall starting at origin
+        self.rows = {}
+        self.row_height = None
+        self.origin = 0
+
+    def row_at(self, y):
+        # The item at y pixels from the top of the tree, '' for none
+        if self.row_height is not None:
+            band = (y - self.origin) // self.row_height
+            item_id = self.rows.get(band)
+            if item_id is None:
+                item_id = self.rows[band] = self.tree.identify_row(y)
+            return item_id
+
+        item_id = self.tree.identify_row(y)
+        box = self.tree.bbox(item_id) if item_id else None
+        if box:
+            # (x, y, width, height) of the row, every row is as tall
+            self.origin = box[1]
+            self.row_height = box[3]
+            self.rows[(y - self.origin) // self.row_height] = item_id
+        return item_id
+
+
+class DragController:
+    # Calls on_drop(item_id, target item id or '') when an item is dropped.
+    # profiler (see instrumentation.py) times every frame as drag_frame.
+
+    def __init__(self, root, tree, on_drop, profiler):
+        self.root = root
+        self.tree = tree
+        self.on_drop = on_drop
+        self.profiler = profiler
+        self.rows = RowCache(tree)
+
+        self.item = None
+        self.label = None
+        self.dragging = False
+        self.press_at = None
+        # Latest pointer position as (x, y) in the tree, (x, y) on the screen
+        self.pointer = None
+        self.frame_after = None
+        self.target = None
+        self.scroll_top = None
+
+        self.events = 0
+        self.frames = 0
+        self.last_frame_ms = 0.0
+        self.max_frame_ms = 0.0
+        self.total_frame_ms = 0.0
+
+    def press(self, event):
+        self.cancel()
+        item_id = self.tree.identify_row(event.y)
+        if item_id:
+            self.item = item_id
+            self.press_at = (event.x, event.y)
+
+    def motion(self, event):
+        # Just note the position, the next frame deals with it
+        if self.item is None:
+            return
+        self.events += 1
+        self.pointer = ((event.x, event.y), (event.x_root, event.y_root))
+        if self.frame_after is None:
+            self.frame_after = self.root.after(FRAME_MS, self.drag_frame)
+
+    @profiled
+    def drag_frame(self):
+        self.frame_after = None
+        if self.item is None or self.pointer is None:
+            return
+        start = time.perf_counter()
+        (x, y), (x_root, y_root) = self.pointer
+
+        if not self.dragging:
+            if not self.moved_away(x, y):
+                # Still a click, not a drag
+                return
+            self.start_drag()
+
+        # Rows moved if the tree scrolled (wheel or autoscroll)
+        top = self.tree.yview()[0]
+        if top != self.scroll_top:
+            self.scroll_top = top
+            self.rows.clear()
+
+        # Highlight the potential drop target
+        target = self.rows.row_at(y)
+        if target != self.target:
+            self.target = target
+            if target:
+                self.tree.selection_set(target)
+
+        # Move the floating label to follow the mouse cursor, offset for better visibility
+        self.label.place(x=x_root - self.root_x + 10, y=y_root - self.root_y + 10)
+
+        # Scroll while the pointer is near the top or bottom edge
+        step = -1 if y < AUTOSCROLL_EDGE else 1 if y > self.tree_height - AUTOSCROLL_EDGE else 0
+        if step:
+            self.tree.yview_scroll(step, 'units')
+            self.frame_after = self.root.after(AUTOSCROLL_MS, self.drag_frame)
+
+        elapsed = (time.perf_counter() - start) * 1000
+        self.frames += 1
+        self.last_frame_ms = elapsed
+        self.total_frame_ms += elapsed
+        self.max_frame_ms = max(self.max_frame_ms, elapsed)
+
+    def moved_away(self, x, y):
+        return abs(x - self.press_at[0]) >= DRAG_THRESHOLD or abs(y - self.press_at[1]) >= DRAG_THRESHOLD
+
+    def start_drag(self):
+        self.dragging = True
+        self.target = None
+        self.scroll_top = None
+        # Geometry that doesn't change during a drag
+        self.root_x = self.root.winfo_rootx()
+        self.root_y = self.root.winfo_rooty()
+        self.tree_height = self.tree.winfo_height()
+        # Create a floating label to follow the mouse cursor
+        self.label = tk.Label(
+            self.root,
+            text=self.tree.item(self.item, 'text'),
+            relief='solid',
+            bg='#333333',  # Dark background color
+            fg='white',    # White text color for contrast
+            font=('Arial', 10, 'bold'),  # Bold font for better readability
+            padx=5,        # Padding for a cleaner look
+            pady=2
+        )
+
+    def release(self, event):
+        if self.item is None:
+            return
+        item_id = self.item
+        # Released before the first frame of the drag came round, still a drop
+        dragging = self.dragging or self.moved_away(event.x, event.y)
+        target = None
+        if dragging:
+            if self.tree.yview()[0] != self.scroll_top:
+                self.rows.clear()
+            target = self.rows.row_at(event.y)
+        self.cancel()
+        if dragging:
+            self.on_drop(item_id, target)
+
+    def cancel(self):
+        # Forget the drag, e.g. once the item was dropped
+        if self.frame_after is not None:
+            self.root.after_cancel(self.frame_after)
+            self.frame_after = None
+        if self.label is not None:
+            self.label.destroy()
+            self.label = None
+        self.item = None
+        self.dragging = False
+        self.pointer = None
+        self.rows.clear()
+
+    def stats(self):
+        return {
+            "events": self.events,
+            "frames": self.frames,
+            "last_frame_ms": self.last_frame_ms,
+            "avg_frame_ms": self.total_frame_ms / self.frames if self.frames else 0.0,
+            "max_frame_ms": self.max_frame_ms,
+        }
@@ -1,15 +1,103 @@
 import tkinter as tk
 from tkinter import ttk, messagebox, simpledialog, filedialog
 import json
-import subprocess
 import os
-
-DATA_FILE = "tree_data.json"
+import time
+
+from catalog import ROOT, CatalogModel, apply_op, diff_ops, is_executable, iter_executables, lookup, target_path
+from catalog_io import CatalogExporter, CatalogReader
+from drag_drop import DragController
+from dir_import import DirectoryImporter, ImportRules, plan_removals, same_path
+from health_scan import HealthScanner
+from history import LaunchHistory
+from instrumentation import OperationProfiler, profiled
+from launcher import LaunchSupervisor
+from model import from_json, json_default
+from persistence import JournalStore, WriteBehindSaver, copy_tree
+from process_monitor import ProcessMonitor
+from settings import (DATA_FILE, FRECENCY_HALF_LIFE_DAYS, FRECENCY_WEIGHT, HISTORY_FILE,
+                      JOURNAL_COMPACT_BYTES, MONITOR_INTERVAL, PROFILE_OPERATIONS,
+                      STARTUP_CACHE_FILE, STORAGE_BACKEND, USAGE_FILE)
+from search_worker import SearchWorker
+from startup_cache import StartupCache
+from tree_sync import TreeviewSync
+from undo import UndoHistory
+
+# Storage and launch history settings are in settings.py
+
+# Catalogs with more entries than this only create treeview items for opened folders
+LAZY_THRESHOLD = 5000
+# In lazy mode, collapsed folders are emptied again once this many items exist
+LAZY_ITEM_BUDGET = 20000
+
+# A stale startup cache is rebuilt in the background this long after startup
+STARTUP_CACHE_DELAY_MS = 3000
+
+# How often the Running window refreshes, in milliseconds
+RUNNING_REFRESH_MS = 1000
+# How often the usage columns of running executables are updated, in milliseconds
+USAGE_REFRESH_MS = 1000
+
+# Launching a whole folder starts at most this many executables at once (0 for
+# no limit), waiting this many milliseconds between two starts
+BATCH_MAX_RUNNING = 4
+BATCH_STAGGER_MS = 250
+
+# Executable paths are checked in the background shortly after startup, with
+# sizes, mtimes and hashes cached in HEALTH_CACHE_FILE between runs
+HEALTH_CACHE_FILE = "tree_data.health.json"
+HEALTH_SCAN_DELAY_MS = 2000
+HEALTH_SCAN_WORKERS = 8
+# Scan results are marked in the treeview this many at a time
+HEALTH_BATCH_SIZE = 200
+# Tag colors of the scan results, the first matching status wins
+HEALTH_TAGS = {"missing": "#ff6b6b", "changed": "#f0c674", "duplicate": "#8abeb7"}
+
+# Quick launch shows at most this many results
+QUICK_LAUNCH_LIMIT = 50
+
+# Typing searches once no key was pressed for SEARCH_DEBOUNCE_MS, on a worker
+# thread whose results are picked up every SEARCH_POLL_MS
+SEARCH_DEBOUNCE_MS = 150
+SEARCH_POLL_MS = 15
+
+# Files Import Directory picks up by default: extensions, globs and +x for
+# files with the exec bit set (see dir_import.py)
+IMPORT_RULES = ".exe .bat .cmd .com .lnk" + (" +x" if os.name == 'posix' else "")
+# Imported files are added to the catalog for at most IMPORT_CHUNK_MS at a
+# time, this many per batch, checking for more every IMPORT_POLL_MS
+IMPORT_CHUNK_MS = 30
+IMPORT_BATCH_SIZE = 20
+IMPORT_POLL_MS = 50
+
+# Catalog files for Import Catalog and Export Catalog (see catalog_io.py)
+CATALOG_FILETYPES = [("NDJSON catalogs", "*.ndjson *.jsonl"), ("CSV catalogs", "*.csv"), ("All files", "*.*")]
+
+# Undo goes back at most this many steps. A step with more changes than
+# UNDO_PLACE_LIMIT (a sort, a large import) is shown again with one sync
+# rather than entry by entry.
+UNDO_LIMIT = 100
+UNDO_PLACE_LIMIT = 200
+
+# How often the Performance window refreshes, in milliseconds
+PERFORMANCE_REFRESH_MS = 1000
+
+# How often to look for changes other launcher windows made to the catalog
+REMOTE_POLL_MS = 1000
+# At most this many conflicts with other windows are listed in one warning
+CONFLICTS_SHOWN = 5
 
 class ExecutableLauncherApp(tk.Tk):
     def __init__(self):
+        startup_start = time.perf_counter()
         super().__init__()
 
+        # Times the operations and counts their Tk calls, when turned on
+        self.profiler = OperationProfiler(self)
+        if PROFILE_OPERATIONS:
+            self.profiler.enable()
+        self.performance_window = None
+
         # Set the title and size of the main window
         self.title("Executable Launcher")
         self.geometry("1000x600")
@@ -24,10 +112,6 @@ class ExecutableLauncherApp(tk.Tk):
         style.configure("Treeview", background="#2e2e2e", foreground="white", fieldbackground="#2e2e2e")
         style.map('Treeview', background=[('selected', '#4d4d4d')], foreground=[('selected', 'white')])
 
-        # Initialize variables for drag and drop
-        self.dragging_item = None
-        self.drag_label = None  # For the floating label
-
         # Create the menu bar
         self.create_menu_bar()
 
@@ -35,22 +119,102 @@ class ExecutableLauncherApp(tk.Tk):
         self.create_search_bar()
 
         # Set up the treeview
-        self.tree = ttk.Treeview(self, selectmode='browse', columns=("path",))
+        self.tree = ttk.Treeview(self, selectmode='browse', columns=("path", "launches", "cpu", "memory", "runtime"))
         self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 5))
 
-        # Initialize data structure to mimic the treeview
-        self.tree_data = {}
+        # Drag and drop, updated once per frame rather than on every motion event
+        self.drag = DragController(self, self.tree, self.drop_item, self.profiler)
+
+        # Flat list of the best matching executables, shown instead of the
+        # treeview in quick launch mode
+        self.quick_list = ttk.Treeview(self, selectmode='browse', columns=("path", "folder"))
+        self.quick_list.heading("#0", text="Executable", anchor=tk.W)
+        self.quick_list.heading("path", text="Path", anchor=tk.W)
+        self.quick_list.heading("folder", text="Folder", anchor=tk.W)
+
+        # The data structure with its stable node ids and search index (see
+        # catalog.py), and the treeview items the nodes are shown with, kept
+        # in line without rebuilding the tree
+        self.model = CatalogModel()
+        self.model.observers.append(self.on_model_change)
+        self.view = TreeviewSync(self.tree, self.model.nodes)
+
+        # Searches typed into the search bar run on a worker thread
+        self.search_worker = SearchWorker(self.model)
+        self.search_after = None
+        self.watching_search = False
+        # (quick mode, query) last searched, keys that don't change it are ignored
+        self.search_key = (False, "")
 
         # Add columns to treeview
         self.tree.heading("#0", text="Executables", anchor=tk.W)
         self.tree.heading("path", text="Path", anchor=tk.W)
         self.tree.column("path", stretch=True)
+        # What the executables used while running (see process_monitor.py)
+        self.tree.heading("launches", text="Launches", anchor=tk.W)
+        self.tree.heading("cpu", text="CPU time", anchor=tk.W)
+        self.tree.heading("memory", text="Peak memory", anchor=tk.W)
+        self.tree.heading("runtime", text="Run time", anchor=tk.W)
+        for column in ("launches", "cpu", "memory", "runtime"):
+            self.tree.column(column, width=90, stretch=False)
+
+        # Colors for executables the path check found problems with
+        for status, color in HEALTH_TAGS.items():
+            self.tree.tag_configure(status, foreground=color)
 
         # Set up context menu for treeview
         self.create_context_menu()
 
+        # Changes are written to the data file in the background, shortly after they happen
+        self.store = self.model.store = self.open_store()
+
+        # Loaded catalog, node table and search index from the last run, if still current
+        self.startup_cache = self.model.cache = StartupCache(STARTUP_CACHE_FILE)
+        self.cache_used = False
+
+        # Started executables and their children are sampled on a background
+        # thread, exe path -> usage column values last shown
+        self.monitor = ProcessMonitor(USAGE_FILE, interval=MONITOR_INTERVAL)
+        self.monitor.load()
+        self.usage_values = {}
+        self.watching_usage = False
+        self.view.columns = self.usage_columns
+
+        # Executables are started and reaped on a background thread
+        self.launcher = LaunchSupervisor(monitor=self.monitor)
+        self.watching_launches = False
+        self.running_window = None
+        # Folder launches in progress
+        self.batches = []
+
+        # Launch history, ranks the quick launch results and counts the launches shown
+        self.history = LaunchHistory(HISTORY_FILE, half_life_days=FRECENCY_HALF_LIFE_DAYS)
+        self.history.load()
+
+        # Checks the executable paths on a thread pool, exe path -> last status
+        self.health_scanner = HealthScanner(HEALTH_CACHE_FILE, workers=HEALTH_SCAN_WORKERS)
+        self.health = {}
+
+        # Walks directories being imported on a worker thread
+        self.importer = DirectoryImporter()
+        self.import_rules = IMPORT_RULES
+        self.import_node = None
+
+        # Catalog file being merged into a folder, and the export thread
+        self.catalog_reader = None
+        self.exporter = CatalogExporter()
+
+        # Our changes the storage engine hasn't written yet as (number, change),
+        # replayed over catalogs read back from disk, and conflicts with other windows
+        self.unwritten = []
+        self.conflicts = []
+
+        # Catalog snapshots to undo and redo changes with (see undo.py), changes
+        # made while undoing aren't steps of their own
+        self.undo = UndoHistory(UNDO_LIMIT)
+        self.undoing = False
+
         # Load data from file
-        self.data_file = "data.json"
         self.load_data()
 
         # Bind events
@@ -59,17 +223,72 @@ class ExecutableLauncherApp(tk.Tk):
         # Create the bottom button frame
         self.create_bottom_buttons()
 
+        # Show how long starting took, until the path check reports
+        self.startup_ms = (time.perf_counter() - startup_start) * 1000
+        self.health_status.config(text=f"Started in {self.startup_ms:.0f} ms "
+                                       f"({'startup cache' if self.cache_used else 'no startup cache'})")
+
+        # Check the executable paths once the window is up
+        self.after(HEALTH_SCAN_DELAY_MS, self.check_paths)
+
+        # Pick up changes other windows make to the same catalog
+        self.after(REMOTE_POLL_MS, self.watch_remote)
+
+    @property
+    def tree_data(self):
+        return self.model.data
+
+    @property
+    def nodes(self):
+        return self.model.nodes
+
+    def open_store(self):
+        # Create the storage engine selected by STORAGE_BACKEND
+        snapshot = lambda: copy_tree(self.tree_data)
+        if STORAGE_BACKEND == "json":
+            return WriteBehindSaver(DATA_FILE, snapshot, schedule=self.after, cancel=self.after_cancel)
+        return JournalStore(DATA_FILE, snapshot, compact_bytes=JOURNAL_COMPACT_BYTES)
+
     def bind_events(self):
+        # Write pending changes before the window closes
+        self.protocol("WM_DELETE_WINDOW", self.on_exit)
+
         # Bind right-click to treeview
         self.tree.bind("<Button-3>", self.show_context_menu)
 
         # Bind double-click to execute
         self.tree.bind("<Double-1>", self.execute_selected)
+        self.quick_list.bind("<Double-1>", self.execute_selected)
+        self.quick_list.bind("<Return>", self.execute_selected)
+
+        # Undo and redo catalog changes
+        self.bind("<Control-z>", self.on_undo_key)
+        self.bind("<Control-y>", self.on_redo_key)
+        self.bind("<Control-Z>", self.on_redo_key)
 
         # Bind drag and drop for moving items
-        self.tree.bind("<ButtonPress-1>", self.on_drag_start)
-        self.tree.bind("<B1-Motion>", self.on_drag_motion)
-        self.tree.bind("<ButtonRelease-1>", self.on_drag_release)
+        self.tree.bind("<ButtonPress-1>", self.drag.press)
+        self.tree.bind("<B1-Motion>", self.drag.motion)
+        self.tree.bind("<ButtonRelease-1>", self.drag.release)
+
+        # Track folders the user opens and closes so searches can restore them,
+        # and fill in the children of folders opened in lazy mode
+        self.tree.bind("<<TreeviewOpen>>", lambda event: self.view.note_open(self.tree.focus(), True))
+        self.tree.bind("<<TreeviewClose>>", self.on_tree_close)
+
+    def on_undo_key(self, event):
+        # The search bar keeps the keys for its own text
+        if event.widget is not self.search_entry:
+            self.undo_change()
+
+    def on_redo_key(self, event):
+        if event.widget is not self.search_entry:
+            self.redo_change()
+
+    def on_tree_close(self, event):
+        # Record the close, then drop collapsed subtrees if there are too many items
+        self.view.note_open(self.tree.focus(), False)
+        self.view.trim(LAZY_ITEM_BUDGET)
 
     def create_menu_bar(self):
         # Create the menu bar
@@ -79,12 +298,18 @@ class ExecutableLauncherApp(tk.Tk):
         # File menu
         file_menu = tk.Menu(menu_bar, tearoff=0)
         file_menu.add_command(label="Save", command=self.save_data)
+        file_menu.add_command(label="Import Directory...", command=self.import_directory)
+        file_menu.add_command(label="Import Catalog...", command=self.import_catalog)
+        file_menu.add_command(label="Export Catalog...", command=self.export_catalog)
         file_menu.add_separator()
-        file_menu.add_command(label="Exit", command=self.quit)
+        file_menu.add_command(label="Exit", command=self.on_exit)
         menu_bar.add_cascade(label="File", menu=file_menu)
 
         # Edit menu
         edit_menu = tk.Menu(menu_bar, tearoff=0)
+        edit_menu.add_command(label="Undo", command=self.undo_change, accelerator="Ctrl+Z")
+        edit_menu.add_command(label="Redo", command=self.redo_change, accelerator="Ctrl+Y")
+        edit_menu.add_separator()
         edit_menu.add_command(label="Add Folder", command=self.add_folder)
         edit_menu.add_command(label="Add Executable", command=self.add_executable)
         edit_menu.add_command(label="Edit Selected", command=self.edit_item)
@@ -94,18 +319,177 @@ class ExecutableLauncherApp(tk.Tk):
         # Actions menu
         actions_menu = tk.Menu(menu_bar, tearoff=0)
         actions_menu.add_command(label="Execute", command=self.execute_selected)
+        actions_menu.add_command(label="Launch All in Folder", command=self.launch_folder)
+        actions_menu.add_command(label="Launch All in Folder (Recursive)", command=lambda: self.launch_folder(recursive=True))
         actions_menu.add_command(label="Sort", command=self.sort_items)
+        actions_menu.add_command(label="Check Paths", command=self.check_paths)
+        actions_menu.add_separator()
+        actions_menu.add_command(label="Running...", command=self.show_running_window)
         menu_bar.add_cascade(label="Actions", menu=actions_menu)
 
-        # Help menu (Placeholder for future use)
+        # Help menu
         help_menu = tk.Menu(menu_bar, tearoff=0)
+        help_menu.add_command(label="Storage Status", command=self.show_storage_status)
+        help_menu.add_command(label="Performance", command=self.show_performance_window)
         help_menu.add_command(label="About", command=self.show_about_info)
         menu_bar.add_cascade(label="Help", menu=help_menu)
 
     def show_about_info(self):
-        # Placeholder for showing information about the application
+        # Show information about the application
         messagebox.showinfo("About Executable Launcher", "Executable Launcher\nOrganize and run your executables.")
 
+    def show_storage_status(self):
+        # Show how the background writes to the data file are doing
+        stats = self.store.stats()
+        lines = [
+            f"Data file: {os.path.abspath(DATA_FILE)} ({STORAGE_BACKEND})",
+            f"Writes: {stats['writes']} ({stats['failures']} failed)",
+            f"Queue depth: {stats['queue_depth']}",
+            f"Write latency: last {stats['last_latency_ms']:.1f} ms, "
+            f"average {stats['avg_latency_ms']:.1f} ms, max {stats['max_latency_ms']:.1f} ms",
+            f"Changes waiting to be written: {stats['pending_changes']}",
+        ]
+        if 'coalesced_changes' in stats:
+            lines.append(f"Changes merged into other writes: {stats['coalesced_changes']}")
+        if 'journal_bytes' in stats:
+            lines.append(f"Journal: {stats['journal_bytes']} bytes, {stats['compactions']} compactions")
+            lines.append(f"Replayed on load: {stats['replayed_records']} changes ({stats['skipped_records']} skipped)")
+        if 'remote_reloads' in stats:
+            lines.append(f"From other windows: {stats.get('remote_records', 0)} changes, "
+                         f"{stats['remote_reloads']} reloads, {len(self.conflicts)} conflicts")
+        if stats['last_error']:
+            lines.append(f"Last error: {stats['last_error']}")
+        lines.append(f"Startup: {self.startup_ms:.0f} ms ({'from' if self.cache_used else 'without'} the startup cache)")
+        if self.startup_cache.build_seconds is not None:
+            lines.append(f"Loading and indexing without the cache: {self.startup_cache.build_seconds * 1000:.0f} ms")
+        if self.startup_cache.last_error:
+            lines.append(f"Startup cache error: {self.startup_cache.last_error}")
+        messagebox.showinfo("Storage Status", "\n".join(lines))
+
+
+    def show_performance_window(self):
+        # Show how long each operation takes, its Tk calls and the event loop lag
+        if self.performance_window is not None:
+            self.performance_window.lift()
+            return
+
+        window = tk.Toplevel(self, bg='#2e2e2e')
+        window.title("Performance")
+        window.geometry("800x350")
+        window.protocol("WM_DELETE_WINDOW", self.close_performance_window)
+        self.performance_window = window
+
+        columns = ("count", "avg", "max", "last", "tk_calls", "last_tk_calls")
+        self.performance_tree = ttk.Treeview(window, columns=columns, selectmode='none')
+        self.performance_tree.heading("#0", text="Operation", anchor=tk.W)
+        self.performance_tree.heading("count", text="Count", anchor=tk.W)
+        self.performance_tree.heading("avg", text="Average", anchor=tk.W)
+        self.performance_tree.heading("max", text="Max", anchor=tk.W)
+        self.performance_tree.heading("last", text="Last", anchor=tk.W)
+        self.performance_tree.heading("tk_calls", text="Tk calls (avg)", anchor=tk.W)
+        self.performance_tree.heading("last_tk_calls", text="Tk calls (last)", anchor=tk.W)
+        for column in columns:
+            self.performance_tree.column(column, width=90, stretch=True)
+        self.performance_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        self.performance_lag = tk.Label(window, bg='#2e2e2e', fg='white', anchor=tk.W)
+        self.performance_lag.pack(fill=tk.X, padx=10)
+
+        button_frame = tk.Frame(window, bg='#2e2e2e')
+        button_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
+        self.profiling_enabled = tk.BooleanVar(value=self.profiler.enabled)
+        record_check = tk.Checkbutton(button_frame, text="Record", variable=self.profiling_enabled,
+                                      command=self.toggle_profiling, bg='#2e2e2e', fg='white', selectcolor='#4d4d4d')
+        record_check.pack(side=tk.LEFT, padx=5)
+        self.profiling_cprofile = tk.BooleanVar(value=self.profiler.capture_profile)
+        cprofile_check = tk.Checkbutton(button_frame, text="cProfile", variable=self.profiling_cprofile,
+                                        command=lambda: self.profiler.set_capture_profile(self.profiling_cprofile.get()),
+                                        bg='#2e2e2e', fg='white', selectcolor='#4d4d4d')
+        cprofile_check.pack(side=tk.LEFT, padx=5)
+        reset_btn = tk.Button(button_frame, text="Reset", command=self.reset_performance, bg='#4d4d4d', fg='white')
+        reset_btn.pack(side=tk.LEFT, padx=5)
+        export_json_btn = tk.Button(button_frame, text="Export JSON", command=self.export_performance_json, bg='#4d4d4d', fg='white')
+        export_json_btn.pack(side=tk.RIGHT, padx=5)
+        export_profile_btn = tk.Button(button_frame, text="Export cProfile", command=self.export_performance_profile, bg='#4d4d4d', fg='white')
+        export_profile_btn.pack(side=tk.RIGHT, padx=5)
+
+        self.refresh_performance_window()
+
+    def refresh_performance_window(self):
+        # Update the Performance window now and then while it is open
+        self.update_performance_window()
+        self.performance_refresh = self.after(PERFORMANCE_REFRESH_MS, self.refresh_performance_window)
+
+    def update_performance_window(self):
+        snapshot = self.profiler.snapshot()
+        shown = set(self.performance_tree.get_children())
+        for name, stats in snapshot['operations'].items():
+            values = (stats['count'], f"{stats['avg_ms']:.1f} ms", f"{stats['max_ms']:.1f} ms", f"{stats['last_ms']:.1f} ms",
+                      f"{stats['avg_tk_calls']:.0f}", stats['last_tk_calls'])
+            if name in shown:
+                self.performance_tree.item(name, values=values)
+                shown.discard(name)
+            else:
+                self.performance_tree.insert('', 'end', iid=name, text=name, values=values)
+        if shown:
+            self.performance_tree.delete(*shown)
+
+        loop = snapshot['event_loop']
+        if not snapshot['enabled']:
+            text = "Not recording, tick Record to time the operations"
+        else:
+            text = (f"Event loop lag: last {loop['last_lag_ms']:.0f} ms, average {loop['avg_lag_ms']:.0f} ms, "
+                    f"max {loop['max_lag_ms']:.0f} ms, {loop['stalls']} stalls over {loop['stall_ms']} ms")
+            if loop['max_lag_after']:
+                text += f" (worst after {loop['max_lag_after']})"
+        text += (f"\nSearch worker: {self.search_worker.completed} searches, "
+                 f"{self.search_worker.dropped} dropped as outdated")
+        drag = self.drag.stats()
+        text += (f"\nDrag: {drag['frames']} frames for {drag['events']} motion events, "
+                 f"average {drag['avg_frame_ms']:.2f} ms, max {drag['max_frame_ms']:.2f} ms per frame")
+        monitor = self.monitor.stats()
+        text += (f"\nProcess monitor: {monitor['following']} processes in {monitor['runs']} runs, "
+                 f"{monitor['samples']} samples, last {monitor['last_sample_ms']:.2f} ms, max {monitor['max_sample_ms']:.2f} ms")
+        self.performance_lag.config(text=text)
+
+    def toggle_profiling(self):
+        if self.profiling_enabled.get():
+            self.profiler.enable()
+        else:
+            self.profiler.disable()
+        self.update_performance_window()
+
+    def reset_performance(self):
+        self.profiler.reset()
+        self.update_performance_window()
+
+    def export_performance_json(self):
+        path = filedialog.asksaveasfilename(parent=self.performance_window, defaultextension=".json",
+                                            filetypes=[("JSON files", "*.json")], initialfile="performance.json")
+        if not path:
+            return
+        try:
+            self.profiler.export_json(path)
+        except OSError as e:
+            messagebox.showerror("Export", f"Failed to write {path}\nError: {e}", parent=self.performance_window)
+
+    def export_performance_profile(self):
+        if self.profiler.profile is None:
+            messagebox.showinfo("Export", "Tick cProfile and use the launcher for a while first.", parent=self.performance_window)
+            return
+        path = filedialog.asksaveasfilename(parent=self.performance_window, defaultextension=".prof",
+                                            filetypes=[("cProfile stats", "*.prof")], initialfile="performance.prof")
+        if not path:
+            return
+        try:
+            self.profiler.export_profile(path)
+        except OSError as e:
+            messagebox.showerror("Export", f"Failed to write {path}\nError: {e}", parent=self.performance_window)
+
+    def close_performance_window(self):
+        self.after_cancel(self.performance_refresh)
+        self.performance_window.destroy()
+        self.performance_window = None
 
     def create_search_bar(self):
         # Create a search bar frame at the top
@@ -117,7 +501,14 @@ class ExecutableLauncherApp(tk.Tk):
         search_label.pack(side=tk.LEFT, padx=(0, 5))
         self.search_entry = tk.Entry(search_frame, bg='#4d4d4d', fg='white', insertbackground='white')
         self.search_entry.pack(side=tk.LEFT, fill=tk.X, expand=True)
-        self.search_entry.bind("<KeyRelease>", self.search_items)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Return>", self.launch_top_result)
+
+        # Switch between the folder view and a flat, ranked quick launch list
+        self.quick_mode = tk.BooleanVar(value=False)
+        quick_check = tk.Checkbutton(search_frame, text="Quick launch", variable=self.quick_mode, command=self.toggle_quick_mode,
+                                     bg='#2e2e2e', fg='white', selectcolor='#4d4d4d')
+        quick_check.pack(side=tk.LEFT, padx=(5, 0))
 
     def create_context_menu(self):
         # Right-click context menu
@@ -129,12 +520,15 @@ class ExecutableLauncherApp(tk.Tk):
         self.context_menu.add_command(label="Remove", command=self.remove_item)
         self.context_menu.add_separator()
         self.context_menu.add_command(label="Execute", command=self.execute_selected)
+        self.context_menu.add_command(label="Launch All in Folder", command=self.launch_folder)
+        self.context_menu.add_command(label="Launch All in Folder (Recursive)", command=lambda: self.launch_folder(recursive=True))
         self.context_menu.add_command(label="Sort", command=self.sort_items)
 
     def create_bottom_buttons(self):
         # Create a frame for bottom buttons
         button_frame = tk.Frame(self, bg='#2e2e2e')
         button_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
+        self.button_frame = button_frame
 
         # Add buttons to the bottom frame
         add_folder_btn = tk.Button(button_frame, text="Add Folder", command=self.add_folder, bg='#4d4d4d', fg='white')
@@ -156,6 +550,14 @@ class ExecutableLauncherApp(tk.Tk):
         execute_btn = tk.Button(button_frame, text="Execute", command=self.execute_selected, bg='#4d4d4d', fg='white')
         execute_btn.pack(side=tk.LEFT, padx=5)
 
+        # Progress of folder launches and of the path check
+        self.health_status = tk.Label(button_frame, bg='#2e2e2e', fg='white', anchor=tk.E)
+        self.health_status.pack(side=tk.RIGHT, padx=5)
+        # Shown while a catalog file is imported or exported
+        self.transfer_progress = ttk.Progressbar(button_frame, length=120, maximum=100)
+        self.launch_status = tk.Label(button_frame, bg='#2e2e2e', fg='white', anchor=tk.E)
+        self.launch_status.pack(side=tk.RIGHT, fill=tk.X, expand=True)
+
     def show_context_menu(self, event):
         # Display context menu on right-click
         item_id = self.tree.identify_row(event.y)
@@ -163,49 +565,19 @@ class ExecutableLauncherApp(tk.Tk):
             self.tree.selection_set(item_id)
             self.context_menu.post(event.x_root, event.y_root)
 
-    def sort_treeview(self, parent=''):
-        # Get the children of the current parent
-        children = list(self.tree.get_children(parent))
-        
-        # Separate folders and executables
-        folders = [item for item in children if not self.tree.item(item, 'values')]
-        executables = [item for item in children if self.tree.item(item, 'values')]
-        
-        # Sort folders and executables alphabetically
-        folders.sort(key=lambda x: self.tree.item(x, 'text').lower())
-        executables.sort(key=lambda x: self.tree.item(x, 'text').lower())
-        
-        # Rearrange children in the treeview
-        for index, item in enumerate(folders + executables):
-            self.tree.move(item, parent, index)
-
     def add_folder(self):
         # Prompt the user for a folder name
         folder_name = simpledialog.askstring("Add Folder", "Enter folder name:")
         
         if folder_name:
-            # Determine where to insert the new folder
-            parent = self.tree.selection()[0] if self.tree.selection() else ''
-
-            # If parent is an executable, get its parent folder
-            if parent and self.tree.item(parent, 'values'):
-                parent = self.tree.parent(parent)
-
-            # Get path in data structure
-            parent_path = self.get_data_path(parent)
+            # Get path in data structure of the folder to insert into
+            parent_path = self.nodes.path_of(self.selected_folder())
             
-            # Add the folder to the data structure
-            current_level = self.get_current_level(self.tree_data, parent_path)
-            current_level[folder_name] = {}
+            # Add the folder to the data structure, in its sorted place
+            self.apply_change(self.model.place_sorted({"op": "add", "path": parent_path + [folder_name], "value": {}}))
 
             # Add the folder to the treeview
-            self.tree.insert(parent, "end", text=folder_name, open=True)
-
-            # Sort items to reflect in the treeview
-            self.sort_items()
-
-            # Save the updated treeview to the data file
-            self.save_data()
+            self.show_placed(parent_path + [folder_name])
 
     def add_executable(self):
         # Prompt the user for the executable name
@@ -226,65 +598,325 @@ class ExecutableLauncherApp(tk.Tk):
         if not exe_emoji:
             exe_emoji = "📁"  # Use folder icon as default
 
-        # Determine where to insert the new executable
-        parent = self.tree.selection()[0] if self.tree.selection() else ''
+        # Get path in data structure of the folder to insert into
+        parent_path = self.nodes.path_of(self.selected_folder())
 
-        # If the selected item is an executable, add to its parent
-        if parent and self.tree.item(parent, 'values'):
-            parent = self.tree.parent(parent)
-
-        # Get path in data structure
-        parent_path = self.get_data_path(parent)
-
-        # Add the executable to the data structure
-        current_level = self.get_current_level(self.tree_data, parent_path)
-        current_level[exe_name] = {"path": exe_path, "emoji": exe_emoji}
+        # Add the executable to the data structure, in its sorted place
+        self.apply_change(self.model.place_sorted({"op": "add", "path": parent_path + [exe_name],
+                                                   "value": {"path": exe_path, "emoji": exe_emoji}}))
 
         # Add the executable to the treeview
-        self.tree.insert(parent, "end", text=f"{exe_emoji} {exe_name}", values=(exe_path,))
+        self.show_placed(parent_path + [exe_name])
+
+    def show_placed(self, *paths):
+        # Show added or renamed entries in their sorted place, syncing the whole
+        # treeview only if a search filter is applied or a folder isn't shown
+        if self.view.data is self.tree_data and not self.search_entry.get().strip() and not self.quick_mode.get():
+            placed = [self.view.place(self.nodes.id_of(path)) for path in paths]
+            if all(placed):
+                return
+        self.refresh_treeview()
 
-        # Sort items to reflect in the treeview
-        self.sort_items()
+    def import_directory(self):
+        # Add every executable below a directory, mirroring its folders
+        if self.importer.running() or self.import_node is not None:
+            messagebox.showinfo("Import Directory", "An import is already in progress.")
+            return
+        directory = filedialog.askdirectory(title="Import Directory", mustexist=True)
+        if not directory:
+            return
+        rules_text = simpledialog.askstring("Import Directory", "Files to import (extensions, globs, +x for the exec bit):",
+                                            initialvalue=self.import_rules)
+        if rules_text is None:
+            return
+        rules = ImportRules.parse(rules_text)
+        if not rules:
+            messagebox.showerror("Import Directory", "No files would be imported with these rules.")
+            return
+        self.import_rules = rules_text
+
+        # The directory becomes a folder in the selected folder, importing it
+        # again into the same place updates that folder
+        directory = os.path.abspath(directory)
+        folder_path = self.nodes.path_of(self.selected_folder()) + [os.path.basename(directory) or directory]
+        folder = lookup(self.tree_data, folder_path)
+        if is_executable(folder):
+            messagebox.showerror("Import Directory", f"'{folder_path[-1]}' is already an executable here.")
+            return
+        if folder is None:
+            self.apply_change(self.model.place_sorted({"op": "add", "path": folder_path, "value": {}}))
+            self.show_placed(folder_path)
+            folder = lookup(self.tree_data, folder_path)
+
+        self.import_node = self.nodes.id_of(folder_path)
+        self.import_directory_path = directory
+        # Executables already in the folder aren't added again
+        self.import_known = {same_path(value['path']) for _, value in iter_executables(folder)}
+        self.import_counts = {'added': 0, 'removed': 0, 'skipped': 0}
+        self.importer.start(directory, rules)
+        self.watch_import()
+
+    def watch_import(self):
+        # Add found executables for at most IMPORT_CHUNK_MS, then come back for more
+        if self.import_node not in self.nodes.names:
+            # The folder was removed meanwhile
+            self.importer.cancel()
+            self.import_node = None
+            self.health_status.config(text="Import cancelled")
+            return
 
-        # Save the updated treeview to the data file
-        self.save_data()
+        deadline = time.perf_counter() + IMPORT_CHUNK_MS / 1000
+        folder_path = self.nodes.path_of(self.import_node)
+        placed = []
+        while time.perf_counter() < deadline:
+            results = self.importer.take_results(IMPORT_BATCH_SIZE)
+            if not results:
+                break
+            for parts, file_name, exe_path in results:
+                placed.extend(self.import_entry(folder_path, parts, file_name, exe_path))
+        if placed:
+            self.show_placed(*placed)
+
+        if self.importer.running() or self.importer.pending():
+            self.health_status.config(text=f"Importing {self.import_directory_path}: {self.import_counts['added']} added, "
+                                           f"{self.importer.directories} folders scanned...")
+            self.after(1 if self.importer.pending() else IMPORT_POLL_MS, self.watch_import)
+            return
+        self.finish_import(folder_path)
+
+    def import_entry(self, folder_path, parts, file_name, exe_path):
+        # Add one found executable below the import folder, returning the
+        # paths of the entries that were added for it
+        key = same_path(exe_path)
+        if key in self.import_known:
+            return []
+        added = []
+        path = list(folder_path)
+        for part in parts:
+            path.append(part)
+            value = lookup(self.tree_data, path)
+            if value is None:
+                self.apply_change(self.model.place_sorted({"op": "add", "path": list(path), "value": {}}))
+                added.append(list(path))
+            elif is_executable(value):
+                # An executable of the same name is in the way of this folder
+                self.import_counts['skipped'] += 1
+                return added
+
+        # Named without the extension, unless that name is taken already
+        level = lookup(self.tree_data, path)
+        name = os.path.splitext(file_name)[0] or file_name
+        if name in level:
+            name = file_name
+        if name in level:
+            self.import_counts['skipped'] += 1
+            return added
+        exe_entry = path + [name]
+        self.apply_change(self.model.place_sorted({"op": "add", "path": exe_entry,
+                                                   "value": {"path": exe_path, "emoji": "📁"}}))
+        self.import_known.add(key)
+        self.import_counts['added'] += 1
+        added.append(exe_entry)
+        return added
+
+    def finish_import(self, folder_path):
+        # Remove what an earlier import of the directory added that is gone now,
+        # but not what was under a directory that could not be read
+        counts = self.import_counts
+        if self.importer.complete:
+            folder = lookup(self.tree_data, folder_path)
+            for path in list(plan_removals(folder, self.import_directory_path, self.importer.seen,
+                                           self.importer.unreadable)):
+                self.apply_change({"op": "remove", "path": folder_path + list(path)})
+                counts['removed'] += 1
+                # Drop the folders that were only there for it
+                parent = list(path[:-1])
+                while parent and not lookup(self.tree_data, folder_path + parent):
+                    self.apply_change({"op": "remove", "path": folder_path + parent})
+                    parent.pop()
+        self.import_node = None
+
+        text = f"Imported {self.import_directory_path}: {counts['added']} added, {counts['removed']} removed"
+        if counts['skipped']:
+            text += f", {counts['skipped']} skipped (name taken)"
+        if self.importer.errors:
+            text += f", {self.importer.errors} unreadable ({self.importer.last_error})"
+        self.health_status.config(text=text)
+
+    def import_catalog(self):
+        # Merge a catalog file into the selected folder: its folders are merged
+        # with the ones already there, executables of the same name updated
+        if self.catalog_reader is not None:
+            messagebox.showinfo("Import Catalog", "An import is already in progress.")
+            return
+        file_path = filedialog.askopenfilename(title="Import Catalog", filetypes=CATALOG_FILETYPES)
+        if not file_path:
+            return
+        try:
+            self.catalog_reader = CatalogReader(file_path)
+        except OSError as e:
+            messagebox.showerror("Import Catalog", f"Could not open {file_path}:\n{e}")
+            return
+        self.catalog_entries = self.catalog_reader.entries()
+        self.catalog_import_node = self.selected_folder()
+        self.catalog_counts = {'added': 0, 'updated': 0, 'unchanged': 0, 'skipped': 0}
+        self.transfer_progress.config(value=0)
+        self.transfer_progress.pack(side=tk.RIGHT, padx=5)
+        self.watch_catalog_import()
+
+    @profiled
+    def watch_catalog_import(self):
+        # Merge entries for at most IMPORT_CHUNK_MS, then let the window breathe
+        reader = self.catalog_reader
+        if self.catalog_import_node != ROOT and self.catalog_import_node not in self.nodes.names:
+            # The folder was removed meanwhile
+            self.finish_catalog_import("Import cancelled")
+            return
 
-    def get_data_path(self, item_id):
-        # Helper to get the path in the data structure
-        path = []
-        while item_id:
-            path.insert(0, self.tree.item(item_id, 'text'))
-            item_id = self.tree.parent(item_id)
-        return path
+        deadline = time.perf_counter() + IMPORT_CHUNK_MS / 1000
+        folder_path = self.nodes.path_of(self.catalog_import_node)
+        placed = []
+        finished = False
+        error = None
+        try:
+            while time.perf_counter() < deadline:
+                entry = next(self.catalog_entries, None)
+                if entry is None:
+                    finished = True
+                    break
+                placed.extend(self.merge_catalog_entry(folder_path, *entry))
+        except (OSError, UnicodeDecodeError) as e:
+            error = e
+        if placed:
+            self.show_placed(*placed)
+
+        name = os.path.basename(reader.path)
+        counts = self.catalog_counts
+        if error is not None:
+            self.finish_catalog_import(f"Import of {name} stopped at line {reader.line}: {error}")
+            return
+        if not finished:
+            self.transfer_progress.config(value=reader.progress() * 100)
+            self.health_status.config(text=f"Importing {name}: {counts['added']} added, {counts['updated']} updated...")
+            self.after(1, self.watch_catalog_import)
+            return
 
-    def get_current_level(self, data_structure, path):
-        # Traverse to the current level in the data structure
-        current_level = data_structure
-        for part in path:
-            current_level = current_level[part]
-        return current_level
+        text = f"Imported {name}: {counts['added']} added, {counts['updated']} updated, {counts['unchanged']} unchanged"
+        if counts['skipped']:
+            text += f", {counts['skipped']} skipped (name taken)"
+        if reader.errors:
+            text += f", {reader.errors} unreadable ({reader.last_error})"
+        self.finish_catalog_import(text)
+
+    def merge_catalog_entry(self, folder_path, parts, value):
+        # Merge one entry read from a catalog file below folder_path, returning
+        # the paths of the entries that were added or updated for it
+        value = from_json(value, self.model.paths)
+        placed = []
+        path = list(folder_path)
+        for part in parts[:-1]:
+            path.append(part)
+            current = lookup(self.tree_data, path)
+            if current is None:
+                self.apply_change(self.model.place_sorted({"op": "add", "path": list(path), "value": {}}))
+                placed.append(list(path))
+            elif is_executable(current):
+                # An executable of the same name is in the way of this folder
+                self.catalog_counts['skipped'] += 1
+                return placed
+
+        path.append(parts[-1])
+        current = lookup(self.tree_data, path)
+        if current is None:
+            self.apply_change(self.model.place_sorted({"op": "add", "path": path, "value": value}))
+            self.catalog_counts['added'] += 1
+            placed.append(path)
+        elif is_executable(current) != is_executable(value):
+            self.catalog_counts['skipped'] += 1
+        elif is_executable(value) and current != value:
+            # Keep it where it is in its (sorted) folder, an edit without "before" goes to the end
+            self.apply_change(self.model.place_sorted({"op": "edit", "path": path, "name": path[-1], "value": value}))
+            self.catalog_counts['updated'] += 1
+            placed.append(path)
+        else:
+            self.catalog_counts['unchanged'] += 1
+        return placed
+
+    def finish_catalog_import(self, text):
+        self.catalog_reader.close()
+        self.catalog_reader = None
+        self.catalog_entries = None
+        if not self.exporter.running():
+            self.transfer_progress.pack_forget()
+        self.health_status.config(text=text)
+
+    def export_catalog(self):
+        # Write the whole catalog to an NDJSON or CSV file in the background
+        if self.exporter.running():
+            messagebox.showinfo("Export Catalog", "An export is already in progress.")
+            return
+        file_path = filedialog.asksaveasfilename(title="Export Catalog", defaultextension=".ndjson",
+                                                 filetypes=CATALOG_FILETYPES, initialfile="catalog.ndjson")
+        if not file_path:
+            return
+        # Executables are replaced rather than changed, a copy of the folders will do
+        self.exporter.start(copy_tree(self.tree_data), file_path, self.model.entry_count())
+        self.transfer_progress.config(value=0)
+        self.transfer_progress.pack(side=tk.RIGHT, padx=5)
+        self.watch_export()
+
+    def watch_export(self):
+        exporter = self.exporter
+        if exporter.running():
+            if self.catalog_reader is None:
+                self.transfer_progress.config(value=exporter.written * 100 / max(exporter.total, 1))
+            self.health_status.config(text=f"Exporting {os.path.basename(exporter.path)}: "
+                                           f"{exporter.written} of {exporter.total} entries...")
+            self.after(IMPORT_POLL_MS, self.watch_export)
+            return
+        if self.catalog_reader is None:
+            self.transfer_progress.pack_forget()
+        if exporter.error is not None:
+            self.health_status.config(text="")
+            messagebox.showerror("Export Catalog", f"Could not write {exporter.path}:\n{exporter.error}")
+        else:
+            self.health_status.config(text=f"Exported {exporter.written} entries to {os.path.basename(exporter.path)} "
+                                           f"in {exporter.seconds * 1000:.0f} ms")
+
+    def selected_node(self):
+        # Node of the selected item, None if nothing (or a placeholder) is selected
+        if self.quick_mode.get():
+            selected_item = self.quick_list.selection()
+            return int(selected_item[0]) if selected_item else None
+        selected_item = self.tree.selection()
+        return self.view.node_of(selected_item[0]) if selected_item else None
+
+    def selected_folder(self):
+        # Folder new entries go into: the selected one, or that of the selected executable
+        node_id = self.selected_node()
+        if node_id is None:
+            return ROOT
+        if not self.nodes.is_folder(node_id):
+            return self.nodes.parents[node_id]
+        return node_id
 
     def edit_item(self):
-        # Get the selected item
-        selected_item = self.tree.selection()
-        if not selected_item:
+        # Get the node of the selected item
+        node_id = self.selected_node()
+        if node_id is None:
             messagebox.showerror("Edit Item", "No item selected.")
             return
 
-        # Get the first selected item
-        item_id = selected_item[0]
-
         # Get the current path in the data structure
-        parent_path = self.get_data_path(self.tree.parent(item_id))
-        current_name = self.tree.item(item_id, 'text').split(' ', 1)[-1]
-        current_level = self.get_current_level(self.tree_data, parent_path)
+        item_path = self.nodes.path_of(node_id)
+        current_name = item_path[-1]
 
-        # Check if it's an executable (has values)
-        item_values = self.tree.item(item_id, 'values')
-        if item_values:
+        # Check if it's an executable
+        if not self.nodes.is_folder(node_id):
             # Executable - allow editing of name, path, and emoji
-            current_emoji = self.tree.item(item_id, 'text').split(' ')[0]
-            current_path = item_values[0]
+            current_value = lookup(self.tree_data, item_path)
+            current_emoji = current_value['emoji']
+            current_path = current_value['path']
 
             # Prompt for new name
             new_name = simpledialog.askstring("Edit Executable", "Enter new name:", initialvalue=current_name)
@@ -306,12 +938,9 @@ class ExecutableLauncherApp(tk.Tk):
             if not new_emoji:
                 new_emoji = current_emoji  # Keep the current emoji if none is provided
 
-            # Update the data structure
-            del current_level[current_name]
-            current_level[new_name] = {"path": new_path, "emoji": new_emoji}
-
-            # Update the treeview with the new values
-            self.tree.item(item_id, text=f"{new_emoji} {new_name}", values=(new_path,))
+            # Update the data structure, moving the entry to its sorted place
+            self.apply_change(self.model.place_sorted({"op": "edit", "path": item_path, "name": new_name,
+                                                       "value": {"path": new_path, "emoji": new_emoji}}))
         
         else:
             # Folder - allow editing of the folder name
@@ -320,98 +949,345 @@ class ExecutableLauncherApp(tk.Tk):
             if not new_name:
                 return  # Exit if no name is provided
 
-            # Update the data structure
-            current_level[new_name] = current_level.pop(current_name)
-
-            # Update the treeview with the new folder name
-            self.tree.item(item_id, text=new_name)
+            # Update the data structure, moving the folder to its sorted place
+            self.apply_change(self.model.place_sorted({"op": "edit", "path": item_path, "name": new_name}))
 
-        # Sort items to reflect changes in the treeview
-        self.sort_items()
-
-        # Save the updated treeview to the data file
-        self.save_data()
+        # Update the item in the treeview
+        self.show_placed(item_path[:-1] + [new_name])
 
 
     def remove_item(self):
-        # Get the selected item
-        selected_item = self.tree.selection()
-        if not selected_item:
+        # Get the node of the selected item
+        node_id = self.selected_node()
+        if node_id is None:
             messagebox.showerror("Remove Item", "No item selected.")
             return
 
-        # Get the first selected item
-        item_id = selected_item[0]
-
         # Confirm deletion
-        item_name = self.tree.item(item_id, 'text').split(' ', 1)[-1]
+        item_name = self.nodes.names[node_id]
         confirm = messagebox.askyesno("Remove Item", f"Are you sure you want to remove '{item_name}'?")
         if not confirm:
             return  # If the user cancels, exit the function
 
-        # Remove the item from the data structure
-        parent_path = self.get_data_path(self.tree.parent(item_id))
-        current_level = self.get_current_level(self.tree_data, parent_path)
-        del current_level[item_name]
-
-        # Remove the item from the treeview
-        self.tree.delete(item_id)
-
-        # Save the updated treeview to the data file
-        self.save_data()
+        # Remove the item from the data structure and the treeview
+        self.apply_change({"op": "remove", "path": self.nodes.path_of(node_id)})
 
 
+    @profiled
     def execute_selected(self, event=None):
-        # Get the selected item
-        selected_item = self.tree.selection()
-        if not selected_item:
+        # Get the node of the selected item
+        node_id = self.selected_node()
+        if node_id is None:
             messagebox.showerror("Execute Item", "No item selected.")
             return
 
-        # Get the first selected item
-        item_id = selected_item[0]
-
-        # Check if it's an executable (has values)
-        item_values = self.tree.item(item_id, 'values')
-        if not item_values:
+        # Check if it's an executable
+        if self.nodes.is_folder(node_id):
             # If the selected item is not an executable, show an error message
             messagebox.showerror("Execute Item", "Selected item is not an executable.")
             return
 
+        self.launch_node(node_id)
+
+    def launch_node(self, node_id):
         # Get the path of the executable
-        exe_path = item_values[0]
+        exe_path = lookup(self.tree_data, self.nodes.path_of(node_id))['path']
+
+        # Hand it to the launch supervisor, failures are reported once it has tried
+        self.launcher.launch(self.nodes.names[node_id], exe_path)
+        self.record_launches([exe_path])
+        if not self.watching_launches:
+            self.watch_launches()
+        if not self.watching_usage:
+            self.watch_usage()
+
+    def record_launches(self, exe_paths):
+        # Count the launches in the history, which the Launches column shows
+        self.history.record_many(exe_paths)
+        for exe_path in exe_paths:
+            self.usage_values.pop(exe_path, None)
+        self.view.refresh_columns(set(exe_paths))
+
+    def watch_launches(self):
+        # Report launches that failed until every queued launch has been tried
+        for launch in self.launcher.take_failures():
+            messagebox.showerror("Execution Error", f"Failed to execute: {launch.path}\nError: {launch.error}")
+        self.watching_launches = self.launcher.pending()
+        if self.watching_launches:
+            self.after(100, self.watch_launches)
+
+    def launch_folder(self, recursive=False):
+        # Start every executable in the selected folder (or the folder of the
+        # selected executable), a few at a time
+        folder = self.selected_folder()
+        folder_path = self.nodes.path_of(folder)
+        folder_name = folder_path[-1] if folder_path else "the catalog"
+        entries = [(path[-1], value['path'])
+                   for path, value in iter_executables(lookup(self.tree_data, folder_path), recursive=recursive)]
+        if not entries:
+            messagebox.showinfo("Launch All", f"There are no executables in '{folder_name}'.")
+            return
+        if not messagebox.askyesno("Launch All", f"Launch {len(entries)} executables from '{folder_name}'?"):
+            return
 
-        # Try to execute the file
-        try:
-            # Use subprocess.Popen to execute the file
-            subprocess.Popen(exe_path, shell=True)
-        except Exception as e:
-            # Show an error message if execution fails
-            messagebox.showerror("Execution Error", f"Failed to execute: {exe_path}\nError: {e}")
-
-    def rebuild_treeview(self, data, parent=''):
-        # Separate folders and executables without sorting
-        folders = {k: v for k, v in data.items() if isinstance(v, dict) and 'path' not in v}
-        executables = {k: v for k, v in data.items() if isinstance(v, dict) and 'path' in v}
-
-        # Insert folders first
-        for folder_name, folder_content in folders.items():
-            # Insert folder into the treeview
-            item_id = self.tree.insert(parent, "end", text=folder_name, open=True)
-            # Recursively rebuild the treeview for this folder's children
-            self.rebuild_treeview(folder_content, item_id)
-
-        # Insert executables after folders
-        for exe_name, exe_content in executables.items():
-            # Insert executable into the treeview
-            exe_path = exe_content['path']
-            exe_emoji = exe_content['emoji']
-            self.tree.insert(parent, "end", text=f"{exe_emoji} {exe_name}", values=(exe_path,))
+        self.batches.append(self.launcher.launch_batch(folder_name, entries, max_running=BATCH_MAX_RUNNING,
+                                                       stagger=BATCH_STAGGER_MS / 1000))
+        self.record_launches([exe_path for _, exe_path in entries])
+        if len(self.batches) == 1:
+            self.watch_batches()
+        if not self.watching_usage:
+            self.watch_usage()
+
+    def watch_batches(self):
+        # Show how the folder launches are going until they are all done
+        messages = []
+        for batch_id in list(self.batches):
+            progress = self.launcher.batch_progress(batch_id)
+            if progress['done']:
+                self.launcher.forget_batch(batch_id)
+                self.batches.remove(batch_id)
+                messages.append(f"Launched '{progress['name']}': {progress['started']} started, {progress['failed']} failed")
+                if progress['failures']:
+                    lines = [f"{path}\nError: {error}" for path, error in progress['failures'][:10]]
+                    if len(progress['failures']) > 10:
+                        lines.append(f"... and {len(progress['failures']) - 10} more")
+                    messagebox.showerror("Execution Error", f"Failed to execute {progress['failed']} of "
+                                         f"{progress['total']} in '{progress['name']}':\n\n" + "\n\n".join(lines))
+            else:
+                messages.append(f"Launching '{progress['name']}': {progress['started']}/{progress['total']} started, "
+                                f"{progress['running']} running, {progress['failed']} failed")
+        self.launch_status.config(text="; ".join(messages))
+        if self.batches:
+            self.after(250, self.watch_batches)
+
+    def usage_columns(self, exe_path):
+        # Launches (from the history), CPU time, peak memory and run time of an executable path
+        values = self.usage_values.get(exe_path)
+        if values is None:
+            launches = self.history.launch_count(exe_path)
+            cpu, peak_rss, seconds = self.monitor.usage(exe_path)
+            if not launches:
+                values = ("", "", "", "")
+            else:
+                duration = lambda total: (f"{total:.1f} s" if total < 60 else f"{total / 60:.1f} min" if total < 3600
+                                          else f"{total / 3600:.1f} h")
+                values = (launches, duration(cpu), f"{peak_rss / (1 << 20):.1f} MB" if peak_rss else "", duration(seconds))
+            self.usage_values[exe_path] = values
+        return values
+
+    def watch_usage(self):
+        # Update the usage columns while launched executables run
+        updated = self.monitor.take_updated()
+        for exe_path in updated:
+            self.usage_values.pop(exe_path, None)
+        if updated:
+            self.view.refresh_columns(updated)
+        self.watching_usage = bool(updated or self.batches or self.monitor.active() or self.launcher.pending())
+        if self.watching_usage:
+            self.after(USAGE_REFRESH_MS, self.watch_usage)
+
+    def check_paths(self):
+        # Check every executable path in the background, marking the results as they come in
+        if self.health_scanner.running():
+            return
+        # Nodes to mark for each executable path
+        self.health_nodes = {}
+        for path, value in iter_executables(self.tree_data):
+            self.health_nodes.setdefault(value['path'], []).append(self.nodes.id_of(path))
+        self.health_scanner.start(self.health_nodes)
+        self.health_status.config(text=f"Checking {len(self.health_nodes)} paths...")
+        self.watch_health()
+
+    def watch_health(self):
+        # Mark a batch of scan results, then come back for more
+        results = self.health_scanner.take_results(HEALTH_BATCH_SIZE)
+        for exe_path, status in results:
+            # A duplicate that is also missing or changed keeps that status
+            if status == 'duplicate' and self.health.get(exe_path, 'ok') not in ('ok', 'duplicate'):
+                continue
+            self.health[exe_path] = status
+            for node_id in self.health_nodes.get(exe_path, ()):
+                # Skip nodes removed or pointed elsewhere since the scan started
+                value = lookup(self.tree_data, self.nodes.path_of(node_id)) if node_id in self.nodes.names else None
+                if is_executable(value) and value['path'] == exe_path:
+                    self.view.set_tags(node_id, (status,) if status in HEALTH_TAGS else ())
+        if results or self.health_scanner.running():
+            self.after(10 if len(results) == HEALTH_BATCH_SIZE else 100, self.watch_health)
+            return
 
+        summary = self.health_scanner.summary
+        if not summary:
+            # Cancelled or stopped before it got through every path
+            self.health_status.config(text="Path check stopped before it finished")
+            return
+        text = (f"{summary['scanned']} paths checked: {summary['missing']} missing, "
+                f"{summary['changed']} changed, {len(self.health_scanner.duplicates)} sets of duplicates")
+        if summary['error']:
+            text += f" (cache not saved: {summary['error']})"
+        self.health_status.config(text=text)
+
+    def show_running_window(self):
+        # Show the executables started from the launcher and whether they still run
+        if self.running_window is not None:
+            self.running_window.lift()
+            return
+
+        window = tk.Toplevel(self, bg='#2e2e2e')
+        window.title("Running")
+        window.geometry("800x300")
+        window.protocol("WM_DELETE_WINDOW", self.close_running_window)
+        self.running_window = window
+
+        columns = ("pid", "started", "status", "spawn")
+        self.running_tree = ttk.Treeview(window, columns=columns, selectmode='browse')
+        self.running_tree.heading("#0", text="Executable", anchor=tk.W)
+        self.running_tree.heading("pid", text="PID", anchor=tk.W)
+        self.running_tree.heading("started", text="Started", anchor=tk.W)
+        self.running_tree.heading("status", text="Status", anchor=tk.W)
+        self.running_tree.heading("spawn", text="Spawn time", anchor=tk.W)
+        for column in columns:
+            self.running_tree.column(column, width=100, stretch=True)
+        self.running_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(10, 5))
+
+        button_frame = tk.Frame(window, bg='#2e2e2e')
+        button_frame.pack(fill=tk.X, padx=10, pady=(5, 10))
+        terminate_btn = tk.Button(button_frame, text="Terminate", command=self.terminate_selected_launch, bg='#4d4d4d', fg='white')
+        terminate_btn.pack(side=tk.LEFT, padx=5)
+        clear_btn = tk.Button(button_frame, text="Clear Finished", command=self.clear_finished_launches, bg='#4d4d4d', fg='white')
+        clear_btn.pack(side=tk.LEFT, padx=5)
+        self.running_status = tk.Label(button_frame, bg='#2e2e2e', fg='white', anchor=tk.E)
+        self.running_status.pack(side=tk.RIGHT, fill=tk.X, expand=True)
+
+        self.running_rows = {}
+        self.refresh_running_window()
+
+    def refresh_running_window(self):
+        # Update the Running window now and then while it is open
+        self.update_running_window()
+        self.running_refresh = self.after(RUNNING_REFRESH_MS, self.refresh_running_window)
+
+    def update_running_window(self):
+        # Update the rows of the Running window in place
+        rows = {}
+        for launch_id, name, path, pid, started, ended, status, spawn_ms in self.launcher.snapshot():
+            started_text = time.strftime("%H:%M:%S", time.localtime(started)) if started else ""
+            spawn_text = f"{spawn_ms:.1f} ms" if spawn_ms is not None else ""
+            rows[str(launch_id)] = (name, (pid or "", started_text, status, spawn_text))
+
+        for item_id in [item_id for item_id in self.running_rows if item_id not in rows]:
+            self.running_tree.delete(item_id)
+            del self.running_rows[item_id]
+        for item_id, row in rows.items():
+            if item_id not in self.running_rows:
+                self.running_tree.insert('', 'end', iid=item_id, text=row[0], values=row[1])
+            elif self.running_rows[item_id] != row:
+                self.running_tree.item(item_id, text=row[0], values=row[1])
+            self.running_rows[item_id] = row
+
+        stats = self.launcher.stats()
+        self.running_status.config(
+            text=f"{stats['running']} running, {stats['launched']} launched, {stats['failed']} failed, "
+                 f"spawn time average {stats['avg_spawn_ms']:.1f} ms, max {stats['max_spawn_ms']:.1f} ms")
+
+    def terminate_selected_launch(self):
+        # Ask the selected running executable to stop
+        selected_item = self.running_tree.selection()
+        if selected_item:
+            self.launcher.terminate(int(selected_item[0]))
+
+    def clear_finished_launches(self):
+        self.launcher.clear_finished()
+        self.update_running_window()
+
+    def close_running_window(self):
+        self.after_cancel(self.running_refresh)
+        self.running_window.destroy()
+        self.running_window = None
+
+    @profiled
+    def rebuild_treeview(self, data, expand=None):
+        # Show data in the treeview, touching only the items that differ
+        self.view.sync(data, expand=expand)
+
+    def refresh_treeview(self):
+        # Show the data structure again, keeping any search filter applied
+        if self.search_entry.get().strip() or self.quick_mode.get():
+            self.search_items()
+        else:
+            self.reset_treeview()
 
+    def on_search_key(self, event=None):
+        # Search once typing pauses, rather than on every key
+        key = (self.quick_mode.get(), self.search_entry.get().strip().lower())
+        if key == self.search_key:
+            return
+        self.search_key = key
+        if self.search_after is not None:
+            self.after_cancel(self.search_after)
+            self.search_after = None
+        if not key[0] and not key[1]:
+            # Cleared, show everything straight away
+            self.search_worker.cancel()
+            self.reset_treeview()
+            return
+        self.search_after = self.after(SEARCH_DEBOUNCE_MS, self.start_search)
+
+    def start_search(self):
+        # Hand the query to the search worker and wait for its result
+        self.search_after = None
+        quick, query = self.search_key
+        if quick:
+            now = time.time()
+            frecency = lambda exe_path: self.history.frecency(exe_path, now)
+            self.search_worker.submit("rank", query, usage=frecency, usage_weight=FRECENCY_WEIGHT,
+                                      limit=QUICK_LAUNCH_LIMIT)
+        else:
+            self.search_worker.submit("search", query)
+        if not self.watching_search:
+            self.watching_search = True
+            self.watch_search()
+
+    def watch_search(self):
+        # Show the result of the latest query, older ones were dropped by the worker
+        result = self.search_worker.take_result()
+        if result is not None:
+            version, kind, query, found, seconds = result
+            if version != self.model.version:
+                # The catalog changed while searching, search it again
+                self.watching_search = False
+                self.start_search()
+                return
+            self.show_search_result(kind, found)
+        if self.search_worker.pending():
+            self.after(SEARCH_POLL_MS, self.watch_search)
+        else:
+            self.watching_search = False
+
+    @profiled
+    def show_search_result(self, kind, found):
+        if kind == "rank":
+            self.show_ranked(found)
+        else:
+            filtered_data, branches = found
+            self.rebuild_treeview(filtered_data, expand=branches)
+
+    @profiled
     def search_items(self, event=None):
+        # Search right away on this thread, e.g. to refresh the results after a
+        # change; results still on their way from the worker are dropped
+        if self.search_after is not None:
+            self.after_cancel(self.search_after)
+            self.search_after = None
+        self.search_worker.cancel()
+
         # Get the search query
         search_query = self.search_entry.get().strip().lower()
+        self.search_key = (self.quick_mode.get(), search_query)
+
+        # Quick launch ranks executables instead of filtering folders
+        if self.quick_mode.get():
+            self.show_quick_results(search_query)
+            return
         
         # If the search query is empty, reset the treeview
         if not search_query:
@@ -419,199 +1295,314 @@ class ExecutableLauncherApp(tk.Tk):
             return
 
         # Perform the search on the data structure
-        filtered_data = self.search_in_data_structure(self.tree_data, search_query)
-
-        # Clear and rebuild the treeview with the filtered data
-        self.tree.delete(*self.tree.get_children())
-        self.rebuild_treeview(filtered_data)
-
-    def search_in_data_structure(self, data, query):
-        filtered_data = {}
-
-        for key, value in data.items():
-            key_lower = key.lower()
-
-            # If the value is a dictionary, it's either a folder or an executable
-            if isinstance(value, dict):
-                # Check if it's an executable (contains 'path')
-                if 'path' in value:
-                    path_lower = value['path'].lower()
-                    # If the executable name or path contains the query, include it
-                    if query in key_lower or query in path_lower:
-                        filtered_data[key] = value
-                else:
-                    # It's a folder, so we need to search recursively
-                    result = self.search_in_data_structure(value, query)
-                    if result or query in key_lower:
-                        # Include the folder if it or its children match the query
-                        filtered_data[key] = result if result else value
-            else:
-                # Handle unexpected cases or incorrect data types (just in case)
-                continue
+        filtered_data, branches = self.model.search(search_query)
 
-        return filtered_data
+        # Detach everything that doesn't match, opening folders down to the matches
+        self.rebuild_treeview(filtered_data, expand=branches)
 
+    def toggle_quick_mode(self):
+        # Swap the treeview for the quick launch list or back
+        if self.quick_mode.get():
+            self.tree.pack_forget()
+            self.quick_list.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 5), before=self.button_frame)
+        else:
+            self.quick_list.pack_forget()
+            self.tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 5), before=self.button_frame)
+        self.refresh_treeview()
+        self.search_entry.focus_set()
+
+    def show_quick_results(self, query):
+        # List the best matches for query, boosted by how often and how
+        # recently they were launched (with no query, the most used ones)
+        now = time.time()
+        frecency = lambda exe_path: self.history.frecency(exe_path, now)
+        self.show_ranked(self.model.rank(query, usage=frecency, usage_weight=FRECENCY_WEIGHT, limit=QUICK_LAUNCH_LIMIT))
+
+    def show_ranked(self, results):
+        # Fill the quick launch list with (score, path) results, best first
+        self.quick_list.delete(*self.quick_list.get_children())
+        for score, path in results:
+            value = lookup(self.tree_data, path)
+            self.quick_list.insert('', 'end', iid=str(self.nodes.id_of(path)), text=f"{value['emoji']} {path[-1]}",
+                                   values=(value['path'], " / ".join(path[:-1])))
+        if results:
+            first = self.quick_list.get_children()[0]
+            self.quick_list.selection_set(first)
+            self.quick_list.see(first)
+
+    def launch_top_result(self, event=None):
+        # Enter in the search bar launches the selected quick launch result,
+        # of the query as typed even if its search hasn't finished yet
+        if self.quick_mode.get() and (self.search_after is not None or self.search_worker.pending()):
+            self.search_items()
+        if self.quick_mode.get() and self.quick_list.selection():
+            self.execute_selected()
 
     def reset_treeview(self):
         # Reset the treeview to show the entire data structure
-        self.tree.delete(*self.tree.get_children())
         self.rebuild_treeview(self.tree_data)
 
+    @profiled
     def sort_items(self):
-        # Sort the underlying data structure
-        self.tree_data = self.sort_data_structure(self.tree_data)
-
-        # Clear the treeview and repopulate it
-        self.tree.delete(*self.tree.get_children())
-        self.rebuild_treeview(self.tree_data)
-
-        # Save the sorted treeview
-        self.save_data()
-
-    def sort_data_structure(self, data):
-        # Sort folders and executables
-        sorted_data = {}
-        folders = {k: v for k, v in data.items() if isinstance(v, dict)}
-        executables = {k: v for k, v in data.items() if not isinstance(v, dict)}
-
-        # Sort folders and executables alphabetically
-        for folder_name in sorted(folders):
-            sorted_data[folder_name] = self.sort_data_structure(folders[folder_name])
+        # Sort the whole data structure (only when asked for, adds and renames
+        # keep folders sorted as they go)
+        self.apply_change({"op": "sort"})
+
+        # Move the treeview items into the new order
+        self.refresh_treeview()
+
+    def apply_change(self, op):
+        # Apply one change (see catalog.py) to the data structure, its search
+        # index and the storage engine, the treeview follows in on_model_change
+        if not self.undoing:
+            self.undo.base(self.tree_data)
+        op = self.model.apply(op)
+        # Keep a copy, add changes hold folders that fill up later
+        self.unwritten.append((self.store.recorded, json.loads(json.dumps(op, default=json_default))))
+
+        # Changes made in one go (until Tk is idle again) are undone together
+        if not self.undoing:
+            if not self.undo.open:
+                self.after_idle(self.close_undo_step)
+            self.undo.record(op)
+
+    def close_undo_step(self):
+        # An import is a single step however many chunks it takes
+        if self.import_node is not None or self.catalog_reader is not None:
+            self.after(IMPORT_POLL_MS, self.close_undo_step)
+            return
+        self.undo.close_step()
 
-        for exe_name in sorted(executables):
-            sorted_data[exe_name] = executables[exe_name]
+    def undo_change(self):
+        self.step_undo(self.undo.undo)
 
-        return sorted_data
+    def redo_change(self):
+        self.step_undo(self.undo.redo)
 
-    def on_drag_start(self, event):
+    @profiled
+    def step_undo(self, step):
+        # Apply the changes of an undo or redo and show them, putting each
+        # entry back into its exact place rather than syncing the whole tree
+        if self.import_node is not None or self.catalog_reader is not None:
+            self.bell()
+            return
+        ops = step()
+        if ops is None:
+            self.bell()
+            return
+        self.undoing = True
         try:
-            # Identify the item being dragged
-            item_id = self.tree.identify_row(event.y)
-            if item_id:
-                self.dragging_item = item_id
-                # Create a floating label to follow the mouse cursor
-                item_text = self.tree.item(item_id, 'text')
-                self.drag_label = tk.Label(
-                    self, 
-                    text=item_text, 
-                    relief='solid', 
-                    bg='#333333',  # Dark background color
-                    fg='white',    # White text color for contrast
-                    font=('Arial', 10, 'bold'),  # Bold font for better readability
-                    padx=5,        # Padding for a cleaner look
-                    pady=2
-                )
-                # Place the label near the cursor
-                self.drag_label.place(x=event.x_root, y=event.y_root)
-        except AttributeError:
-            # Swallow the AttributeError and do nothing
-            pass
-
-
-    def on_drag_motion(self, event):
-        # Highlight the potential drop target and move the floating label
-        if self.dragging_item and self.drag_label:
-            target_item = self.tree.identify_row(event.y)
-            self.tree.selection_set(target_item)
-            
-            # Move the floating label to follow the mouse cursor
-            self.drag_label.place(x=event.x_root + 10, y=event.y_root + 10)  # Offset for better visibility
-
-    def on_drag_release(self, event):
-        if self.dragging_item:
-            # Hide or destroy the floating label
-            if self.drag_label:
-                self.drag_label.destroy()
-                self.drag_label = None
-            
-            # Identify the drop target
-            target_item = self.tree.identify_row(event.y)
+            for op in ops:
+                self.apply_change(op)
+        finally:
+            self.undoing = False
+
+        shown = self.view.data is self.tree_data and not self.search_entry.get().strip() and not self.quick_mode.get()
+        nodes = [self.nodes.id_of(path) for path in map(target_path, ops) if path is not None]
+        if (not shown or len(ops) > UNDO_PLACE_LIMIT or None in nodes
+                or not all([self.view.move(node_id) for node_id in nodes])):
+            self.refresh_treeview()
+            return
+        # Select the last entry that came back or changed
+        item_id = self.view.items.get(nodes[-1]) if nodes else None
+        if item_id is not None:
+            self.tree.selection_set(item_id)
+            self.tree.see(item_id)
+
+    def watch_remote(self):
+        # Merge changes other windows wrote into the catalog and the treeview
+        self.store.poll()
+        written = self.store.written_seq
+        remote = self.store.take_remote()
+        if remote:
+            self.merge_remote(remote)
+        # Catalogs read back later include these, they are on disk
+        self.unwritten = [(seq, op) for seq, op in self.unwritten if seq > written]
+        self.after(REMOTE_POLL_MS, self.watch_remote)
+
+    @profiled
+    def merge_remote(self, remote):
+        conflicts = []
+        for kind, payload, seq in remote:
+            # Our changes that come after these on disk, and the paths they touch
+            later = [op for op_seq, op in self.unwritten if op_seq > seq]
+            local_paths = {tuple(path) for op in later for path in (op.get('path'), target_path(op))
+                           if path is not None}
+            local_folders = {path[:-1] for path in local_paths}
+            local_sort = any(op['op'] == 'sort' for op in later)
+
+            if kind == "records":
+                ops = payload
+            else:
+                # The whole catalog as on disk, with our later changes on top
+                # (they reach the file with the next write)
+                data = payload
+                for op in later:
+                    try:
+                        apply_op(data, self.model.compact(op))
+                    except (KeyError, ValueError, TypeError):
+                        pass
+                ops = diff_ops(self.tree_data, data)
+
+            resync = False
+            for op in ops:
+                touched = {tuple(path) for path in (op.get('path'), target_path(op)) if path is not None}
+                if any(path[:depth] in local_paths for path in touched for depth in range(1, len(path) + 1)):
+                    conflicts.append(op)
+                    # On disk our change comes after theirs, reading it back settles the order
+                    resync = resync or kind == "records"
+                elif kind == "records" and later and (local_sort or op['op'] == 'sort' or
+                                                      any(path[:-1] in local_folders for path in touched)):
+                    # Both added to the same folder, the order on disk may differ from ours
+                    resync = True
+                try:
+                    op = self.model.apply(op, record=False)
+                except (KeyError, ValueError, TypeError):
+                    # Doesn't fit our copy any more, read the whole catalog again
+                    conflicts.append(op)
+                    resync = True
+                    break
+                self.undo.forget(op)
+            if resync:
+                self.store.request_resync()
+
+        self.refresh_treeview()
+        if conflicts:
+            self.report_conflicts(conflicts)
+
+    def report_conflicts(self, conflicts):
+        # Changes from another window that touched entries we changed as well
+        self.conflicts.extend(conflicts)
+        lines = []
+        for op in conflicts[:CONFLICTS_SHOWN]:
+            path = op.get('path') or []
+            lines.append(f"{op['op']} {'/'.join(path)}")
+        if len(conflicts) > CONFLICTS_SHOWN:
+            lines.append(f"... and {len(conflicts) - CONFLICTS_SHOWN} more")
+        messagebox.showwarning("Catalog Changed",
+                               "Another window changed entries you changed as well, the catalog now holds what was saved last:\n"
+                               + "\n".join(lines))
+
+    def on_model_change(self, event, node_id):
+        if event == 'remove':
+            # Delete the treeview items of nodes that are removed or overwritten
+            self.view.remove(node_id)
+        elif event == 'move':
+            self.view.relocate(node_id)
+        elif event == 'edit':
+            # The path check result was for the old executable path
+            self.view.set_tags(node_id, ())
+
+    @profiled
+    def drop_item(self, dragging_item, target_item):
+        # Identify the nodes on both ends of a drag
+        dragging_node = self.view.node_of(dragging_item)
+        target_node = self.view.node_of(target_item)
+
+        # If target_item is not valid or is the same as dragging_item, return without making changes
+        if target_node is None or dragging_node is None or target_node == dragging_node:
+            return
 
-            # If target_item is not valid or is the same as dragging_item, return without making changes
-            if not target_item or target_item == self.dragging_item:
-                self.dragging_item = None
-                return
+        # Get the parent of the target node
+        target_parent = self.nodes.parents[target_node]
 
-            # Get the parent of the target item
-            target_parent = self.tree.parent(target_item)
-            
-            # Prevent dropping into an executable
-            if self.tree.item(target_item, 'values') and self.tree.item(target_parent, 'values'):
-                self.dragging_item = None
-                messagebox.showerror("Invalid Drop", "Cannot drop into an executable.")
-                return
+        # Prevent dropping into an executable
+        if not self.nodes.is_folder(target_node) and not self.nodes.is_folder(target_parent):
+            messagebox.showerror("Invalid Drop", "Cannot drop into an executable.")
+            return
 
-            # Move the item in the data structure
-            item_name = self.tree.item(self.dragging_item, 'text').split(' ', 1)[-1]
-            dragging_path = self.get_data_path(self.dragging_item)
-            dragging_parent = self.get_current_level(self.tree_data, dragging_path[:-1])
-            item_data = dragging_parent.pop(item_name)
+        # Move the item in the data structure
+        dragging_path = self.nodes.path_of(dragging_node)
 
+        if not self.nodes.is_folder(target_node):
             # If the drop target is an executable, place the dragged item above it
-            if self.tree.item(target_item, 'values'):
-                # Get the level for the parent
-                target_path = self.get_data_path(target_parent)
-                target_level = self.get_current_level(self.tree_data, target_path)
-                
-                # Insert the item above the target item in the parent
-                new_target_data = {}
-                for key, value in target_level.items():
-                    if key == self.tree.item(target_item, 'text').split(' ', 1)[-1]:
-                        # Place the dragged item before the target item
-                        new_target_data[item_name] = item_data
-                    # Insert the original items
-                    new_target_data[key] = value
-
-                # Replace the parent level with the new order
-                target_level.clear()
-                target_level.update(new_target_data)
-
-                # Move the dragged item in the treeview
-                self.tree.move(self.dragging_item, target_parent, self.tree.index(target_item))
-            else:
-                # If not dropping on an executable, add to the new parent normally
-                target_path = self.get_data_path(target_item)
-                target_parent_level = self.get_current_level(self.tree_data, target_path)
-                target_parent_level[item_name] = item_data
-                
-                # Move the dragged item in the treeview
-                self.tree.move(self.dragging_item, target_item, 'end')
+            move_to = self.nodes.path_of(target_parent)
+            before = self.nodes.names[target_node]
+        else:
+            # If not dropping on an executable, add to the new parent normally
+            move_to = self.nodes.path_of(target_node)
+            before = None
 
-            # Clear the dragging state
-            self.dragging_item = None
+        try:
+            self.apply_change({"op": "move", "path": dragging_path, "to": move_to, "before": before})
+        except ValueError as e:
+            messagebox.showerror("Invalid Drop", str(e))
+            return
 
-            # Save the updated treeview to the data file
-            self.save_data()
+        # Move just that item in the treeview, filtered views are shown again
+        if self.search_entry.get().strip() or self.quick_mode.get() or not self.view.move(dragging_node):
+            self.refresh_treeview()
 
 
+    @profiled
     def load_data(self):
         try:
-            # Load self.tree_data from a JSON file
-            with open(DATA_FILE, 'r') as file:
-                self.tree_data = json.load(file)
+            # Load the data structure from the startup cache if the catalog files
+            # haven't changed, otherwise through the storage engine
+            self.model.load()
+            self.cache_used = self.model.from_cache
+            if not self.cache_used:
+                # Have the startup cache ready for next time
+                self.after(STARTUP_CACHE_DELAY_MS, self.startup_cache.rebuild)
             
-            # Clear the treeview and rebuild it using the loaded data
-            self.tree.delete(*self.tree.get_children())
+            # Clear the treeview and rebuild it using the loaded data,
+            # only creating items for opened folders if the catalog is large
+            self.view.clear()
+            self.view.nodes = self.model.nodes
+            self.view.lazy = self.model.entry_count() > LAZY_THRESHOLD
             self.rebuild_treeview(self.tree_data)
-        except (FileNotFoundError, json.JSONDecodeError):
-            # If the file doesn't exist or is malformed, initialize default data
+        except FileNotFoundError:
+            # If the file doesn't exist, initialize default data
+            self.initialize_default_data()
+        except json.JSONDecodeError as e:
+            # If the file is malformed, keep it aside before starting over with default data
+            corrupt_file = DATA_FILE + ".corrupt"
+            os.replace(DATA_FILE, corrupt_file)
+            messagebox.showwarning("Load Error", f"{DATA_FILE} could not be read and was moved to {corrupt_file}.\nError: {e}")
             self.initialize_default_data()
+        # Nothing to undo in a freshly loaded catalog
+        self.undo.reset()
 
     def initialize_default_data(self):
         # Initialize a default data structure
-        self.tree_data = {
+        self.model.set_data({
             "Root": {
             }
-        }
+        })
 
         # Clear the current treeview and rebuild it using the default data
-        self.tree.delete(*self.tree.get_children())
+        self.view.clear()
+        self.view.nodes = self.model.nodes
         self.rebuild_treeview(self.tree_data)
 
+    @profiled
     def save_data(self):
-        # Save self.tree_data to a JSON file
-        with open(DATA_FILE, 'w') as file:
-            json.dump(self.tree_data, file, indent=4)
+        # Changes are stored as they happen, wait until the storage engine has written them
+        if not self.store.flush(timeout=10):
+            messagebox.showwarning("Save", "Saving is taking longer than expected, it continues in the background.")
+        elif self.store.stats()['last_error']:
+            messagebox.showerror("Save", f"Failed to save {DATA_FILE}\nError: {self.store.stats()['last_error']}")
+
+    def on_exit(self):
+        # Make sure every change is on disk before quitting,
+        # executables that were started keep running
+        self.profiler.disable()
+        # Changes written this session leave the startup cache behind the files
+        written = self.store.recorded
+        flushed = self.store.close(timeout=10)
+        self.launcher.close(timeout=1)
+        self.monitor.close(timeout=5)
+        self.history.close(timeout=5)
+        self.health_scanner.cancel()
+        self.importer.cancel()
+        if self.catalog_reader is not None:
+            self.catalog_reader.close()
+        self.search_worker.close()
+        self.destroy()
+        if written and flushed:
+            # Save what the window holds, which is what the flushed files hold,
+            # once the window is gone
+            self.model.save_cache()
 
 # Run the application
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+# Background check that the executables in the catalog still exist.
+#
+# Every path is stat'ed on a thread pool. Size and mtime (and, for files that
+# might be duplicates, a content hash) are kept in a cache file keyed by path,
+# so a rescan only hashes what changed since the last one. Results are
+# queued for the Tk thread, which picks them up in small batches.
+#
+# Statuses: "ok", "missing" (gone or not a file), "changed" (size or mtime
+# differ from the last scan) and "duplicate" (same content as another path).
+
+import hashlib
+import json
+import os
+import stat
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from persistence import atomic_write_json
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def stat_path(path):
+    # (mtime in ns, size) of a regular file, None if there is none
+    try:
+        info = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if not stat.S_ISREG(info.st_mode):
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+def hash_file(path):
+    # SHA-1 of a file's content, None if it can't be read
+    digest = hashlib.sha1()
+    try:
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+                digest.update(chunk)
+    except OSError:
+        return None
+    return digest.hexdigest()
+
+
+def load_cache(cache_path):
+    # path -> [mtime in ns, size, hash or None] from the last scan
+    try:
+        with open(cache_path, 'r', encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+class HealthScanner:
+    def __init__(self, cache_path, workers=8, find_duplicates=True):
+        self.cache_path = cache_path
+        self.workers = workers
+        self.find_duplicates = find_duplicates
+
+        self.lock = threading.Lock()
+        self.thread = None
+        self.cancelled = False
+        # (path, status) waiting for the Tk thread
+        self.results = []
+        # Lists of paths with the same content, from the last scan
+        self.duplicates = []
+        self.summary = {}
+
+    def start(self, paths):
+        # Scan paths in the background, False if a scan is already running
+        if self.running():
+            return False
+        self.cancelled = False
+        # Stays empty if the scan is cancelled or fails before it finishes
+        self.summary = {}
+        with self.lock:
+            self.results = []
+        paths = list(dict.fromkeys(paths))
+        self.thread = threading.Thread(target=self.scan, args=(paths,), name="health-scan", daemon=True)
+        self.thread.start()
+        return True
+
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def cancel(self):
+        self.cancelled = True
+
+    def take_results(self, limit):
+        # Up to limit (path, status) results, oldest first
+        with self.lock:
+            results = self.results[:limit]
+            del self.results[:limit]
+            return results
+
+    def publish(self, path, status):
+        with self.lock:
+            self.results.append((path, status))
+
+    def scan(self, paths):
+        start = time.perf_counter()
+        cache = load_cache(self.cache_path)
+        fresh = {}
+        counts = {'ok': 0, 'missing': 0, 'changed': 0, 'duplicate': 0}
+        hashed = 0
+
+        pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="health-stat")
+        try:
+            for path, info in zip(paths, pool.map(stat_path, paths)):
+                if self.cancelled:
+                    return
+                if info is None:
+                    status = 'missing'
+                else:
+                    cached = cache.get(path)
+                    unchanged = cached is not None and cached[:2] == list(info)
+                    status = 'changed' if cached is not None and not unchanged else 'ok'
+                    # A hash is only reused while size and mtime stay the same
+                    fresh[path] = [info[0], info[1], cached[2] if unchanged else None]
+                counts[status] += 1
+                self.publish(path, status)
+
+            duplicates = []
+            if self.find_duplicates:
+                # Only files that share their size with another file can be duplicates
+                by_size = {}
+                for path, (_, size, _) in fresh.items():
+                    by_size.setdefault(size, []).append(path)
+                candidates = [path for group in by_size.values() if len(group) > 1 for path in group]
+                unhashed = [path for path in candidates if fresh[path][2] is None]
+                for path, digest in zip(unhashed, pool.map(hash_file, unhashed)):
+                    if self.cancelled:
+                        return
+                    fresh[path][2] = digest
+                    hashed += 1
+
+                by_hash = {}
+                for path in candidates:
+                    if fresh[path][2] is not None:
+                        by_hash.setdefault(fresh[path][2], []).append(path)
+                duplicates = [group for group in by_hash.values() if len(group) > 1]
+                for group in duplicates:
+                    for path in group:
+                        counts['duplicate'] += 1
+                        self.publish(path, 'duplicate')
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+        error = None
+        try:
+            atomic_write_json(self.cache_path, fresh, indent=None)
+        except OSError as e:
+            error = e
+
+        self.duplicates = duplicates
+        self.summary = dict(counts, scanned=len(paths), hashed=hashed, error=error,
+                            seconds=time.perf_counter() - start)
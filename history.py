@@ -0,0 +1,64 @@
+# Launch history used to rank quick-launch results.
+#
+# For every executable path the history keeps the number of launches, the
+# time of the last one and a frecency score: each launch adds 1 and the score
+# halves every half_life seconds, so tools used often and recently rank
+# highest. Three numbers per path are all that is stored, and the file is
+# rewritten on a background thread after each launch, or once for a batch
+# of launches.
+
+import json
+import time
+
+from persistence import BackgroundWriter, atomic_write_json
+
+
+class LaunchHistory:
+    def __init__(self, path, half_life_days=14):
+        self.path = path
+        self.half_life = half_life_days * 24 * 60 * 60
+        # exe path -> [launch count, last launch time, score at last launch]
+        self.entries = {}
+        self.writer = BackgroundWriter(name="history-writer")
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            self.entries = {}
+        except ValueError:
+            # A damaged history only costs the ranking, start over
+            self.entries = {}
+
+    def decay(self, age):
+        return 0.5 ** (max(age, 0) / self.half_life)
+
+    def record(self, exe_path, now=None):
+        # Count a launch and save the history in the background
+        self.record_many((exe_path,), now)
+
+    def record_many(self, exe_paths, now=None):
+        # Count a launch of each path (a path listed twice counts twice) and
+        # save the history once for all of them
+        now = time.time() if now is None else now
+        for exe_path in exe_paths:
+            count, last, score = self.entries.get(exe_path, (0, now, 0.0))
+            self.entries[exe_path] = [count + 1, now, score * self.decay(now - last) + 1]
+
+        snapshot = {key: list(entry) for key, entry in self.entries.items()}
+        self.writer.submit(lambda: atomic_write_json(self.path, snapshot, indent=None), key="history")
+
+    def frecency(self, exe_path, now=None):
+        entry = self.entries.get(exe_path)
+        if entry is None:
+            return 0.0
+        now = time.time() if now is None else now
+        return entry[2] * self.decay(now - entry[1])
+
+    def launch_count(self, exe_path):
+        entry = self.entries.get(exe_path)
+        return entry[0] if entry else 0
+
+    def close(self, timeout=None):
+        return self.writer.close(timeout)
@@ -0,0 +1,207 @@
+# Opt-in timing of the launcher window's operations.
+#
+# OperationProfiler times each user-facing operation (the methods decorated
+# with @profiled), counts the Tk calls it makes and can record it with
+# cProfile as well. Tk calls are counted by giving every widget a
+# TkCallCounter in place of its Tcl interpreter; it forwards everything and
+# counts the round trips to Tcl (call and eval), and widgets created later
+# copy it from their master. An after() heartbeat measures how late the
+# event loop gets to run callbacks, i.e. for how long it was blocked.
+#
+# While disabled, a decorated method costs one attribute check.
+
+import cProfile
+import collections
+import functools
+import json
+import time
+
+# Heartbeat interval, how many lag samples are kept (a minute's worth) and
+# the lag above which the event loop counts as stalled, in milliseconds
+HEARTBEAT_MS = 100
+LAG_SAMPLES = 600
+STALL_MS = 100
+
+
+def profiled(method):
+    # Run a method of a window with a profiler attribute as an operation named after it
+    name = method.__name__
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profiler = self.profiler
+        if not profiler.enabled:
+            return method(self, *args, **kwargs)
+        return profiler.run(name, method, self, *args, **kwargs)
+    return wrapper
+
+
+class TkCallCounter:
+    # Stands in for a tkapp (Tcl interpreter) object, counting calls into Tcl
+    def __init__(self, tkapp):
+        self.tkapp = tkapp
+        self.calls = 0
+
+    def call(self, *args):
+        self.calls += 1
+        return self.tkapp.call(*args)
+
+    def eval(self, script):
+        self.calls += 1
+        return self.tkapp.eval(script)
+
+    def __getattr__(self, name):
+        return getattr(self.tkapp, name)
+
+
+class OperationStats:
+    __slots__ = ('count', 'total', 'max', 'last', 'tk_calls', 'last_tk_calls')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+        self.tk_calls = 0
+        self.last_tk_calls = 0
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "total_ms": self.total * 1000,
+            "avg_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "max_ms": self.max * 1000,
+            "last_ms": self.last * 1000,
+            "tk_calls": self.tk_calls,
+            "avg_tk_calls": self.tk_calls / self.count if self.count else 0.0,
+            "last_tk_calls": self.last_tk_calls,
+        }
+
+
+class OperationProfiler:
+    def __init__(self, root):
+        self.root = root
+        self.enabled = False
+        self.counter = None
+        # operation name -> OperationStats
+        self.operations = {}
+        # Operations in progress, nested ones are counted in their callers too
+        self.depth = 0
+        self.last_operation = None
+
+        # cProfile of the operations, when capture_profile is set
+        self.capture_profile = False
+        self.profile = None
+
+        # Event loop lag in milliseconds
+        self.heartbeat = None
+        self.expected = None
+        self.lags = collections.deque(maxlen=LAG_SAMPLES)
+        self.max_lag = 0.0
+        self.max_lag_after = None
+        self.stalls = 0
+
+    def enable(self):
+        if self.enabled:
+            return
+        self.enabled = True
+        self.counter = TkCallCounter(self.root.tk)
+        self.swap_interpreter(self.root, self.counter)
+        self.expected = time.perf_counter() + HEARTBEAT_MS / 1000
+        self.heartbeat = self.root.after(HEARTBEAT_MS, self.beat)
+
+    def disable(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        self.root.after_cancel(self.heartbeat)
+        self.heartbeat = None
+        self.swap_interpreter(self.root, self.counter.tkapp)
+
+    def swap_interpreter(self, widget, tkapp):
+        # Give widget and everything below it (menus and windows included) tkapp
+        widget.tk = tkapp
+        for child in widget.children.values():
+            self.swap_interpreter(child, tkapp)
+
+    def set_capture_profile(self, capture):
+        # Record the operations with cProfile from now on (or stop), keeping what was recorded
+        self.capture_profile = capture
+        if capture and self.profile is None:
+            self.profile = cProfile.Profile()
+
+    def run(self, name, function, *args, **kwargs):
+        profile = self.profile if self.capture_profile and self.depth == 0 else None
+        calls_before = self.counter.calls
+        self.depth += 1
+        start = time.perf_counter()
+        if profile is not None:
+            profile.enable()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            elapsed = time.perf_counter() - start
+            self.depth -= 1
+            stats = self.operations.get(name)
+            if stats is None:
+                stats = self.operations[name] = OperationStats()
+            stats.count += 1
+            stats.total += elapsed
+            stats.max = max(stats.max, elapsed)
+            stats.last = elapsed
+            stats.last_tk_calls = self.counter.calls - calls_before
+            stats.tk_calls += stats.last_tk_calls
+            self.last_operation = name
+
+    def beat(self):
+        # How much later than asked for the event loop ran this callback
+        now = time.perf_counter()
+        lag = max(0.0, (now - self.expected) * 1000)
+        self.lags.append(lag)
+        if lag > self.max_lag:
+            self.max_lag = lag
+            self.max_lag_after = self.last_operation
+        if lag > STALL_MS:
+            self.stalls += 1
+        self.expected = now + HEARTBEAT_MS / 1000
+        self.heartbeat = self.root.after(HEARTBEAT_MS, self.beat)
+
+    def reset(self):
+        self.operations.clear()
+        self.lags.clear()
+        self.max_lag = 0.0
+        self.max_lag_after = None
+        self.stalls = 0
+        if self.profile is not None:
+            self.profile = cProfile.Profile() if self.capture_profile else None
+
+    def snapshot(self):
+        # Everything measured so far, in JSON-ready form
+        lags = list(self.lags)
+        return {
+            "enabled": self.enabled,
+            "operations": {name: stats.as_dict() for name, stats in sorted(self.operations.items())},
+            "event_loop": {
+                "heartbeat_ms": HEARTBEAT_MS,
+                "samples": len(lags),
+                "last_lag_ms": lags[-1] if lags else 0.0,
+                "avg_lag_ms": sum(lags) / len(lags) if lags else 0.0,
+                "max_lag_ms": self.max_lag,
+                "max_lag_after": self.max_lag_after,
+                "stalls": self.stalls,
+                "stall_ms": STALL_MS,
+            },
+            "tk_calls": self.counter.calls if self.counter is not None else 0,
+        }
+
+    def export_json(self, path):
+        with open(path, 'w') as file:
+            json.dump(self.snapshot(), file, indent=4)
+
+    def export_profile(self, path):
+        # Write the cProfile stats (for pstats or snakeviz), ValueError if none were recorded
+        if self.profile is None:
+            raise ValueError("No cProfile data was recorded")
+        self.profile.dump_stats(path)
@@ -0,0 +1,348 @@
+# Starts executables off the Tk thread and keeps track of them.
+#
+# A launch request is queued and picked up by a daemon thread, which spawns
+# the executable directly (no shell) whenever the path is a file it can run
+# or a command found on PATH, and falls back to the shell for anything else
+# (scripts, documents, URLs, commands with arguments). A file path that
+# doesn't exist fails like any other launch that can't start. The same
+# thread polls the live children so they are reaped as soon as they exit and
+# never linger as zombies. The Tk side only reads snapshots and failures, it
+# never waits on a process.
+#
+# A batch (a whole folder of executables) is fed to the same thread a few at
+# a time: no more than its limit run at once, and starts can be spaced out.
+#
+# Given a monitor (see process_monitor.py), every process that starts is
+# handed to it with watch(), and reported to it with exiting() once it has
+# exited and with finish() once it is reaped.
+
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import threading
+import time
+
+# Extensions Windows can start without going through cmd.exe
+DIRECT_EXTENSIONS = ('.exe', '.com')
+# "https://...", "mailto:..." and the like (but not a drive letter such as "C:")
+URL_PATTERN = re.compile(r'[A-Za-z][A-Za-z0-9+.-]+:')
+
+
+def missing_file(path):
+    # Whether path names a file, possibly followed by arguments, that doesn't exist
+    if URL_PATTERN.match(path) or not (os.path.isabs(path) or '/' in path or os.sep in path):
+        return False
+    try:
+        program = shlex.split(path, posix=os.name != 'nt')[0].strip('"')
+    except (ValueError, IndexError):
+        program = path
+    return not os.path.exists(path) and not os.path.exists(program)
+
+
+def command_for(path):
+    # The Popen command and shell flag for an executable path or a command
+    # on PATH, FileNotFoundError for a file path that doesn't exist
+    program = path if os.path.isfile(path) else shutil.which(path)
+    if program is not None:
+        if os.name == 'nt':
+            if program.lower().endswith(DIRECT_EXTENSIONS):
+                return [program], False
+        elif os.access(program, os.X_OK):
+            return [program], False
+        return path, True
+    if missing_file(path):
+        # The shell would start anyway and only exit with 127
+        raise FileNotFoundError(f"No such file: '{path}'")
+    return path, True
+
+
+class Launch:
+    __slots__ = ('launch_id', 'name', 'path', 'batch', 'requested', 'started', 'ended',
+                 'pid', 'exit_code', 'spawn_ms', 'shell', 'error', 'process')
+
+    def __init__(self, launch_id, name, path, batch=None):
+        self.launch_id = launch_id
+        self.name = name
+        self.path = path
+        self.batch = batch
+        self.requested = time.perf_counter()
+        # Wall clock times, None until they happen
+        self.started = None
+        self.ended = None
+        self.pid = None
+        self.exit_code = None
+        # Time from the request until the process existed
+        self.spawn_ms = None
+        self.shell = False
+        self.error = None
+        self.process = None
+
+    def status(self):
+        if self.error is not None:
+            return f"failed: {self.error}"
+        if self.pid is None:
+            return "starting"
+        if self.exit_code is None:
+            return "running"
+        return f"exited ({self.exit_code})"
+
+
+class Batch:
+    __slots__ = ('batch_id', 'name', 'entries', 'total', 'max_running', 'stagger',
+                 'next_start', 'launches', 'failures')
+
+    def __init__(self, batch_id, name, entries, max_running, stagger):
+        self.batch_id = batch_id
+        self.name = name
+        # (name, path) pairs still to be started, in order
+        self.entries = list(entries)
+        self.total = len(self.entries)
+        # 0 means no limit, stagger is in seconds
+        self.max_running = max_running
+        self.stagger = stagger
+        self.next_start = 0.0
+        self.launches = []
+        self.failures = []
+
+    def running(self):
+        return sum(1 for launch in self.launches if launch.ended is None)
+
+    def progress(self):
+        running = self.running()
+        return {
+            'name': self.name,
+            'total': self.total,
+            'queued': len(self.entries),
+            # Queued to the supervisor thread but not spawned yet counts as neither
+            'started': sum(1 for launch in self.launches if launch.pid is not None),
+            'failed': len(self.failures),
+            # (path, error) of every entry that could not be started
+            'failures': [(launch.path, launch.error) for launch in self.failures],
+            'running': running,
+            # Every entry was started (or failed to), whether or not it still runs
+            'done': not self.entries and all(launch.pid is not None or launch.error is not None
+                                             for launch in self.launches),
+        }
+
+
+class LaunchSupervisor:
+    def __init__(self, poll_interval=0.25, history=100, name="launch-supervisor", monitor=None):
+        self.poll_interval = poll_interval
+        self.monitor = monitor
+        # Finished launches kept around for the Running panel
+        self.history = history
+
+        self.condition = threading.Condition()
+        self.requests = []
+        # launch id -> Launch, in launch order
+        self.launches = {}
+        self.live = []
+        self.failures = []
+        # batch id -> Batch, until the batch is forgotten
+        self.batches = {}
+        self.next_id = 1
+        self.closed = False
+
+        # Statistics, in milliseconds
+        self.launched = 0
+        self.failed = 0
+        self.last_spawn_ms = 0.0
+        self.max_spawn_ms = 0.0
+        self.total_spawn_ms = 0.0
+
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def launch(self, name, path):
+        # Queue an executable to be started, returns its launch id
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("supervisor is closed")
+            launch = self.queue_launch(name, path)
+            self.condition.notify_all()
+            return launch.launch_id
+
+    def queue_launch(self, name, path, batch=None):
+        launch = Launch(self.next_id, name, path, batch)
+        self.next_id += 1
+        self.launches[launch.launch_id] = launch
+        self.requests.append(launch)
+        return launch
+
+    def launch_batch(self, name, entries, max_running=0, stagger=0.0):
+        # Queue (name, path) pairs to be started with at most max_running
+        # running at once and stagger seconds between starts, returns the batch id
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("supervisor is closed")
+            batch = Batch(self.next_id, name, entries, max_running, stagger)
+            self.next_id += 1
+            self.batches[batch.batch_id] = batch
+            self.condition.notify_all()
+            return batch.batch_id
+
+    def feed_batches(self):
+        # Queue the batch entries whose turn has come (called with the lock held)
+        now = time.perf_counter()
+        for batch in self.batches.values():
+            running = batch.running()
+            while batch.entries and now >= batch.next_start:
+                if batch.max_running and running >= batch.max_running:
+                    break
+                name, path = batch.entries.pop(0)
+                batch.launches.append(self.queue_launch(name, path, batch))
+                running += 1
+                if batch.stagger:
+                    batch.next_start = now + batch.stagger
+                    break
+
+    def wakeup_timeout(self):
+        # Seconds until there is something to do, None to wait for a request
+        timeouts = []
+        if self.live:
+            # Wake up now and then to reap children that exited
+            timeouts.append(self.poll_interval)
+        now = time.perf_counter()
+        for batch in self.batches.values():
+            if batch.entries and not (batch.max_running and batch.running() >= batch.max_running):
+                timeouts.append(max(0.0, batch.next_start - now))
+        return min(timeouts) if timeouts else None
+
+    def run(self):
+        while True:
+            with self.condition:
+                self.feed_batches()
+                if not self.requests and not self.closed:
+                    self.condition.wait(self.wakeup_timeout())
+                    self.feed_batches()
+                if self.closed:
+                    return
+                requests, self.requests = self.requests, []
+
+            for launch in requests:
+                self.spawn(launch)
+            self.reap()
+
+    def spawn(self, launch):
+        try:
+            command, shell = command_for(launch.path)
+            process = subprocess.Popen(command, shell=shell)
+        except Exception as error:
+            with self.condition:
+                launch.error = error
+                launch.ended = time.time()
+                self.failed += 1
+                # Batches report their own failures
+                if launch.batch is None:
+                    self.failures.append(launch)
+                else:
+                    launch.batch.failures.append(launch)
+                self.trim_history()
+            return
+
+        spawn_ms = (time.perf_counter() - launch.requested) * 1000
+        with self.condition:
+            launch.process = process
+            launch.pid = process.pid
+            launch.shell = shell
+            launch.started = time.time()
+            launch.spawn_ms = spawn_ms
+            self.live.append(launch)
+            self.launched += 1
+            self.last_spawn_ms = spawn_ms
+            self.max_spawn_ms = max(self.max_spawn_ms, spawn_ms)
+            self.total_spawn_ms += spawn_ms
+        if self.monitor is not None:
+            self.monitor.watch(launch.launch_id, launch.path, launch.pid, launch.started)
+
+    def reap(self):
+        # Collect the exit code of every child that finished
+        for launch in list(self.live):
+            if self.monitor is not None and hasattr(os, 'waitid'):
+                # Let the monitor read the numbers of a child that exited before it is reaped
+                try:
+                    if os.waitid(os.P_PID, launch.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None:
+                        self.monitor.exiting(launch.launch_id, launch.pid)
+                except ChildProcessError:
+                    pass
+            exit_code = launch.process.poll()
+            if exit_code is None:
+                continue
+            with self.condition:
+                launch.exit_code = exit_code
+                launch.ended = time.time()
+                launch.process = None
+                self.live.remove(launch)
+                self.trim_history()
+            if self.monitor is not None:
+                self.monitor.finish(launch.launch_id, launch.ended)
+
+    def trim_history(self):
+        # Forget the oldest finished launches beyond the history limit
+        finished = [launch_id for launch_id, launch in self.launches.items()
+                    if launch.ended is not None and launch not in self.failures]
+        for launch_id in finished[:max(0, len(finished) - self.history)]:
+            del self.launches[launch_id]
+
+    def pending(self):
+        # Launches that haven't started (or failed) yet, or failures not yet reported
+        with self.condition:
+            return bool(self.failures) or any(launch.pid is None and launch.error is None
+                                              for launch in self.launches.values())
+
+    def batch_progress(self, batch_id):
+        # Counts for a batch: total, queued, started, failed, running and done
+        with self.condition:
+            return self.batches[batch_id].progress()
+
+    def forget_batch(self, batch_id):
+        # Stop feeding a batch, launches already started are still tracked
+        with self.condition:
+            self.batches.pop(batch_id, None)
+
+    def take_failures(self):
+        # Launches that could not be started since the last call
+        with self.condition:
+            failures, self.failures = self.failures, []
+            return failures
+
+    def snapshot(self):
+        # (launch id, name, path, pid, started, ended, status, spawn ms) for every known launch
+        with self.condition:
+            return [(launch.launch_id, launch.name, launch.path, launch.pid, launch.started,
+                     launch.ended, launch.status(), launch.spawn_ms)
+                    for launch in self.launches.values()]
+
+    def terminate(self, launch_id):
+        # Ask a running child to stop, it is reaped like any other
+        with self.condition:
+            launch = self.launches.get(launch_id)
+            process = launch.process if launch is not None else None
+        if process is not None:
+            process.terminate()
+
+    def clear_finished(self):
+        with self.condition:
+            for launch_id in [launch_id for launch_id, launch in self.launches.items() if launch.ended is not None]:
+                del self.launches[launch_id]
+
+    def stats(self):
+        with self.condition:
+            return {
+                'launched': self.launched,
+                'failed': self.failed,
+                'running': len(self.live),
+                'queued': len(self.requests),
+                'last_spawn_ms': self.last_spawn_ms,
+                'max_spawn_ms': self.max_spawn_ms,
+                'avg_spawn_ms': self.total_spawn_ms / self.launched if self.launched else 0.0,
+            }
+
+    def close(self, timeout=None):
+        # Stop supervising, children keep running on their own
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
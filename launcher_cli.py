@@ -0,0 +1,181 @@
+# Command line access to the catalog, without starting the Tk window.
+#
+#   python launcher_cli.py list [--json]
+#   python launcher_cli.py search <query> [--limit N] [--json]
+#   python launcher_cli.py run <name or Folder/Sub/Name> [--best] [--json]
+#
+# tkinter is never imported. The executables are read from a flat index file
+# (FLAT_INDEX_FILE) that is only rebuilt from the catalog when the catalog
+# files' mtime or size changed, so a hotkey or script can go from a cold start
+# to a spawned process without loading and replaying the whole catalog.
+
+import time
+
+START = time.perf_counter()
+
+import argparse
+import heapq
+import json
+import os
+import subprocess
+import sys
+
+from catalog import iter_executables
+from history import LaunchHistory
+from launcher import command_for
+from persistence import atomic_write_json
+from search_index import match_score, subsequence_pattern
+from settings import DATA_FILE, FLAT_INDEX_FILE, FRECENCY_HALF_LIFE_DAYS, FRECENCY_WEIGHT, HISTORY_FILE
+from startup_cache import read_catalog, source_files, source_signature
+
+FLAT_INDEX_VERSION = 1
+
+
+def load_entries():
+    # [folder path, name, exe path, emoji] for every executable, and whether
+    # they came from the flat index
+    signature = source_signature(source_files())
+    try:
+        with open(FLAT_INDEX_FILE, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        if index.get('version') == FLAT_INDEX_VERSION and index.get('source') == signature:
+            return index['entries'], True
+    except (OSError, ValueError):
+        pass
+
+    entries = [[list(path[:-1]), path[-1], value['path'], value.get('emoji', '')]
+               for path, value in iter_executables(read_catalog()[0])]
+    try:
+        atomic_write_json(FLAT_INDEX_FILE, {'version': FLAT_INDEX_VERSION, 'source': signature, 'entries': entries},
+                          indent=None)
+    except OSError:
+        # Without a writable index every run just loads the catalog
+        pass
+    return entries, False
+
+
+def tree_path(entry):
+    return "/".join(entry[0] + [entry[1]])
+
+
+def describe(entry, **extra):
+    result = {'name': entry[1], 'folder': entry[0], 'path': entry[2], 'emoji': entry[3]}
+    result.update(extra)
+    return result
+
+
+def rank(entries, query, history, limit):
+    # (score, entry) of the best fuzzy matches, best first, like quick launch
+    query = query.lower()
+    pattern = subsequence_pattern(query)
+    now = time.time()
+    scored = []
+    for entry in entries:
+        score = match_score(pattern, query, entry[1].lower(), entry[2].lower(),
+                            usage=history.frecency(entry[2], now), usage_weight=FRECENCY_WEIGHT)
+        if score is not None:
+            scored.append((score, entry))
+    return heapq.nlargest(limit, scored, key=lambda result: result[0])
+
+
+def resolve(entries, target):
+    # Executables named target, or at the tree path target ("Folder/Sub/Name")
+    if "/" in target:
+        return [entry for entry in entries if tree_path(entry) == target]
+    target = target.lower()
+    return [entry for entry in entries if entry[1].lower() == target]
+
+
+def spawn(path):
+    # Start an executable that outlives this process
+    command, shell = command_for(path)
+    if os.name == 'nt':
+        return subprocess.Popen(command, shell=shell, creationflags=subprocess.CREATE_NEW_PROCESS_GROUP)
+    return subprocess.Popen(command, shell=shell, start_new_session=True)
+
+
+def output(args, data, lines):
+    if args.json:
+        print(json.dumps(data, ensure_ascii=False, indent=2))
+    else:
+        for line in lines:
+            print(line)
+
+
+def command_list(args, entries, history):
+    output(args, [describe(entry) for entry in entries],
+           [f"{tree_path(entry)}\t{entry[2]}" for entry in entries])
+    return 0
+
+
+def command_search(args, entries, history):
+    results = rank(entries, args.query, history, args.limit)
+    output(args, [describe(entry, score=round(score, 3)) for score, entry in results],
+           [f"{tree_path(entry)}\t{entry[2]}" for _, entry in results])
+    return 0 if results else 1
+
+
+def command_run(args, entries, history):
+    matches = resolve(entries, args.target)
+    if not matches and args.best:
+        matches = [entry for _, entry in rank(entries, args.target, history, 1)]
+    if len(matches) != 1:
+        if matches:
+            print(f"'{args.target}' is ambiguous, use the full path:", file=sys.stderr)
+            candidates = matches
+        else:
+            print(f"No executable named '{args.target}'. Closest matches:", file=sys.stderr)
+            candidates = [entry for _, entry in rank(entries, args.target, history, 5)]
+        for entry in candidates:
+            print(f"  {tree_path(entry)}", file=sys.stderr)
+        return 2 if matches else 1
+
+    entry = matches[0]
+    try:
+        process = spawn(entry[2])
+    except OSError as e:
+        print(f"Failed to execute: {entry[2]}\nError: {e}", file=sys.stderr)
+        return 1
+    startup_ms = (time.perf_counter() - START) * 1000
+    history.record(entry[2])
+    history.close(timeout=5)
+    output(args, describe(entry, pid=process.pid, startup_ms=round(startup_ms, 1), cached_index=args.cached),
+           [f"Started {tree_path(entry)} (pid {process.pid}) in {startup_ms:.0f} ms"])
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="launcher_cli.py", description="List, search and run catalog executables.")
+    parser.add_argument("--dir", default=".", help="folder holding the catalog files (default: current folder)")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--json", action="store_true", help="print JSON for scripts")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("list", parents=[common], help="list every executable")
+    search = commands.add_parser("search", parents=[common], help="fuzzy search, most used first")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=20)
+    run = commands.add_parser("run", parents=[common], help="start an executable by name or tree path")
+    run.add_argument("target")
+    run.add_argument("--best", action="store_true", help="start the best fuzzy match if no name matches exactly")
+
+    args = parser.parse_args(argv)
+    os.chdir(args.dir)
+
+    try:
+        entries, args.cached = load_entries()
+    except FileNotFoundError as e:
+        print(f"No catalog found: {e.filename}", file=sys.stderr)
+        return 1
+    except ValueError as e:
+        print(f"{DATA_FILE} could not be read\nError: {e}", file=sys.stderr)
+        return 1
+
+    history = LaunchHistory(HISTORY_FILE, half_life_days=FRECENCY_HALF_LIFE_DAYS)
+    history.load()
+    handler = {"list": command_list, "search": command_search, "run": command_run}[args.command]
+    return handler(args, entries, history)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
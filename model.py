@@ -0,0 +1,134 @@
+# Compact in-memory form of the catalog's executables.
+#
+# The JSON file describes the catalog as nested dicts, where a folder is a
+# dict of entries and an executable is a dict with "path" and "emoji" keys.
+# In memory (see CatalogModel) folders stay dicts, they are few and every
+# change works on them, but executables are small __slots__ objects with
+# their path split into directory and file name. Directories and emojis go
+# through a PathTable so each one is stored once, no matter how many
+# executables share it.
+#
+# An Executable reads like the dict it replaces (value['path'],
+# value.get('emoji')). Only from_json tells the two shapes apart, by a "path"
+# key holding text, which is ambiguous in the file (a folder may hold an entry
+# named "path"). Everything it hands out is unambiguous: a folder is a dict and
+# an executable is an Executable, see is_executable. Data (and the values of
+# change records) go through from_json wherever they are read, and
+# json_default turns them back when they are written.
+
+
+def split_path(path):
+    # "C:/Games/Foo/foo.exe" -> ("C:/Games/Foo/", "foo.exe"), either separator
+    cut = max(path.rfind('/'), path.rfind('\\')) + 1
+    return path[:cut], path[cut:]
+
+
+class PathTable:
+    # Shared directory prefixes (and emojis): equal strings become one object
+
+    __slots__ = ('strings',)
+
+    def __init__(self):
+        self.strings = {}
+
+    def intern(self, text):
+        return self.strings.setdefault(text, text)
+
+    def executable(self, path, emoji):
+        directory, file_name = split_path(path)
+        return Executable(self.intern(directory), file_name, self.intern(emoji))
+
+    def adopt(self, executable):
+        # executable if its strings are (or become) this table's, otherwise an equal one that uses them
+        directory = self.intern(executable.directory)
+        emoji = self.intern(executable.emoji)
+        if directory is executable.directory and emoji is executable.emoji:
+            return executable
+        return Executable(directory, executable.file_name, emoji)
+
+    def __len__(self):
+        return len(self.strings)
+
+
+class Executable:
+    # Never changed once made, an edit puts a new one in its place
+    __slots__ = ('directory', 'file_name', 'emoji')
+
+    def __init__(self, directory, file_name, emoji):
+        self.directory = directory
+        self.file_name = file_name
+        self.emoji = emoji
+
+    @property
+    def path(self):
+        return self.directory + self.file_name
+
+    def __getitem__(self, key):
+        if key == 'path':
+            return self.path
+        if key == 'emoji':
+            return self.emoji
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        return self[key] if key in ('path', 'emoji') else default
+
+    def __eq__(self, other):
+        if isinstance(other, (Executable, dict)):
+            return other.get('path') == self.path and other.get('emoji', '') == self.emoji
+        return NotImplemented
+
+    __hash__ = None
+
+    def to_json(self):
+        return {"path": self.path, "emoji": self.emoji}
+
+
+def is_entry(value):
+    # A folder or an executable, as opposed to anything else a folder may hold
+    return isinstance(value, (dict, Executable))
+
+
+def is_executable(value):
+    # Only for data that went through from_json
+    return isinstance(value, Executable)
+
+
+def from_json(value, paths):
+    # A folder (or executable) in the data file's shape with its executables
+    # made compact through paths, folders are copied. Data that is already
+    # compact passes through unchanged apart from the copies.
+    if isinstance(value, Executable):
+        return paths.adopt(value)
+    if isinstance(value.get('path'), str):
+        emoji = value.get('emoji', '')
+        return paths.executable(value['path'], emoji if isinstance(emoji, str) else '')
+    return folder_from_json(value, paths)
+
+
+def folder_from_json(folder, paths):
+    # from_json for what is known to be a folder, such as the catalog itself
+    return {key: from_json(child, paths) if is_entry(child) else child
+            for key, child in folder.items()}
+
+
+def compact_op(op, paths):
+    # A change record with its value made compact through paths, op itself is left alone
+    if not is_entry(op.get('value')):
+        return op
+    return dict(op, value=from_json(op['value'], paths))
+
+
+def to_json(value):
+    # The data file's shape of a folder or executable, folders are copied
+    if isinstance(value, Executable):
+        return value.to_json()
+    return {key: to_json(child) if is_entry(child) else child
+            for key, child in value.items()}
+
+
+def json_default(value):
+    # default for json.dump, writes executables in the data file's shape
+    if isinstance(value, Executable):
+        return value.to_json()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
@@ -0,0 +1,856 @@
+# Storage engines for the catalog data file.
+#
+# WriteBehindSaver rewrites the whole data file: mutations only mark the
+# catalog dirty, and after a short quiet period a snapshot of the data is
+# handed to a background thread, which serializes it to a temporary file,
+# fsyncs it and renames it over the data file, so a crash can never leave a
+# half-written catalog behind.
+#
+# JournalStore appends each change record (see catalog.py) to a journal next
+# to the data file and only rewrites the data file itself when the journal
+# grows past a threshold. On startup the data file is loaded and the journal
+# replayed on top of it.
+#
+# Both offer the same interface: load(), record(op), flush(), close() and
+# stats(), plus poll() and take_remote() for changes other launcher windows
+# made to the same files.
+
+import contextlib
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import zlib
+
+from catalog import apply_op
+from model import PathTable, compact_op, folder_from_json, json_default
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+
+def copy_tree(data):
+    # Snapshot of the data structure. Folder dicts are copied, executables
+    # (see model.py) are always replaced rather than changed, so they can be shared.
+    return {key: copy_tree(value) if isinstance(value, dict) else value
+            for key, value in data.items()}
+
+
+def parse_catalog(raw):
+    # Catalog data from the text (or bytes) of a data file, in the in-memory
+    # form that apply_op and the catalog code work on
+    return folder_from_json(json.loads(raw), PathTable())
+
+
+def replay(data, record, paths):
+    # Apply a change record read back from disk to data in the in-memory form
+    apply_op(data, compact_op(record, paths))
+
+
+def fsync_directory(directory):
+    # Make a rename durable (directories can't be opened on Windows)
+    if os.name != 'posix':
+        return
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def stat_key(path):
+    # (mtime in ns, size, inode) of a file (or open file descriptor), None if missing
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size, info.st_ino
+
+
+class FileLock:
+    # Advisory exclusive lock on a lock file next to the data file, taken by
+    # every window around its writes so they never interleave. It is held
+    # only while the writer thread touches the files.
+
+    def __init__(self, path):
+        self.path = path
+        # Threads of one process take turns before locking the file
+        self.thread_lock = threading.Lock()
+        self.file = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            self.file = open(self.path, 'a+b')
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_EX)
+            else:
+                self.file.seek(0)
+                while True:
+                    try:
+                        # Gives up after about 10 seconds, keep waiting
+                        msvcrt.locking(self.file.fileno(), msvcrt.LK_LOCK, 1)
+                        break
+                    except OSError:
+                        pass
+        except BaseException:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+            else:
+                self.file.seek(0)
+                msvcrt.locking(self.file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self.file.close()
+            self.file = None
+            self.thread_lock.release()
+
+
+def atomic_write_json(path, data, indent=4):
+    atomic_write_bytes(path, json.dumps(data, indent=indent, default=json_default).encode())
+
+
+def atomic_write_bytes(path, raw):
+    with atomic_file(path) as file:
+        file.write(raw)
+
+
+@contextlib.contextmanager
+def atomic_file(path):
+    # Binary file to write path through: a temporary file next to it that is
+    # renamed into place once the block finishes, and removed if it raises
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix=os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        # mkstemp creates private files, keep the permissions the data file had
+        try:
+            os.chmod(temp_path, os.stat(path).st_mode & 0o777)
+        except FileNotFoundError:
+            os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+    fsync_directory(directory)
+
+
+class BackgroundWriter:
+    # Runs write jobs one at a time on a daemon thread. A job submitted with a
+    # key replaces a queued job with the same key, so bursts collapse into one.
+
+    def __init__(self, name="catalog-writer"):
+        self.condition = threading.Condition()
+        self.jobs = []
+        self.busy = False
+        self.closed = False
+
+        # Statistics, in seconds
+        self.writes = 0
+        self.failures = 0
+        self.last_error = None
+        self.last_latency = 0.0
+        self.max_latency = 0.0
+        self.total_latency = 0.0
+
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def submit(self, job, key=None):
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("writer is closed")
+            if key is not None:
+                for pending in self.jobs:
+                    if pending[0] == key:
+                        pending[1] = job
+                        return
+            self.jobs.append([key, job])
+            self.condition.notify_all()
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.jobs and not self.closed:
+                    self.condition.wait()
+                if not self.jobs:
+                    return
+                _, job = self.jobs.pop(0)
+                self.busy = True
+
+            start = time.perf_counter()
+            try:
+                job()
+            except Exception as error:
+                # Keep the thread alive, the error is reported through stats()
+                self.failures += 1
+                self.last_error = error
+            latency = time.perf_counter() - start
+
+            with self.condition:
+                self.writes += 1
+                self.last_latency = latency
+                self.max_latency = max(self.max_latency, latency)
+                self.total_latency += latency
+                self.busy = False
+                self.condition.notify_all()
+
+    def wait(self, timeout=None):
+        # Block until every queued job has run, returns False on timeout
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self.condition:
+            while self.jobs or self.busy:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        finished = self.wait(timeout)
+        with self.condition:
+            self.closed = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        return finished
+
+    def queue_depth(self):
+        with self.condition:
+            return len(self.jobs) + (1 if self.busy else 0)
+
+    def stats(self):
+        with self.condition:
+            return {
+                "writes": self.writes,
+                "failures": self.failures,
+                "last_error": str(self.last_error) if self.last_error else None,
+                "queue_depth": len(self.jobs) + (1 if self.busy else 0),
+                "last_latency_ms": self.last_latency * 1000,
+                "max_latency_ms": self.max_latency * 1000,
+                "avg_latency_ms": self.total_latency * 1000 / self.writes if self.writes else 0.0,
+            }
+
+
+class WriteBehindSaver:
+    # Debounced, atomic saving of a JSON data file.
+    #
+    # snapshot is called to get the data to write; it runs wherever the timer
+    # fires, so a Tk app should pass schedule=self.after and
+    # cancel=self.after_cancel to take snapshots on the UI thread. Without them
+    # a threading.Timer is used, which suits scripts that don't mutate the data
+    # concurrently.
+    #
+    # Writes happen under the FileLock. If another window changed the file
+    # since we last read or wrote it, our changes are applied to its version
+    # instead of overwriting it, and the result is handed to take_remote().
+
+    def __init__(self, path, snapshot, delay_ms=500, max_delay_ms=3000, schedule=None, cancel=None):
+        self.path = path
+        self.snapshot = snapshot
+        self.delay_ms = delay_ms
+        self.max_delay_ms = max_delay_ms
+        self.schedule = schedule or self.schedule_timer
+        self.cancel = cancel or (lambda timer: timer.cancel())
+        self.writer = BackgroundWriter()
+        self.file_lock = FileLock(path + ".lock")
+
+        self.timer = None
+        self.dirty_since = None
+        self.pending_changes = 0
+        self.coalesced_changes = 0
+
+        # Shared with the writer thread: (number, change) not yet written
+        self.lock = threading.Lock()
+        self.pending_ops = []
+        self.recorded = 0
+        self.written_seq = 0
+        self.remote = []
+        self.remote_reloads = 0
+        # How many reloads were handed out, and how many the caller has taken
+        self.published = 0
+        self.taken = 0
+        # stat_key of the file as we last read or wrote it
+        self.disk_stat = None
+
+    def schedule_timer(self, delay_ms, callback):
+        timer = threading.Timer(delay_ms / 1000, callback)
+        timer.daemon = True
+        timer.start()
+        return timer
+
+    def load(self):
+        with open(self.path, 'r') as file:
+            self.disk_stat = stat_key(file.fileno())
+            return parse_catalog(file.read())
+
+    def cache_state(self):
+        # Nothing beyond the data itself is needed to carry on after load()
+        return {}
+
+    def resume(self, state):
+        # Carry on as if load() had run, for data that came from the startup cache
+        self.disk_stat = stat_key(self.path)
+
+    def saved_state(self):
+        # cache_state() once close() wrote everything, None if the file may
+        # hold something other than the caller's data (another window wrote it)
+        with self.lock:
+            if self.pending_ops or self.taken < self.published:
+                return None
+        if self.dirty_since is not None or stat_key(self.path) != self.disk_stat:
+            return None
+        return self.cache_state()
+
+    def record(self, op):
+        # The whole file is rewritten, the change is only kept (encoded, add
+        # changes hold folders that fill up later) in case another window
+        # wrote the file meanwhile
+        self.recorded += 1
+        with self.lock:
+            self.pending_ops.append((self.recorded, json.dumps(op, default=json_default)))
+        self.mark_dirty()
+
+    def mark_dirty(self):
+        # Called after every change, the actual write happens once things go quiet
+        now = time.monotonic()
+        if self.dirty_since is None:
+            self.dirty_since = now
+        self.pending_changes += 1
+
+        if self.timer is not None:
+            self.cancel(self.timer)
+        # Keep pushing the write back while changes keep coming, up to max_delay_ms
+        waited_ms = (now - self.dirty_since) * 1000
+        delay_ms = max(0, min(self.delay_ms, self.max_delay_ms - waited_ms))
+        self.timer = self.schedule(int(delay_ms), self.on_timer)
+
+    def on_timer(self):
+        self.timer = None
+        self.write_now()
+
+    def write_now(self):
+        # Take a snapshot now and queue it for the writer thread
+        if self.timer is not None:
+            self.cancel(self.timer)
+            self.timer = None
+        if self.dirty_since is None:
+            return
+        data = self.snapshot()
+        seq = self.recorded
+        taken = self.taken
+        self.coalesced_changes += self.pending_changes - 1
+        self.dirty_since = None
+        self.pending_changes = 0
+        self.writer.submit(lambda: self.write(data, seq, taken), key="snapshot")
+
+    def write(self, data, seq, taken):
+        # Runs on the writer thread. taken tells whether the snapshot already
+        # holds every reload handed out.
+        with self.lock:
+            ops = [op for op_seq, op in self.pending_ops if op_seq <= seq]
+            missed = taken < self.published
+        with self.file_lock:
+            current = stat_key(self.path)
+            rebased = current is not None and (current != self.disk_stat or missed)
+            if rebased:
+                # Another window wrote the file, apply our changes to its version
+                try:
+                    with open(self.path, 'r') as file:
+                        data = parse_catalog(file.read())
+                except ValueError:
+                    rebased = False
+                else:
+                    paths = PathTable()
+                    for op in ops:
+                        try:
+                            replay(data, json.loads(op), paths)
+                        except (KeyError, ValueError, TypeError):
+                            pass
+            atomic_write_json(self.path, data)
+            self.disk_stat = stat_key(self.path)
+            self.written_seq = seq
+        with self.lock:
+            self.pending_ops = [entry for entry in self.pending_ops if entry[0] > seq]
+            if rebased:
+                self.remote_reloads += 1
+                self.published += 1
+                self.remote.append(("reload", data, seq))
+
+    def poll(self):
+        # Cheap check (one stat) for another window having written the file
+        if self.disk_stat is not None and stat_key(self.path) != self.disk_stat:
+            self.writer.submit(self.check_remote, key="remote")
+
+    def request_resync(self):
+        self.writer.submit(lambda: self.check_remote(resync=True), key="resync")
+
+    def check_remote(self, resync=False):
+        # Runs on the writer thread
+        with self.file_lock:
+            current = stat_key(self.path)
+            if current is None or (current == self.disk_stat and not resync):
+                return
+            with open(self.path, 'r') as file:
+                data = parse_catalog(file.read())
+            self.disk_stat = current
+            seq = self.written_seq
+        with self.lock:
+            self.remote_reloads += 1
+            self.published += 1
+            self.remote.append(("reload", data, seq))
+
+    def take_remote(self):
+        # Changes from other windows, see JournalStore.take_remote()
+        with self.lock:
+            remote = self.remote
+            self.remote = []
+            self.taken = self.published
+            return remote
+
+    def flush(self, timeout=None):
+        # Write any pending changes and wait until they are on disk
+        self.write_now()
+        return self.writer.wait(timeout)
+
+    def close(self, timeout=None):
+        self.write_now()
+        return self.writer.close(timeout)
+
+    def stats(self):
+        stats = self.writer.stats()
+        stats["pending_changes"] = self.pending_changes
+        stats["coalesced_changes"] = self.coalesced_changes
+        stats["remote_reloads"] = self.remote_reloads
+        return stats
+
+
+def encode_record(record):
+    # One journal line: crc32 of the JSON, a space, the JSON and a newline
+    payload = json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=json_default).encode()
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+def decode_record(line):
+    # The record on a journal line, None if the line is torn or damaged
+    if not line.endswith(b"\n") or len(line) < 10 or line[8:9] != b" ":
+        return None
+    payload = line[9:-1]
+    try:
+        if int(line[:8], 16) != zlib.crc32(payload):
+            return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def content_hash(raw):
+    return hashlib.sha1(raw).hexdigest()
+
+
+class JournalStore:
+    # Append-only change journal on top of a compacted snapshot.
+    #
+    # The journal starts with a header naming the hash of the snapshot it
+    # applies to. Compaction writes a new snapshot and then a new journal for
+    # it, both atomically, so a crash in between leaves a journal whose header
+    # no longer matches and is ignored instead of being replayed twice.
+    #
+    # Several windows can share the files. Every write happens under the
+    # FileLock and first looks at what is on disk: records other windows
+    # appended are handed over before ours are added, and compaction starts
+    # from the files rather than from our copy whenever someone else wrote.
+    # poll() notices changes made while we were idle.
+    #
+    # snapshot is called to get the data for compaction, on the thread that
+    # calls record(), compact() or close().
+
+    def __init__(self, path, snapshot, compact_bytes=1 << 20):
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.snapshot = snapshot
+        self.compact_bytes = compact_bytes
+        self.writer = BackgroundWriter()
+        self.file_lock = FileLock(path + ".lock")
+
+        # Shared with the writer thread
+        self.lock = threading.Lock()
+        self.pending_lines = []
+        self.pending_snapshot = None
+        # Number of the last record queued, and of the last one on disk
+        self.pending_seq = 0
+        self.written_seq = 0
+        self.remote = []
+        # How many remote changes were handed out, and how many the caller has taken
+        self.published = 0
+        self.taken = 0
+        # Whether a snapshot exists on disk or is queued (only used by the caller's thread)
+        self.has_snapshot = False
+        self.recorded = 0
+
+        # What this instance has accounted for on disk: the snapshot (hash and
+        # stat_key) and how far into which journal file (inode) it has read
+        self.base_hash = None
+        self.base_stat = None
+        self.journal_ino = None
+        self.journal_offset = 0
+        # stat_key of both files after our last look, for poll()
+        self.disk_stamp = None
+
+        # Whether load() left a damaged journal tail in place (repair=False)
+        self.torn = False
+
+        # Size of the records in the journal, including queued ones
+        self.journal_bytes = 0
+        self.compactions = 0
+        self.replayed_records = 0
+        self.skipped_records = 0
+        self.remote_records = 0
+        self.remote_reloads = 0
+
+    def load(self, repair=True):
+        # Load the last snapshot and replay the journal on top of it. Readers
+        # that don't own the files pass repair=False to leave a torn tail alone.
+        with self.file_lock if repair else contextlib.nullcontext():
+            data, replayed, skipped, torn = self.read_disk(repair)
+        self.has_snapshot = True
+        self.replayed_records = replayed
+        self.skipped_records = skipped
+        self.torn = torn and not repair
+        return data
+
+    def read_disk(self, repair=False):
+        # The snapshot with the journal replayed on top, as (data, replayed,
+        # skipped, torn), and take it as what this instance builds on
+        with open(self.path, 'rb') as file:
+            base_stat = stat_key(file.fileno())
+            raw = file.read()
+        data = parse_catalog(raw)
+        self.base_hash = content_hash(raw)
+        self.base_stat = base_stat
+        self.journal_ino = None
+        self.journal_offset = 0
+        self.journal_bytes = 0
+        replayed = skipped = 0
+        torn = False
+
+        try:
+            journal = open(self.journal_path, 'rb')
+        except FileNotFoundError:
+            self.disk_stamp = self.stamp()
+            return data, replayed, skipped, torn
+
+        paths = PathTable()
+        with journal:
+            header = decode_record(journal.readline())
+            if header and header.get('base') == self.base_hash:
+                header_size = good_offset = journal.tell()
+                for line in journal:
+                    record = decode_record(line)
+                    if record is None:
+                        # A torn or damaged record, nothing after it can be trusted
+                        skipped += 1
+                        break
+                    try:
+                        replay(data, record, paths)
+                        replayed += 1
+                    except (KeyError, ValueError, TypeError):
+                        # A change that no longer applies, skip just this one
+                        skipped += 1
+                    good_offset += len(line)
+                torn = good_offset < journal.tell()
+                self.journal_ino = stat_key(journal.fileno())[2]
+                self.journal_offset = good_offset
+                self.journal_bytes = good_offset - header_size
+            # Otherwise it was written for an older snapshot (compaction finished) or is damaged
+
+        if torn and repair:
+            # Cut the damaged tail off so new records follow the last good one
+            with open(self.journal_path, 'r+b') as journal:
+                journal.truncate(good_offset)
+                os.fsync(journal.fileno())
+        self.disk_stamp = self.stamp()
+        return data, replayed, skipped, torn
+
+    def cache_state(self):
+        # What resume() needs to append to the journal load() read, None if
+        # its damaged tail was left in place and a real load() must repair it
+        if self.torn:
+            return None
+        return {
+            "base_hash": self.base_hash,
+            "journal_offset": self.journal_offset,
+            "journal_bytes": self.journal_bytes,
+            "replayed_records": self.replayed_records,
+            "skipped_records": self.skipped_records,
+        }
+
+    def resume(self, state):
+        # Carry on as if load() had run, for data that came from the startup
+        # cache (only used while the files are unchanged since load())
+        self.base_hash = state["base_hash"]
+        self.journal_offset = state["journal_offset"]
+        self.journal_bytes = state["journal_bytes"]
+        self.replayed_records = state["replayed_records"]
+        self.skipped_records = state["skipped_records"]
+        self.base_stat = stat_key(self.path)
+        journal_stat = stat_key(self.journal_path)
+        self.journal_ino = journal_stat[2] if journal_stat and self.journal_offset else None
+        self.disk_stamp = self.stamp()
+        self.has_snapshot = True
+
+    def saved_state(self):
+        # cache_state() once close() wrote everything, None if the files may
+        # hold something other than the caller's data (another window wrote them)
+        with self.lock:
+            if self.pending_lines or self.pending_snapshot is not None or self.taken < self.published:
+                return None
+        if self.unseen() is not None:
+            return None
+        return self.cache_state()
+
+    def record(self, op):
+        # Queue one change for the journal
+        self.recorded += 1
+        line = encode_record(op)
+        with self.lock:
+            self.pending_lines.append(line)
+            self.pending_seq = self.recorded
+        if not self.has_snapshot:
+            # No snapshot on disk yet, write one that already holds this change
+            self.compact()
+            return
+
+        self.journal_bytes += len(line)
+        self.writer.submit(self.write_pending, key="sync")
+
+        if self.journal_bytes >= self.compact_bytes:
+            self.compact()
+
+    def compact(self):
+        # Replace the snapshot with the current data and start an empty journal
+        data = self.snapshot()
+        with self.lock:
+            # Queued records stay queued in case the snapshot has to be rebuilt
+            # from disk, records queued after this go into the new journal
+            self.pending_snapshot = (data, len(self.pending_lines), self.taken)
+            self.pending_seq = self.recorded
+        self.has_snapshot = True
+        self.journal_bytes = 0
+        self.compactions += 1
+        self.writer.submit(self.write_pending, key="sync")
+
+    def write_pending(self):
+        # Runs on the writer thread
+        with self.lock:
+            snapshot = self.pending_snapshot
+            lines = self.pending_lines
+            seq = self.pending_seq
+            self.pending_snapshot = None
+            self.pending_lines = []
+
+        with self.file_lock:
+            if snapshot is not None:
+                data, included, taken = snapshot
+                self.write_snapshot(data, lines[:included], lines[included:], seq, taken)
+            elif lines:
+                self.append(lines, seq)
+            self.written_seq = seq
+            self.disk_stamp = self.stamp()
+
+    def unseen(self):
+        # Whether the files hold something this instance hasn't read or written:
+        # "snapshot" if another window compacted, "records" if it appended
+        base_stat = stat_key(self.path)
+        if base_stat is None:
+            return None
+        if base_stat != self.base_stat:
+            with open(self.path, 'rb') as file:
+                if content_hash(file.read()) != self.base_hash:
+                    return "snapshot"
+            self.base_stat = base_stat
+        journal_stat = stat_key(self.journal_path)
+        if self.journal_ino is None:
+            # We have no journal for this snapshot, another window may have started one
+            return "snapshot" if journal_stat is not None and self.journal_has_header(self.base_hash) else None
+        if journal_stat is None or journal_stat[2] != self.journal_ino or journal_stat[1] < self.journal_offset:
+            return "snapshot"
+        if journal_stat[1] > self.journal_offset:
+            return "records"
+        return None
+
+    def journal_has_header(self, base_hash):
+        try:
+            with open(self.journal_path, 'rb') as journal:
+                header = decode_record(journal.readline())
+        except FileNotFoundError:
+            return False
+        return bool(header) and header.get('base') == base_hash
+
+    def read_records(self):
+        # Complete records other windows appended after journal_offset
+        records = []
+        with open(self.journal_path, 'rb') as journal:
+            journal.seek(self.journal_offset)
+            for line in journal:
+                record = decode_record(line)
+                if record is None:
+                    # Still being written (or damaged), look again later
+                    break
+                records.append(record)
+                self.journal_offset += len(line)
+        return records
+
+    def write_snapshot(self, data, lines, later_lines, seq, taken):
+        # data already holds lines, later_lines start the new journal. Data
+        # taken before the caller merged every remote change is out of date too.
+        unseen = self.unseen()
+        with self.lock:
+            if unseen is None and taken < self.published:
+                unseen = "missed"
+        if unseen is not None:
+            # Someone else wrote meanwhile: start from the files and add our records
+            try:
+                data = self.read_disk()[0]
+            except ValueError:
+                # Unreadable, our copy is the best there is
+                unseen = None
+            else:
+                paths = PathTable()
+                for line in lines:
+                    try:
+                        replay(data, decode_record(line), paths)
+                    except (KeyError, ValueError, TypeError):
+                        pass
+        raw = json.dumps(data, indent=4, default=json_default).encode()
+        atomic_write_bytes(self.path, raw)
+        self.base_hash = content_hash(raw)
+        self.base_stat = stat_key(self.path)
+        journal = encode_record({"base": self.base_hash}) + b"".join(later_lines)
+        atomic_write_bytes(self.journal_path, journal)
+        self.journal_ino = stat_key(self.journal_path)[2]
+        self.journal_offset = len(journal)
+        if unseen is not None:
+            paths = PathTable()
+            for line in later_lines:
+                try:
+                    replay(data, decode_record(line), paths)
+                except (KeyError, ValueError, TypeError):
+                    pass
+            self.publish("reload", data, seq)
+
+    def append(self, lines, seq):
+        unseen = self.unseen()
+        if unseen == "records":
+            # Records other windows added go before ours, pass them on
+            self.publish("records", self.read_records())
+        elif unseen == "snapshot":
+            # Another window compacted, our records go into its journal
+            with open(self.path, 'rb') as file:
+                self.base_stat = stat_key(file.fileno())
+                self.base_hash = content_hash(file.read())
+            self.journal_ino = None
+
+        if self.journal_ino is None and not self.journal_has_header(self.base_hash):
+            # The old journal belongs to another snapshot, start over
+            lines.insert(0, encode_record({"base": self.base_hash}))
+            mode = 'wb'
+        else:
+            mode = 'ab'
+        with open(self.journal_path, mode) as journal:
+            journal.write(b"".join(lines))
+            journal.flush()
+            os.fsync(journal.fileno())
+            journal_stat = stat_key(journal.fileno())
+        if unseen == "snapshot":
+            # Catch up with everything in the other window's snapshot and journal
+            self.publish("reload", self.read_disk()[0], seq)
+        else:
+            self.journal_ino = journal_stat[2]
+            self.journal_offset = journal_stat[1]
+
+    def stamp(self):
+        return stat_key(self.path), stat_key(self.journal_path)
+
+    def publish(self, kind, payload, seq=None):
+        # Hand changes made by other windows to the caller, see take_remote()
+        if kind == "records":
+            self.remote_records += len(payload)
+        else:
+            self.remote_reloads += 1
+        with self.lock:
+            self.published += 1
+            self.remote.append((kind, payload, self.written_seq if seq is None else seq))
+
+    def poll(self):
+        # Cheap check (two stats) for changes made by other windows, which are
+        # then read on the writer thread and show up in take_remote()
+        if self.disk_stamp is not None and self.stamp() != self.disk_stamp:
+            self.writer.submit(self.check_remote, key="remote")
+
+    def request_resync(self):
+        # Read the whole catalog from disk again, e.g. after a conflict
+        self.writer.submit(lambda: self.check_remote(resync=True), key="resync")
+
+    def check_remote(self, resync=False):
+        # Runs on the writer thread
+        with self.file_lock:
+            unseen = self.unseen()
+            if resync or unseen == "snapshot":
+                self.publish("reload", self.read_disk()[0])
+            elif unseen == "records":
+                records = self.read_records()
+                if records:
+                    self.publish("records", records)
+            self.disk_stamp = self.stamp()
+
+    def take_remote(self):
+        # Changes from other windows as (kind, payload, seq): ("records", [op, ...])
+        # to apply in order, or ("reload", data) with the whole catalog as on disk,
+        # which includes our own records up to number seq
+        with self.lock:
+            remote = self.remote
+            self.remote = []
+            self.taken = self.published
+            return remote
+
+    def flush(self, timeout=None):
+        # Wait until every queued record is on disk
+        return self.writer.wait(timeout)
+
+    def close(self, timeout=None):
+        # Fold the journal into the snapshot so the data file is current
+        if self.journal_bytes:
+            self.compact()
+        return self.writer.close(timeout)
+
+    def stats(self):
+        stats = self.writer.stats()
+        stats["journal_bytes"] = self.journal_bytes
+        stats["compactions"] = self.compactions
+        stats["replayed_records"] = self.replayed_records
+        stats["skipped_records"] = self.skipped_records
+        stats["remote_records"] = self.remote_records
+        stats["remote_reloads"] = self.remote_reloads
+        with self.lock:
+            stats["pending_changes"] = len(self.pending_lines)
+        return stats
@@ -0,0 +1,312 @@
+# Resource use of launched executables, sampled from /proc.
+#
+# The launch supervisor hands every process it starts to ProcessMonitor,
+# which follows it and everything it starts in turn (a shell launch does its
+# work in the shell's children) from a daemon thread that wakes up every
+# interval seconds while anything runs. Each wakeup reads /proc/<pid>/stat
+# (CPU time, start time, resident memory) and /proc/<pid>/status (peak
+# resident memory) of the followed processes and finds their new children
+# through /proc/<pid>/task/<tid>/children, or by reading the parent of every
+# process where the kernel doesn't provide that file.
+#
+# The CPU time of a process includes the children it has waited for, so a
+# child that a followed process reaps is counted in full rather than up to
+# its last sample. The launched process itself is reaped by the supervisor,
+# which lets the monitor read its final numbers first (exiting).
+#
+# A run ends once the launched process and everything it started are gone.
+# Its totals go into the statistics of its executable path: CPU seconds, peak
+# resident bytes and seconds run, three numbers per path that are saved on a
+# background thread like the launch history (which counts the launches).
+# Without /proc (Windows, macOS) only run time is counted.
+
+import json
+import os
+import threading
+import time
+
+from persistence import BackgroundWriter, atomic_write_json
+
+PROC = "/proc"
+
+
+def proc_available():
+    return os.path.isfile(os.path.join(PROC, "self", "stat"))
+
+
+def read_stat(pid):
+    # (parent pid, start time, CPU ticks, resident pages) of a process, None
+    # if it is gone. The CPU ticks include the children it waited for.
+    try:
+        with open(f"{PROC}/{pid}/stat", 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+    # The command name comes in parentheses and may contain spaces or parentheses itself
+    fields = data[data.rindex(b')') + 2:].split()
+    return int(fields[1]), int(fields[19]), sum(int(field) for field in fields[11:15]), int(fields[21])
+
+
+def read_peak_rss(pid):
+    # Highest resident memory of a process so far in bytes (VmHWM), 0 if unknown
+    try:
+        with open(f"{PROC}/{pid}/status", 'rb') as file:
+            for line in file:
+                if line.startswith(b'VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return 0
+
+
+def read_children(pid):
+    # Pids of the children of a process, from the children file of each of its threads
+    children = []
+    try:
+        threads = os.listdir(f"{PROC}/{pid}/task")
+    except OSError:
+        return children
+    for tid in threads:
+        try:
+            with open(f"{PROC}/{pid}/task/{tid}/children", 'rb') as file:
+                children.extend(int(child) for child in file.read().split())
+        except OSError:
+            pass
+    return children
+
+
+def read_parents():
+    # parent pid -> child pids of every process, for kernels without children files
+    children = {}
+    for name in os.listdir(PROC):
+        if name.isdigit():
+            stat = read_stat(name)
+            if stat is not None:
+                children.setdefault(stat[0], []).append(int(name))
+    return children
+
+
+class Run:
+    __slots__ = ('exe_path', 'started', 'ended', 'last_seen', 'processes', 'exited_ticks', 'peak_rss')
+
+    def __init__(self, exe_path, started):
+        self.exe_path = exe_path
+        # Wall clock times, ended is when the launched process itself exited
+        self.started = started
+        self.ended = None
+        self.last_seen = started
+        # pid -> [start time, CPU ticks at the last sample, parent pid] of the processes followed
+        self.processes = {}
+        # CPU ticks of the processes that exited
+        self.exited_ticks = 0
+        self.peak_rss = 0
+
+    def ticks(self):
+        return self.exited_ticks + sum(process[1] for process in self.processes.values())
+
+
+class ProcessMonitor:
+    def __init__(self, path, interval=1.0, name="process-monitor"):
+        self.path = path
+        self.interval = interval
+        self.proc = proc_available()
+        if self.proc:
+            self.tick_seconds = 1 / os.sysconf('SC_CLK_TCK')
+            self.page_size = os.sysconf('SC_PAGE_SIZE')
+            self.children_files = os.path.isfile(f"{PROC}/self/task/{os.getpid()}/children")
+
+        # exe path -> [CPU seconds, peak resident bytes, seconds run]
+        self.entries = {}
+        self.writer = BackgroundWriter(name="usage-writer")
+
+        self.condition = threading.Condition()
+        # launch id -> Run, until the run ends
+        self.runs = {}
+        # Exe paths whose numbers changed since take_updated
+        self.updated = set()
+        self.closed = False
+
+        # Statistics, in milliseconds
+        self.samples = 0
+        self.last_sample_ms = 0.0
+        self.max_sample_ms = 0.0
+
+        self.thread = threading.Thread(target=self.run, name=name, daemon=True)
+        self.thread.start()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.entries = json.load(file)
+        except FileNotFoundError:
+            self.entries = {}
+        except ValueError:
+            # Damaged statistics only cost the numbers shown, start over
+            self.entries = {}
+
+    def watch(self, launch_id, exe_path, pid, started):
+        # Follow a process that was just started for exe_path
+        run = Run(exe_path, started)
+        stat = read_stat(pid) if self.proc else None
+        if stat is not None:
+            run.processes[pid] = [stat[1], stat[2], stat[0]]
+        with self.condition:
+            if self.closed:
+                return
+            self.runs[launch_id] = run
+            self.updated.add(exe_path)
+            self.condition.notify_all()
+
+    def exiting(self, launch_id, pid):
+        # The launched process exited and is about to be reaped, take its final CPU time
+        stat = read_stat(pid) if self.proc else None
+        with self.condition:
+            run = self.runs.get(launch_id)
+            process = run.processes.get(pid) if run is not None else None
+            if stat is not None and process is not None and stat[1] == process[0]:
+                process[1] = max(process[1], stat[2])
+
+    def finish(self, launch_id, ended):
+        # The launched process exited, its children may still run
+        with self.condition:
+            run = self.runs.get(launch_id)
+            if run is None:
+                return
+            run.ended = ended
+            if not self.proc:
+                self.end_run(launch_id)
+            self.condition.notify_all()
+
+    def entry(self, exe_path):
+        entry = self.entries.get(exe_path)
+        if entry is None:
+            entry = self.entries[exe_path] = [0.0, 0, 0.0]
+        return entry
+
+    def run(self):
+        while True:
+            with self.condition:
+                while not self.closed and not (self.proc and self.runs):
+                    self.condition.wait()
+                if self.closed:
+                    return
+                runs = list(self.runs.items())
+
+            start = time.perf_counter()
+            self.sample(runs)
+            elapsed = (time.perf_counter() - start) * 1000
+            self.samples += 1
+            self.last_sample_ms = elapsed
+            self.max_sample_ms = max(self.max_sample_ms, elapsed)
+
+            with self.condition:
+                if not self.closed:
+                    self.condition.wait(self.interval)
+
+    def sample(self, runs):
+        now = time.time()
+        parents = None if self.children_files else read_parents()
+        for launch_id, run in runs:
+            with self.condition:
+                followed = {pid: process[0] for pid, process in run.processes.items()}
+
+            # Take in the children of every process still followed
+            found = {}
+            for pid in followed:
+                children = read_children(pid) if parents is None else parents.get(pid, ())
+                for child in children:
+                    if child not in followed:
+                        stat = read_stat(child)
+                        if stat is not None and stat[0] == pid:
+                            found[child] = stat[1]
+            followed.update(found)
+
+            processes = {}
+            resident = 0
+            peak_rss = 0
+            for pid, started in followed.items():
+                stat = read_stat(pid)
+                if stat is None or stat[1] != started:
+                    # Gone, or the pid belongs to another process by now
+                    continue
+                processes[pid] = [started, stat[2], stat[0]]
+                resident += stat[3] * self.page_size
+                peak_rss = max(peak_rss, read_peak_rss(pid))
+
+            with self.condition:
+                if launch_id not in self.runs:
+                    continue
+                for pid, process in run.processes.items():
+                    if pid in processes:
+                        # exiting() may have read a later value meanwhile
+                        processes[pid][1] = max(processes[pid][1], process[1])
+                    elif process[2] not in run.processes:
+                        # Not reaped by a followed process, whose CPU time would
+                        # include it, count it as of its last sample
+                        run.exited_ticks += process[1]
+                run.processes = processes
+                run.peak_rss = max(run.peak_rss, peak_rss, resident)
+                if processes:
+                    run.last_seen = now
+                elif run.ended is not None:
+                    self.end_run(launch_id)
+                self.updated.add(run.exe_path)
+
+    def end_run(self, launch_id):
+        # Add a run to the statistics of its executable (called with the lock held)
+        run = self.runs.pop(launch_id)
+        ended = run.ended if run.ended is not None else time.time()
+        entry = self.entry(run.exe_path)
+        entry[0] += run.ticks() * self.tick_seconds if self.proc else 0.0
+        entry[1] = max(entry[1], run.peak_rss)
+        entry[2] += max(0.0, max(ended, run.last_seen) - run.started)
+        self.updated.add(run.exe_path)
+        self.save()
+
+    def save(self):
+        # Save the statistics in the background (called with the lock held)
+        snapshot = {key: list(entry) for key, entry in self.entries.items()}
+        self.writer.submit(lambda: atomic_write_json(self.path, snapshot, indent=None), key="usage")
+
+    def usage(self, exe_path):
+        # (CPU seconds, peak resident bytes, seconds run) of an executable
+        # path, counting its runs so far
+        with self.condition:
+            cpu, peak_rss, seconds = self.entries.get(exe_path, (0.0, 0, 0.0))
+            now = time.time()
+            for run in self.runs.values():
+                if run.exe_path == exe_path:
+                    cpu += run.ticks() * self.tick_seconds if self.proc else 0.0
+                    peak_rss = max(peak_rss, run.peak_rss)
+                    seconds += max(0.0, (run.ended or now) - run.started)
+            return cpu, peak_rss, seconds
+
+    def take_updated(self):
+        # Exe paths whose numbers changed since the last call
+        with self.condition:
+            updated, self.updated = self.updated, set()
+            return updated
+
+    def active(self):
+        with self.condition:
+            return bool(self.runs)
+
+    def stats(self):
+        with self.condition:
+            return {
+                'following': sum(len(run.processes) for run in self.runs.values()),
+                'runs': len(self.runs),
+                'samples': self.samples,
+                'last_sample_ms': self.last_sample_ms,
+                'max_sample_ms': self.max_sample_ms,
+            }
+
+    def close(self, timeout=None):
+        # Stop sampling. Runs still going count up to now, their processes keep running.
+        with self.condition:
+            self.closed = True
+            for launch_id in list(self.runs):
+                self.end_run(launch_id)
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        return self.writer.close(timeout)
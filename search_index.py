@@ -0,0 +1,267 @@
+# Trigram search index over catalog names and executable paths.
+#
+# Every folder and executable in the catalog gets an entry whose lowercase
+# name (and path, for executables) is broken into 3-character grams. A query
+# intersects the postings of its own grams instead of walking the whole tree,
+# and the few surviving candidates are confirmed with a plain substring test.
+#
+# rank() answers fuzzy (subsequence) queries over the executables instead,
+# scoring each match and keeping only the best few in a bounded heap.
+
+import heapq
+import math
+import re
+
+from model import is_entry, is_executable
+
+GRAM_SIZE = 3
+
+# Characters after which a match counts as the start of a word
+SEPARATORS = frozenset(" _-./\\:")
+
+# Padding at the end of each string makes every substring (even a 1 or 2
+# character one) the prefix of at least one gram, so short queries can be
+# answered from the prefix table below.
+PAD = "\x00" * (GRAM_SIZE - 1)
+
+
+def grams_of(text):
+    # All grams of a lowercase string, padded at the end
+    padded = text + PAD
+    return {padded[i:i + GRAM_SIZE] for i in range(len(text))}
+
+
+def query_grams(query):
+    # Grams that must all be present for the query to be a substring
+    return {query[i:i + GRAM_SIZE] for i in range(len(query) - GRAM_SIZE + 1)}
+
+
+def char_mask(text):
+    # Bit set of the characters in text (folded into 64 bits), for cheap
+    # rejection: an entry can only match if it has every bit of the query
+    mask = 0
+    for char in set(text):
+        mask |= 1 << (ord(char) & 63)
+    return mask
+
+
+def fuzzy_score(query, text):
+    # Score query as a subsequence of text, None if it isn't one. Consecutive
+    # characters and matches at word starts score higher, long texts lower.
+    index = text.find(query)
+    if index >= 0:
+        # A plain substring beats any scattered match of the same query
+        score = 3 * len(query) + 5
+        if index == 0 or text[index - 1] in SEPARATORS:
+            score += 3
+        return score - 0.01 * len(text)
+
+    score = 0
+    position = -1
+    previous = -2
+    for char in query:
+        position = text.find(char, position + 1)
+        if position < 0:
+            return None
+        score += 1
+        if position == previous + 1:
+            score += 2
+        if position == 0 or text[position - 1] in SEPARATORS:
+            score += 3
+        previous = position
+    return score - 0.01 * len(text)
+
+
+def subsequence_pattern(query):
+    # Compiled subsequence test, rejects most candidates without Python loops
+    return re.compile('.*?'.join(map(re.escape, query)), re.DOTALL)
+
+
+def match_score(pattern, query, name, exe_path, usage=0.0, usage_weight=4.0):
+    # Score of an executable for a fuzzy query, None if it doesn't match.
+    # The name counts for more than the directory it lives in, and usage
+    # (e.g. frecency) is added on a log scale.
+    name_match = pattern.search(name) is not None
+    if not name_match and pattern.search(exe_path) is None:
+        return None
+    score = fuzzy_score(query, name) if name_match else None
+    path_score = fuzzy_score(query, exe_path)
+    if path_score is not None:
+        score = max(score or 0, path_score * 0.5)
+    return score + usage_weight * math.log2(1 + usage)
+
+
+class SearchIndex:
+    def __init__(self):
+        # gram -> set of entry ids
+        self.postings = {}
+        # 1 and 2 character prefixes -> set of grams starting with them
+        self.prefixes = {}
+        # entry id -> (path tuple, lowercase name, lowercase exe path or None)
+        self.entries = {}
+        # path tuple -> entry id
+        self.ids = {}
+        # entry id -> char_mask of an executable's name and path
+        self.masks = {}
+        self.next_id = 0
+
+    def build(self, data):
+        # Index the whole catalog from scratch (done once at load time)
+        self.postings.clear()
+        self.prefixes.clear()
+        self.entries.clear()
+        self.ids.clear()
+        self.masks.clear()
+        self.next_id = 0
+        for key, value in data.items():
+            self.add((key,), value)
+
+    def add(self, path, value):
+        # Index an entry and, for folders, everything below it
+        if not is_entry(value):
+            return
+        path = tuple(path)
+        if path in self.ids:
+            self.remove_entry(path)
+
+        name = path[-1].lower()
+        exe_path = value['path'].lower() if is_executable(value) else None
+
+        entry_id = self.next_id
+        self.next_id += 1
+        self.entries[entry_id] = (path, name, exe_path)
+        self.ids[path] = entry_id
+        if exe_path is not None:
+            self.masks[entry_id] = char_mask(name + exe_path)
+
+        grams = grams_of(name)
+        if exe_path is not None:
+            grams |= grams_of(exe_path)
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                posting = self.postings[gram] = set()
+                for size in range(1, GRAM_SIZE):
+                    self.prefixes.setdefault(gram[:size], set()).add(gram)
+            posting.add(entry_id)
+
+        if exe_path is None:
+            for key, child in value.items():
+                self.add(path + (key,), child)
+
+    def remove(self, path, value):
+        # Drop an entry and, for folders, everything below it
+        if not is_entry(value):
+            return
+        path = tuple(path)
+        if not is_executable(value):
+            for key, child in value.items():
+                self.remove(path + (key,), child)
+        self.remove_entry(path)
+
+    def remove_entry(self, path):
+        entry_id = self.ids.pop(path, None)
+        if entry_id is None:
+            return
+        _, name, exe_path = self.entries.pop(entry_id)
+        self.masks.pop(entry_id, None)
+
+        grams = grams_of(name)
+        if exe_path is not None:
+            grams |= grams_of(exe_path)
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is None:
+                continue
+            posting.discard(entry_id)
+            if not posting:
+                del self.postings[gram]
+                for size in range(1, GRAM_SIZE):
+                    siblings = self.prefixes.get(gram[:size])
+                    if siblings is not None:
+                        siblings.discard(gram)
+                        if not siblings:
+                            del self.prefixes[gram[:size]]
+
+    def candidates(self, query):
+        if len(query) >= GRAM_SIZE:
+            # Intersect the postings of every gram, smallest first
+            postings = []
+            for gram in query_grams(query):
+                posting = self.postings.get(gram)
+                if not posting:
+                    return set()
+                postings.append(posting)
+            postings.sort(key=len)
+            result = set(postings[0])
+            for posting in postings[1:]:
+                result &= posting
+                if not result:
+                    break
+            return result
+
+        # Short queries: union of every gram that starts with the query
+        result = set()
+        for gram in self.prefixes.get(query, ()):
+            result |= self.postings[gram]
+        return result
+
+    def query(self, query):
+        # Paths of every entry whose name or path contains the query
+        matches = set()
+        for entry_id in self.candidates(query):
+            path, name, exe_path = self.entries[entry_id]
+            if query in name or (exe_path is not None and query in exe_path):
+                matches.add(path)
+        return matches
+
+    def rank(self, query, boost=None, boost_weight=4.0, limit=50):
+        # The limit best (score, path) executables for a fuzzy query, best first.
+        # boost(path) adds a usage score (e.g. frecency) on top of the match.
+        query_mask = char_mask(query)
+        pattern = subsequence_pattern(query)
+
+        def scored():
+            for entry_id, mask in self.masks.items():
+                if mask & query_mask != query_mask:
+                    continue
+                path, name, exe_path = self.entries[entry_id]
+                score = match_score(pattern, query, name, exe_path)
+                if score is None:
+                    continue
+                if boost is not None:
+                    score += boost_weight * math.log2(1 + boost(path))
+                yield score, path
+
+        return heapq.nlargest(limit, scored(), key=lambda result: result[0])
+
+    def branches(self, matches):
+        # Folders that hold a match somewhere below them
+        branches = set()
+        for path in matches:
+            for depth in range(len(path) - 1, 0, -1):
+                prefix = path[:depth]
+                if prefix in branches:
+                    break
+                branches.add(prefix)
+        return branches
+
+    def filter(self, data, matches):
+        if not matches:
+            return {}
+        return self.filter_level(data, (), matches | self.branches(matches))
+
+    def filter_level(self, data, prefix, relevant):
+        # Only descend into folders that hold a match, in catalog order
+        filtered_data = {}
+        for key, value in data.items():
+            path = prefix + (key,)
+            if path not in relevant or not is_entry(value):
+                continue
+            if is_executable(value):
+                filtered_data[key] = value
+            else:
+                result = self.filter_level(value, path, relevant)
+                # A folder matched only by name keeps all of its contents
+                filtered_data[key] = result if result else value
+        return filtered_data
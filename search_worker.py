@@ -0,0 +1,103 @@
+# Runs catalog searches on a worker thread so typing never waits for them.
+#
+# Every query gets a generation number. Submitting a new one replaces a query
+# that hasn't started yet and makes the results of older ones stale: the
+# worker drops them when it notices, and take_result() only ever returns the
+# result of the latest query. The Tk thread polls take_result() with after().
+#
+# Results also carry the catalog version they were computed on, a result
+# from before the catalog last changed refers to entries that may be gone.
+
+import queue
+import threading
+import time
+
+from catalog import rank_in, search_in
+
+
+class SearchWorker:
+    def __init__(self, model, name="catalog-search"):
+        self.model = model
+        self.name = name
+        self.condition = threading.Condition()
+        self.thread = None
+        self.closed = False
+        # Latest query not started yet, as (generation, kind, query, options)
+        self.request = None
+        self.generation = 0
+        # (generation, version, kind, query, result, seconds) of finished queries
+        self.results = queue.Queue()
+        self.busy = False
+        self.completed = 0
+        self.dropped = 0
+
+    def submit(self, kind, query, **options):
+        # Queue a "search" (filtered data and branches) or a "rank" (best
+        # matches, options are passed to CatalogModel.rank) for query
+        with self.condition:
+            self.generation += 1
+            if self.request is not None:
+                self.dropped += 1
+            self.request = (self.generation, kind, query, options)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.run, name=self.name, daemon=True)
+                self.thread.start()
+            self.condition.notify()
+            return self.generation
+
+    def cancel(self):
+        # Make every query so far stale, e.g. before searching on the Tk thread
+        with self.condition:
+            self.generation += 1
+            self.request = None
+
+    def pending(self):
+        # Whether a query is queued or running, or its result not taken yet
+        with self.condition:
+            return self.request is not None or self.busy or not self.results.empty()
+
+    def take_result(self):
+        # The result of the latest query as (version, kind, query, result,
+        # seconds), or None if it isn't ready; older results are thrown away
+        latest = None
+        while True:
+            try:
+                item = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if item[0] == self.generation:
+                latest = item
+            else:
+                self.dropped += 1
+        return latest[1:] if latest is not None else None
+
+    def run(self):
+        while True:
+            with self.condition:
+                while self.request is None and not self.closed:
+                    self.condition.wait()
+                if self.closed:
+                    return
+                generation, kind, query, options = self.request
+                self.request = None
+                self.busy = True
+            try:
+                start = time.perf_counter()
+                if generation != self.generation:
+                    # A newer query arrived meanwhile
+                    self.dropped += 1
+                    continue
+                # The catalog is read without its lock, see CatalogModel.read
+                reader = rank_in if kind == "rank" else search_in
+                version, result = self.model.read(reader, query, **options)
+                self.completed += 1
+                self.results.put((generation, version, kind, query, result, time.perf_counter() - start))
+            finally:
+                with self.condition:
+                    self.busy = False
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.request = None
+            self.condition.notify()
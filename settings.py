@@ -0,0 +1,33 @@
+# Settings shared by the launcher window and the command line (launcher_cli.py),
+# kept free of tkinter so the command line starts quickly.
+
+DATA_FILE = "tree_data.json"
+
+# How changes are stored: "journal" appends each change to DATA_FILE + ".journal"
+# and folds it into DATA_FILE now and then, "json" rewrites DATA_FILE every time
+STORAGE_BACKEND = "journal"
+# The journal is folded into the data file once it grows past this many bytes
+JOURNAL_COMPACT_BYTES = 1 << 20
+
+# Launches are remembered in HISTORY_FILE to rank quick-launch results; a
+# launch counts half as much after FRECENCY_HALF_LIFE_DAYS
+HISTORY_FILE = "launch_history.json"
+FRECENCY_HALF_LIFE_DAYS = 14
+# How much launch history weighs against how well the name matches
+FRECENCY_WEIGHT = 4.0
+
+# CPU time, peak memory, run time and launches of every executable path are
+# kept in USAGE_FILE; running processes are sampled every MONITOR_INTERVAL seconds
+USAGE_FILE = "launch_usage.json"
+MONITOR_INTERVAL = 1.0
+
+# Flat list of the executables for the command line, rebuilt when the catalog changes
+FLAT_INDEX_FILE = "tree_data.index.json"
+
+# Pickled catalog, node table and search index for fast startup, used while
+# the catalog files are unchanged since it was built
+STARTUP_CACHE_FILE = "tree_data.cache"
+
+# Time the window's operations, count their Tk calls and measure event loop
+# lag from startup (it can also be turned on from Help > Performance)
+PROFILE_OPERATIONS = False
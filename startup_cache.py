@@ -0,0 +1,148 @@
+# Prebuilt startup snapshot of the catalog.
+#
+# Loading the catalog means parsing the pretty-printed JSON file, replaying
+# the journal and then numbering and indexing every entry. The startup cache
+# keeps the result of all that (the data in its compact form with the shared
+# PathTable, its NodeMap and SearchIndex, and the storage engine's state)
+# pickled in one file. It is only used when every
+# source file still has the mtime, size and content hash it had when the
+# cache was built; otherwise the window loads normally and the cache is
+# rebuilt on a background thread from the files on disk. A window that wrote
+# changes saves the catalog it holds once more when it closes, after the files
+# are final, rather than reading and indexing them all over again.
+
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+from catalog import NodeMap
+from model import PathTable, folder_from_json
+from persistence import JournalStore, atomic_write_bytes, parse_catalog
+from search_index import SearchIndex
+from settings import DATA_FILE, STORAGE_BACKEND
+
+CACHE_VERSION = 3
+
+
+def source_files():
+    # Files the catalog is read from with the configured storage backend
+    if STORAGE_BACKEND == "json":
+        return [DATA_FILE]
+    return [DATA_FILE, DATA_FILE + ".journal"]
+
+
+def source_signature(paths, with_hash=False):
+    # [path, mtime in ns, size] (plus the SHA-1 of the content) of every
+    # file, None for missing ones
+    signature = []
+    for path in paths:
+        try:
+            info = os.stat(path)
+        except FileNotFoundError:
+            signature.append(None)
+            continue
+        entry = [path, info.st_mtime_ns, info.st_size]
+        if with_hash:
+            digest = hashlib.sha1()
+            with open(path, 'rb') as file:
+                for chunk in iter(lambda: file.read(1 << 20), b''):
+                    digest.update(chunk)
+            entry.append(digest.hexdigest())
+        signature.append(entry)
+    return signature
+
+
+def read_catalog():
+    # The catalog (in the in-memory form of model.py), read without changing
+    # any file, and the storage engine state that goes with it (None if it
+    # can't be cached)
+    if STORAGE_BACKEND == "json":
+        with open(DATA_FILE, 'rb') as file:
+            return parse_catalog(file.read()), {}
+    # The window may be appending to the journal right now, leave its tail alone
+    store = JournalStore(DATA_FILE, snapshot=None)
+    data = store.load(repair=False)
+    return data, store.cache_state()
+
+
+class StartupCache:
+    def __init__(self, path):
+        self.path = path
+        self.thread = None
+        self.last_error = None
+        # Seconds the last rebuild took to load, number and index the catalog
+        self.build_seconds = None
+
+    def load(self):
+        # The cached {"data", "paths", "nodes", "index", "store_state"} if it matches the
+        # source files, otherwise None
+        try:
+            with open(self.path, 'rb') as file:
+                # The header is a separate pickle, so a stale cache is rejected
+                # without unpickling the catalog
+                header = pickle.load(file)
+                if not isinstance(header, dict) or header.get('version') != CACHE_VERSION:
+                    return None
+                self.build_seconds = header['build_seconds']
+                source = header['source']
+                # Compare mtimes and sizes first, only hash files that could match
+                current = source_signature(source_files())
+                if [entry and entry[:3] for entry in source] != current:
+                    return None
+                if source_signature(source_files(), with_hash=True) != source:
+                    return None
+                return pickle.load(file)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, KeyError, TypeError, ValueError):
+            return None
+
+    def rebuild(self):
+        # Build the cache from the files on disk in the background
+        if self.thread is not None and self.thread.is_alive():
+            return
+        self.thread = threading.Thread(target=self.build, name="startup-cache", daemon=True)
+        self.thread.start()
+
+    def save(self, data, paths, nodes, index, store_state):
+        # Write the cache from a catalog that is already loaded, numbered and
+        # indexed, once a background rebuild has finished. store_state() is
+        # called after the files are signed and gives the storage engine
+        # state, None if the files may hold something other than data.
+        if self.thread is not None:
+            self.thread.join()
+        try:
+            source = source_signature(source_files(), with_hash=True)
+            state = store_state()
+            if state is None:
+                return
+            self.write(source, {'data': data, 'paths': paths, 'nodes': nodes, 'index': index, 'store_state': state})
+        except Exception as error:
+            self.last_error = error
+
+    def build(self):
+        try:
+            start = time.perf_counter()
+            # Signed before reading, so a change made meanwhile makes the cache stale
+            source = source_signature(source_files(), with_hash=True)
+            data, store_state = read_catalog()
+            if store_state is None:
+                return
+            paths = PathTable()
+            data = folder_from_json(data, paths)
+            nodes = NodeMap()
+            nodes.build(data)
+            index = SearchIndex()
+            index.build(data)
+            self.build_seconds = time.perf_counter() - start
+
+            self.write(source, {'data': data, 'paths': paths, 'nodes': nodes, 'index': index,
+                                'store_state': store_state})
+        except Exception as error:
+            # A missing cache only costs startup time, keep the reason for the status window
+            self.last_error = error
+
+    def write(self, source, body):
+        header = {'version': CACHE_VERSION, 'source': source, 'build_seconds': self.build_seconds}
+        atomic_write_bytes(self.path, pickle.dumps(header, pickle.HIGHEST_PROTOCOL) +
+                           pickle.dumps(body, pickle.HIGHEST_PROTOCOL))
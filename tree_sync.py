@@ -0,0 +1,476 @@
+# Keeps a ttk.Treeview in line with the catalog data structure.
+#
+# Instead of deleting every item and inserting the whole tree again, the
+# desired tree is compared with a shadow copy of what the Treeview currently
+# shows, and only the insert/move/detach/delete/item calls needed to get from
+# one to the other are issued. Items that are filtered out are detached and
+# reattached later, so their open/closed state and selection survive.
+#
+# Items are tied to catalog nodes (see catalog.NodeMap) rather than to paths,
+# so renaming or moving an entry keeps its item and nothing is ever looked up
+# by the text it is displayed with.
+#
+# In lazy mode only the top level and the folders that have been opened get
+# real items. Every other folder holds a single placeholder child so it can
+# still be expanded, and its children are created when it is opened.
+#
+# A single entry that was added or renamed can also be put in place on its
+# own (place), found by bisection among its sorted siblings, and one that was
+# dragged somewhere else or restored by undo is put straight into its spot
+# (move).
+#
+# columns, if set, gives the values shown after the path of an executable
+# (e.g. its resource use); refresh_columns shows new ones for a few paths.
+
+import bisect
+
+from catalog import ROOT, is_entry, is_executable, lookup, sort_key
+
+PLACEHOLDER_TEXT = "…"
+
+
+def render(name, value):
+    # Text and values an entry is displayed with
+    if is_executable(value):
+        return f"{value['emoji']} {name}", (value['path'],)
+    return name, ()
+
+
+def has_entries(level):
+    return any(is_entry(value) for value in level.values())
+
+
+class TreeviewSync:
+    def __init__(self, tree, nodes, lazy=False):
+        self.tree = tree
+        self.nodes = nodes
+        self.lazy = lazy
+        # exe path -> tuple of values for the columns after path
+        self.columns = None
+        self.reset_state()
+
+    def reset_state(self):
+        # node id <-> item id for every item we created
+        self.items = {}
+        self.node_ids = {}
+        # item id -> (text, values) last written to the Treeview
+        self.rendered = {}
+        # exe path -> ids of the items that show it, for refresh_columns
+        self.path_items = {}
+        # parent item id -> attached child item ids, in display order
+        self.children = {'': []}
+        # item id -> parent item id (kept while the item is detached)
+        self.parents = {}
+        # items currently detached from the Treeview
+        self.detached = set()
+        # item last detached by relocate(), its children are still up to date
+        self.relocated = None
+        # item id -> open state, tracked through the open/close events
+        self.open_state = {}
+        # folders opened to show search results -> state to restore
+        self.forced_open = {}
+        # selection hidden by a filter, restored once its items come back
+        self.hidden_selection = ()
+        # lazy mode: folders whose children have real items
+        self.populated = set()
+        # lazy mode: folder item id -> its placeholder child
+        self.placeholders = {}
+        # lazy mode: closed folders, least recently closed first
+        self.closed_order = {}
+        # node id -> Treeview tags, applied whenever the node has an item
+        self.tags = {}
+        # data currently shown and the folders opened to show it
+        self.data = {}
+        self.expand_paths = frozenset()
+
+    def sync(self, data, expand=None):
+        # Make the Treeview show exactly data, folders before executables.
+        # expand holds the paths of folders that must be opened (search results).
+        selection = self.tree.selection() or self.hidden_selection
+
+        if not expand:
+            self.restore_open_state()
+        self.data = data
+        self.expand_paths = expand or frozenset()
+        self.relocated = None
+
+        self.sync_level(data, (), ROOT, '')
+
+        # Detached items drop out of the selection, put it back if they return
+        kept = tuple(item for item in selection if item in self.node_ids and item not in self.detached)
+        if kept and self.tree.selection() != kept:
+            self.tree.selection_set(kept)
+        self.hidden_selection = selection if not kept else ()
+
+    def sync_level(self, level, prefix, parent_node, parent):
+        siblings = self.nodes.children[parent_node]
+        folders = []
+        executables = []
+        for key, value in level.items():
+            if is_entry(value):
+                if is_executable(value):
+                    executables.append((key, value))
+                else:
+                    folders.append((key, value))
+        wanted = folders + executables
+
+        # Detach whatever is shown here but no longer wanted
+        wanted_items = {self.items.get(siblings[key]) for key, _ in wanted}
+        current = self.children.setdefault(parent, [])
+        unwanted = [item for item in current if item not in wanted_items]
+        if unwanted:
+            self.tree.detach(*unwanted)
+            self.detached.update(unwanted)
+            current[:] = [item for item in current if item in wanted_items]
+
+        for index, (key, value) in enumerate(wanted):
+            path = prefix + (key,)
+            node_id = siblings[key]
+            text, values = self.render(key, value)
+            item_id = self.items.get(node_id)
+
+            if item_id is None:
+                # New entry, insert it straight into its place
+                item_id = self.create_item(node_id, parent, index, text, values)
+            else:
+                if index >= len(current) or current[index] != item_id:
+                    # Known entry in the wrong place (or detached), move it
+                    self.tree.move(item_id, parent, index)
+                    old_parent = self.parents.get(item_id)
+                    if item_id in self.detached:
+                        self.detached.discard(item_id)
+                    elif old_parent == parent:
+                        current.remove(item_id)
+                    else:
+                        self.children[old_parent].remove(item_id)
+                    current.insert(index, item_id)
+
+                if self.rendered[item_id] != (text, values):
+                    self.tree.item(item_id, text=text, values=values)
+                    self.remember(item_id, text, values)
+            self.parents[item_id] = parent
+
+            if not is_executable(value):
+                if path in self.expand_paths and not self.open_state.get(item_id):
+                    # Open folders on the way to search results, remember to close them again
+                    self.forced_open.setdefault(item_id, False)
+                    self.tree.item(item_id, open=True)
+                    self.set_open(item_id, True)
+                self.sync_folder(item_id, value, path)
+
+    def create_item(self, node_id, parent, index, text, values):
+        is_open = not self.lazy
+        item_id = self.tree.insert(parent, index, text=text, values=values, open=is_open,
+                                   tags=self.tags.get(node_id, ()))
+        self.items[node_id] = item_id
+        self.node_ids[item_id] = node_id
+        self.remember(item_id, text, values)
+        self.open_state[item_id] = is_open
+        self.children[parent].insert(index, item_id)
+        return item_id
+
+    def sync_folder(self, item_id, value, path):
+        if not self.lazy or self.open_state.get(item_id) or item_id in self.populated:
+            self.drop_placeholder(item_id)
+            if self.lazy:
+                self.populated.add(item_id)
+            self.sync_level(value, path, self.node_ids[item_id], item_id)
+        elif has_entries(value):
+            # Collapsed and never opened, a placeholder keeps it expandable
+            if item_id not in self.placeholders:
+                self.placeholders[item_id] = self.tree.insert(item_id, 'end', text=PLACEHOLDER_TEXT)
+        else:
+            self.drop_placeholder(item_id)
+
+    def drop_placeholder(self, item_id):
+        placeholder = self.placeholders.pop(item_id, None)
+        if placeholder is not None:
+            self.tree.delete(placeholder)
+
+    def expand(self, item_id):
+        # A folder was opened, fill in its children if they were never created
+        node_id = self.node_ids.get(item_id)
+        if not self.lazy or item_id in self.populated or node_id is None or not self.nodes.is_folder(node_id):
+            return
+        path = tuple(self.nodes.path_of(node_id))
+        level = self.data
+        for key in path:
+            level = level.get(key)
+            if not isinstance(level, dict):
+                return
+        self.sync_folder(item_id, level, path)
+
+    def set_open(self, item_id, is_open):
+        self.open_state[item_id] = is_open
+        self.closed_order.pop(item_id, None)
+        if not is_open:
+            self.closed_order[item_id] = None
+
+    def restore_open_state(self):
+        # Close folders that were only opened to show search results
+        for item_id, was_open in self.forced_open.items():
+            if item_id in self.node_ids and self.open_state.get(item_id) != was_open:
+                self.tree.item(item_id, open=was_open)
+                self.set_open(item_id, was_open)
+        self.forced_open.clear()
+
+    def note_open(self, item_id, is_open):
+        # Record an open/close done by the user
+        if item_id in self.node_ids:
+            self.set_open(item_id, is_open)
+            self.forced_open.pop(item_id, None)
+            if is_open:
+                self.expand(item_id)
+
+    def trim(self, budget):
+        # Drop the children of collapsed folders until at most budget items remain
+        if not self.lazy:
+            return
+        for item_id in list(self.closed_order):
+            if len(self.node_ids) <= budget:
+                break
+            if item_id in self.populated and not self.open_state.get(item_id):
+                self.collapse(item_id)
+
+    def collapse(self, item_id):
+        # Turn a collapsed folder back into a placeholder
+        doomed = [item for item in self.descendants(self.node_ids[item_id]) if item != item_id]
+        if any(item in doomed for item in self.tree.selection()):
+            return
+
+        attached = self.children.get(item_id, [])
+        detached = [item for item in doomed if item in self.detached]
+        if attached or detached:
+            self.tree.delete(*(attached + detached))
+        self.forget(doomed)
+        self.children[item_id] = []
+        self.populated.discard(item_id)
+        if doomed:
+            self.placeholders[item_id] = self.tree.insert(item_id, 'end', text=PLACEHOLDER_TEXT)
+
+    def descendants(self, node_id):
+        # Items of the node and everything below it
+        return [self.items[node] for node in self.nodes.subtree(node_id) if node in self.items]
+
+    def set_tags(self, node_id, tags):
+        # Mark a node's item, now or once it is created
+        tags = tuple(tags)
+        if self.tags.get(node_id, ()) == tags:
+            return
+        if tags:
+            self.tags[node_id] = tags
+        else:
+            del self.tags[node_id]
+        item_id = self.items.get(node_id)
+        if item_id is not None:
+            self.tree.item(item_id, tags=tags)
+
+    def render(self, name, value):
+        text, values = render(name, value)
+        if values and self.columns is not None:
+            values += self.columns(values[0])
+        return text, values
+
+    def refresh_columns(self, exe_paths):
+        # Show what columns gives now for the executables with these paths
+        for exe_path in exe_paths:
+            for item_id in self.path_items.get(exe_path, ()):
+                text, values = self.rendered[item_id]
+                new_values = values[:1] + self.columns(exe_path)
+                if new_values != values:
+                    self.tree.item(item_id, values=new_values)
+                    # Same path, so path_items stays as it is
+                    self.rendered[item_id] = (text, new_values)
+
+    def remember(self, item_id, text, values):
+        # Note what was written to an item, and the exe path it shows
+        old = self.rendered.get(item_id)
+        if old is not None and old[1][:1] != values[:1]:
+            self.drop_path(item_id, old[1])
+        if values:
+            self.path_items.setdefault(values[0], set()).add(item_id)
+        self.rendered[item_id] = (text, values)
+
+    def drop_path(self, item_id, values):
+        if values:
+            items = self.path_items[values[0]]
+            items.discard(item_id)
+            if not items:
+                del self.path_items[values[0]]
+
+    def node_of(self, item_id):
+        # The node an item shows, None for placeholders
+        return self.node_ids.get(item_id)
+
+    def place(self, node_id):
+        # Insert or move the item of a node that was just added or renamed to
+        # its sorted position among the shown siblings, without a full sync.
+        # False if only sync() can show it (e.g. its folder isn't shown).
+        parent_node = self.nodes.parents[node_id]
+        parent = '' if parent_node == ROOT else self.items.get(parent_node)
+        if self.lazy and (parent is None or (parent and parent not in self.populated)):
+            return self.place_unpopulated(parent_node)
+        if parent is None or parent in self.detached:
+            return False
+        path = tuple(self.nodes.path_of(node_id))
+        value = lookup(self.data, path)
+        if not is_entry(value):
+            return False
+
+        current = self.children.setdefault(parent, [])
+        item_id = self.items.get(node_id)
+        if item_id is not None:
+            if item_id in self.detached or self.parents.get(item_id) != parent:
+                return False
+            old_index = current.index(item_id)
+            del current[old_index]
+
+        def key(node):
+            return sort_key(self.nodes.names[node], self.nodes.is_folder(node))
+
+        # Search the shown items of the same kind like catalog.sorted_before
+        # searched the folder, so both agree even where it isn't sorted. An
+        # entry that went to the end of the folder goes after its kind.
+        folders = bisect.bisect_left(current, True, key=lambda item: not self.nodes.is_folder(self.node_ids[item]))
+        low, high = (folders, len(current)) if is_executable(value) else (0, folders)
+        level = lookup(self.data, path[:-1]) if len(path) > 1 else self.data
+        if next(reversed(level)) == path[-1]:
+            index = high
+        else:
+            index = bisect.bisect_left(current, key(node_id), low, high, key=lambda item: key(self.node_ids[item]))
+        text, values = self.render(path[-1], value)
+        if item_id is None:
+            item_id = self.create_item(node_id, parent, index, text, values)
+            self.parents[item_id] = parent
+            if not is_executable(value):
+                self.sync_folder(item_id, value, path)
+            return True
+
+        if index != old_index:
+            self.tree.move(item_id, parent, index)
+        current.insert(index, item_id)
+        if self.rendered[item_id] != (text, values):
+            self.tree.item(item_id, text=text, values=values)
+            self.remember(item_id, text, values)
+        return True
+
+    def place_unpopulated(self, folder_node):
+        # Lazy mode: an entry went into a folder whose children were never
+        # created. The closest folder with an item only needs its placeholder,
+        # opening it creates the rest.
+        while folder_node != ROOT and folder_node not in self.items:
+            folder_node = self.nodes.parents[folder_node]
+        item_id = self.items.get(folder_node)
+        if item_id is None or item_id in self.detached or item_id in self.populated:
+            return False
+        if item_id not in self.placeholders:
+            self.placeholders[item_id] = self.tree.insert(item_id, 'end', text=PLACEHOLDER_TEXT)
+        return True
+
+    def move(self, node_id):
+        # Put the item of a node that was moved, added or edited in the data
+        # exactly where the data has it (place() assumes sorted siblings),
+        # creating it if needed, without a full sync. Only for the unfiltered
+        # tree; False if only sync() can show it.
+        parent_node = self.nodes.parents[node_id]
+        parent = '' if parent_node == ROOT else self.items.get(parent_node)
+        item_id = self.items.get(node_id)
+        # An item detached earlier may have missed changes below it, sync() catches up
+        if self.expand_paths or (item_id in self.detached and item_id != self.relocated):
+            return False
+        if self.lazy and (parent is None or (parent and parent not in self.populated)):
+            return item_id is None and self.place_unpopulated(parent_node)
+        if parent is None or parent in self.detached:
+            return False
+        path = tuple(self.nodes.path_of(node_id))
+        level = lookup(self.data, path[:-1]) if len(path) > 1 else self.data
+        value = level.get(path[-1]) if isinstance(level, dict) else None
+        if not is_entry(value):
+            return False
+
+        # Display order of the folder, folders before executables like sync_level
+        siblings = self.nodes.children[parent_node]
+        order = {}
+        for folders in (True, False):
+            for key, sibling in level.items():
+                if is_entry(sibling) and is_executable(sibling) != folders:
+                    order[siblings[key]] = len(order)
+
+        current = self.children.setdefault(parent, [])
+        if item_id in self.detached:
+            self.detached.discard(item_id)
+            self.relocated = None
+        elif item_id is not None and item_id in self.children.get(self.parents.get(item_id), ()):
+            self.children[self.parents[item_id]].remove(item_id)
+        rank = order[node_id]
+        index = sum(1 for item in current if order.get(self.node_ids[item], -1) < rank)
+        text, values = self.render(path[-1], value)
+
+        if item_id is None:
+            item_id = self.create_item(node_id, parent, index, text, values)
+            self.parents[item_id] = parent
+            if not is_executable(value):
+                self.sync_folder(item_id, value, path)
+            return True
+
+        self.tree.move(item_id, parent, index)
+        current.insert(index, item_id)
+        self.parents[item_id] = parent
+        if self.rendered[item_id] != (text, values):
+            self.tree.item(item_id, text=text, values=values)
+            self.remember(item_id, text, values)
+        return True
+
+    def relocate(self, node_id):
+        # A node moved to another folder, take its item out of the old one
+        # so the next sync puts it in its new place
+        item_id = self.items.get(node_id)
+        if item_id is None or item_id in self.detached:
+            return
+        parent = self.parents.get(item_id)
+        new_parent = self.nodes.parents[node_id]
+        if parent == ('' if new_parent == ROOT else self.items.get(new_parent)):
+            return
+        self.tree.detach(item_id)
+        self.detached.add(item_id)
+        self.relocated = item_id
+        self.children[parent].remove(item_id)
+
+    def remove(self, node_id):
+        # A node is about to leave the catalog, delete its items for good
+        for node in self.nodes.subtree(node_id):
+            self.tags.pop(node, None)
+        item_id = self.items.get(node_id)
+        if item_id is None:
+            return
+        doomed = self.descendants(node_id)
+
+        # Detached descendants are no longer under the item in the Treeview
+        to_delete = [item_id] + [item for item in doomed if item in self.detached and item != item_id]
+        self.tree.delete(*to_delete)
+
+        parent = self.parents.get(item_id)
+        if item_id not in self.detached and item_id in self.children.get(parent, ()):
+            self.children[parent].remove(item_id)
+        self.forget(doomed)
+
+    def forget(self, items):
+        for item in items:
+            del self.items[self.node_ids.pop(item)]
+            self.drop_path(item, self.rendered.pop(item, (None, ()))[1])
+            self.children.pop(item, None)
+            self.parents.pop(item, None)
+            self.detached.discard(item)
+            self.open_state.pop(item, None)
+            self.forced_open.pop(item, None)
+            self.populated.discard(item)
+            self.placeholders.pop(item, None)
+            self.closed_order.pop(item, None)
+
+    def clear(self):
+        # Forget everything, e.g. before loading a different catalog
+        self.tree.delete(*self.tree.get_children())
+        for item in self.detached:
+            if self.tree.exists(item):
+                self.tree.delete(item)
+        self.reset_state()
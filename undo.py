@@ -0,0 +1,145 @@
+# Undo and redo of catalog changes, on snapshots that share their structure.
+#
+# Next to the live catalog, which is changed in place, UndoHistory keeps a
+# snapshot of the catalog after every step. A snapshot is never changed once
+# its step is closed: a change copies only the folders on the way from the
+# root to the ones it touches (path copying) and shares every other folder
+# with the snapshot before it, so a step costs the changed path rather than
+# the whole catalog. Executables are replaced rather than changed (see
+# persistence.copy_tree), so snapshots share them as they are.
+#
+# Undoing compares the current snapshot with the one before it. Folders the
+# two share are the same dict and are skipped without looking inside, and the
+# differences come out as ordinary change records (see catalog.diff_ops) for
+# the launcher to apply like any other change.
+
+from catalog import apply_op, diff_ops, is_executable
+from persistence import copy_tree
+
+
+def changes_between(old, new):
+    # Change records that turn the snapshot old into new, with folders copied
+    # so the live catalog never shares a dict with a snapshot
+    ops = diff_ops(old, new)
+    for op in ops:
+        if op['op'] == 'add' and not is_executable(op['value']):
+            op['value'] = copy_tree(op['value'])
+    return ops
+
+
+class UndoHistory:
+    def __init__(self, limit=100):
+        # Steps that can be undone at most
+        self.limit = limit
+        self.reset()
+
+    def reset(self):
+        # Forget every step, e.g. when a catalog is loaded
+        self.snapshots = None
+        self.position = 0
+        self.open = False
+        # id -> folder copied for the open step, changed in place until it closes
+        self.owned = {}
+
+    def base(self, data):
+        # Take the catalog as it is before its first recorded change as the
+        # starting point (copied once rather than at every load)
+        if self.snapshots is None:
+            self.snapshots = [copy_tree(data)]
+            self.position = 0
+
+    def record(self, op):
+        # Add a change that was just applied to the catalog to the open step,
+        # opening a new step if there is none
+        if not self.open:
+            # Steps that were undone can't be redone after a new change
+            del self.snapshots[self.position + 1:]
+            self.snapshots.append(self.snapshots[self.position])
+            self.position += 1
+            if len(self.snapshots) > self.limit + 1:
+                del self.snapshots[0]
+                self.position -= 1
+            self.open = True
+        try:
+            self.snapshots[self.position] = self.apply_shared(self.snapshots[self.position], op)
+        except (KeyError, ValueError, TypeError):
+            # The snapshot doesn't match the catalog, start over from the next change
+            self.reset()
+
+    def close_step(self):
+        self.open = False
+        self.owned = {}
+
+    def apply_shared(self, root, op):
+        # Apply op to a snapshot, copying the folders it changes and their
+        # parents, and return the new root
+        # Sorting only changes the root in place, its folders are sorted into new dicts
+        root = self.writable(root)
+        if op['op'] != 'sort':
+            self.writable_level(root, op['path'][:-1])
+            if op['op'] == 'move':
+                self.writable_level(root, op['to'])
+            if op['op'] == 'add' and not is_executable(op['value']):
+                # The live catalog holds (and fills) the added folder itself
+                op = dict(op, value=copy_tree(op['value']))
+        apply_op(root, op)
+        return root
+
+    def writable(self, folder):
+        if id(folder) in self.owned:
+            return folder
+        folder = dict(folder)
+        self.owned[id(folder)] = folder
+        return folder
+
+    def writable_level(self, root, path):
+        level = root
+        for part in path:
+            child = level.get(part)
+            if not isinstance(child, dict):
+                # Not there, apply_op raises the error
+                return
+            child = level[part] = self.writable(child)
+            level = child
+
+    def can_undo(self):
+        return self.snapshots is not None and self.position > 0
+
+    def can_redo(self):
+        return self.snapshots is not None and self.position + 1 < len(self.snapshots)
+
+    def undo(self):
+        # Change records that take the catalog back one step, None if there is
+        # none. Steps that changed nothing (e.g. sorting a sorted catalog) are
+        # passed over.
+        self.close_step()
+        while self.can_undo():
+            self.position -= 1
+            ops = changes_between(self.snapshots[self.position + 1], self.snapshots[self.position])
+            if ops:
+                return ops
+        return None
+
+    def redo(self):
+        # Change records that repeat the last undone step, None if there is none
+        self.close_step()
+        while self.can_redo():
+            self.position += 1
+            ops = changes_between(self.snapshots[self.position - 1], self.snapshots[self.position])
+            if ops:
+                return ops
+        return None
+
+    def forget(self, op):
+        # Another window changed the catalog: take the change into the current
+        # snapshot and drop the steps, undoing them now would undo it as well
+        if self.snapshots is None:
+            return
+        self.close_step()
+        try:
+            self.snapshots = [self.apply_shared(self.snapshots[self.position], op)]
+        except (KeyError, ValueError, TypeError):
+            self.reset()
+            return
+        self.position = 0
+        self.close_step()